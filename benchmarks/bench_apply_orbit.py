@@ -0,0 +1,89 @@
+'''
+BENCHMARK: METADATA-ONLY ORBIT APPLICATION AND CACHED ORBIT FILES.
+
+A dual-polarisation float32 scene is written as an uncompressed GeoTIFF together with a synthetic AUX_POEORB
+orbit file (a day of state vectors every 10 s on a circular orbit). The orbit is applied once with a full
+GTiff copy of the scene (the former behaviour) and once as a VRT that only adds the orbit metadata. The orbit
+tags of a day of scenes sharing the orbit file are then computed with and without the orbit cache.
+
+Usage: python benchmarks/bench_apply_orbit.py [size] [scenes] [output_dir]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import rasterio
+import rasterio.shutil
+from rasterio.transform import from_origin
+from earthml import orbit
+from earthml.s1_preprocessing import apply_orbit_file
+
+START = np.datetime64('2020-12-15T22:59:42', 's')
+VECTORS = 9361
+STEP = 10
+
+
+def write_orbit_file(path):
+    # circular orbit at 7071 km with an inclination of 98.18 degrees
+    radius, inclination = 7071000.0, np.radians(98.18)
+    rate = np.sqrt(3.986004418e14 / radius ** 3)
+    seconds = np.arange(VECTORS) * STEP
+    angle = rate * seconds
+    positions = radius * np.stack([np.cos(angle), np.sin(angle) * np.cos(inclination), np.sin(angle) * np.sin(inclination)], 1)
+    velocities = radius * rate * np.stack([-np.sin(angle), np.cos(angle) * np.cos(inclination), np.cos(angle) * np.sin(inclination)], 1)
+    with open(path, 'w') as fh:
+        fh.write('<?xml version="1.0" ?>\n<Earth_Explorer_File><Earth_Explorer_Header><Fixed_Header>'
+                 f'<File_Type>AUX_POEORB</File_Type><Validity_Period><Validity_Start>UTC={START}</Validity_Start>'
+                 f'<Validity_Stop>UTC={START + int(seconds[-1])}</Validity_Stop></Validity_Period></Fixed_Header>'
+                 f'</Earth_Explorer_Header><Data_Block type="xml"><List_of_OSVs count="{VECTORS}">\n')
+        for second, position, velocity in zip(seconds, positions, velocities):
+            fh.write(f'<OSV><UTC>UTC={START + int(second)}.000000</UTC>'
+                     + ''.join(f'<{axis}>{value:.6f}</{axis}>' for axis, value in zip(('X', 'Y', 'Z', 'VX', 'VY', 'VZ'),
+                                                                                  np.concatenate([position, velocity])))
+                     + '</OSV>\n')
+        fh.write('</List_of_OSVs></Data_Block></Earth_Explorer_File>')
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 8192
+    scenes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    output_dir = sys.argv[3] if len(sys.argv) > 3 else tempfile.mkdtemp()
+    scene = os.path.join(output_dir, 'scene.tif')
+    orbit_file = os.path.join(output_dir, 'orbit.EOF')
+    write_orbit_file(orbit_file)
+    image = np.random.default_rng(0).gamma(4.0, 0.05 / 4.0, (2, size, size)).astype(np.float32)
+    with rasterio.open(scene, 'w', driver='GTiff', height=size, width=size, count=2, dtype='float32',
+                       crs='EPSG:32633', transform=from_origin(500000, 5300000, 10, 10)) as dst:
+        dst.write(image)
+        dst.update_tags(ACQUISITION_START_TIME=str(START + 3600), ACQUISITION_STOP_TIME=str(START + 3625))
+    del image
+    print(f"{size}x{size} x 2 bands float32 ({2 * size * size * 4 / 2 ** 20:.0f} MB), orbit file of {VECTORS} vectors")
+
+    start = time.perf_counter()
+    rasterio.shutil.copy(scene, os.path.join(output_dir, 'scene_orbit.tif'), driver='GTiff')
+    copied = time.perf_counter() - start
+    orbit.get_orbit(orbit_file)  # the orbit parse is timed below
+    start = time.perf_counter()
+    apply_orbit_file(scene, orbit_file, os.path.join(output_dir, 'scene_orbit.vrt'))
+    applied = time.perf_counter() - start
+    print(f"apply orbit: full GTiff copy {copied:.2f} s, metadata-only VRT {applied:.3f} s ({copied / applied:.0f}x)")
+
+    timings = []
+    for cached in (False, True):
+        orbit._cached_orbit.cache_clear()
+        start = time.perf_counter()
+        for index in range(scenes):
+            if not cached:
+                orbit._cached_orbit.cache_clear()
+            acquisition = START + 600 + index * 1500
+            orbit.orbit_tags(orbit_file, {'ACQUISITION_START_TIME': str(acquisition),
+                                          'ACQUISITION_STOP_TIME': str(acquisition + 25)})
+        timings.append(time.perf_counter() - start)
+    print(f"orbit tags of {scenes} scenes: parsed per scene {timings[0]:.2f} s, cached {timings[1]:.2f} s "
+          f"({timings[0] / timings[1]:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
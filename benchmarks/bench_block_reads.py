@@ -0,0 +1,74 @@
+'''
+BENCHMARK: BLOCK-ALIGNED TILE READS AND MULTITHREADED DECOMPRESSION ON COMPRESSED INPUTS.
+
+A dual-polarisation scene is written as a DEFLATE-compressed striped GeoTIFF and as a DEFLATE-compressed
+GeoTIFF with 256 x 256 tiles. Both are read tile by tile with a 3 pixel halo, once on a plain square grid and
+once on the block-aligned grid of the streaming pipeline, with a GDAL block cache smaller than the scene (as
+for a full-size scene). The whole scene is then read with 1 thread and with GDAL_NUM_THREADS=ALL_CPUS.
+
+Usage: python benchmarks/bench_block_reads.py [size] [tile_size] [cache_mb] [output_dir]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from earthml.sar_pipeline import block_tile_shape
+from earthml.tile_scheduler import iter_windows
+
+HALO = 3
+
+
+def read_tiles(path, tile_size, aligned):
+    with rasterio.open(path) as src:
+        tile_shape = block_tile_shape(src, tile_size) if aligned else tile_size
+        start = time.perf_counter()
+        for _, outer in iter_windows(src.width, src.height, tile_shape, HALO):
+            src.read(window=outer)
+        return time.perf_counter() - start
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 8192
+    tile_size = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+    cache_mb = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    output_dir = sys.argv[4] if len(sys.argv) > 4 else tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    image = rng.gamma(4.0, 0.05 / 4.0, (2, size, size)).astype(np.float32)
+    profile = {'driver': 'GTiff', 'height': size, 'width': size, 'count': 2, 'dtype': 'float32', 'compress': 'deflate',
+               'crs': 'EPSG:32633', 'transform': from_origin(500000, 5300000, 10, 10)}
+    layouts = {'striped': {}, 'tiled 256': {'tiled': True, 'blockxsize': 256, 'blockysize': 256}}
+    paths = {}
+    for name, layout in layouts.items():
+        paths[name] = os.path.join(output_dir, name.replace(' ', '_') + '.tif')
+        with rasterio.open(paths[name], 'w', **profile, **layout) as dst:
+            dst.write(image)
+    print(f"{size}x{size} x 2 bands float32, tiles of {tile_size}, halo {HALO}, GDAL cache {cache_mb} MB")
+
+    for name, path in paths.items():
+        with rasterio.open(path) as src:
+            aligned = block_tile_shape(src, tile_size)
+            blocks = src.block_shapes[0]
+        with rasterio.Env(GDAL_CACHEMAX=cache_mb * 1024 * 1024):
+            square = read_tiles(path, tile_size, aligned=False)
+        with rasterio.Env(GDAL_CACHEMAX=cache_mb * 1024 * 1024):
+            block = read_tiles(path, tile_size, aligned=True)
+        print(f"{name:>9} (blocks {blocks[0]}x{blocks[1]}): square tiles {square:6.2f} s, "
+              f"aligned tiles {aligned[0]}x{aligned[1]} {block:6.2f} s ({square / block:.2f}x)")
+
+    for name, path in paths.items():
+        timings = []
+        for threads in ('1', 'ALL_CPUS'):
+            with rasterio.Env(GDAL_NUM_THREADS=threads), rasterio.open(path) as src:
+                start = time.perf_counter()
+                src.read()
+                timings.append(time.perf_counter() - start)
+        print(f"{name:>9} full read: 1 thread {timings[0]:.2f} s, ALL_CPUS ({os.cpu_count()} cores) {timings[1]:.2f} s "
+              f"({timings[0] / timings[1]:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
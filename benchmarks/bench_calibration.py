@@ -0,0 +1,79 @@
+'''
+BENCHMARK: SEPARABLE BLOCK-WISE INTERPOLATION OF CALIBRATION LUTS.
+
+A Sentinel-1 calibration annotation is written with a calibration vector every 600 lines and a sample every 40
+pixels, as in a GRD product. The sigma0 gain of a full scene is then interpolated once per pixel with SciPy's
+RegularGridInterpolator over every pixel coordinate (the straightforward approach), and once with the
+separable interpolation of the calibration module, one 1024-line block at a time. Parsing the annotation is
+timed with and without the calibration cache.
+
+Usage: python benchmarks/bench_calibration.py [width] [height] [output_dir]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from rasterio.windows import Window
+from scipy.interpolate import RegularGridInterpolator
+from earthml import calibration
+
+LINE_SPACING = 600
+PIXEL_SPACING = 40
+BLOCK_LINES = 1024
+
+
+def write_calibration_file(path, width, height):
+    lines = np.arange(0, height + LINE_SPACING, LINE_SPACING)
+    pixels = np.append(np.arange(0, width - 1, PIXEL_SPACING), width - 1)
+    rng = np.random.default_rng(0)
+    with open(path, 'w') as fh:
+        fh.write('<?xml version="1.0" encoding="UTF-8"?>\n<calibration><adsHeader><missionId>S1A</missionId>'
+                 '<productType>GRD</productType><polarisation>VV</polarisation><swath>IW</swath></adsHeader>'
+                 f'<calibrationVectorList count="{len(lines)}">\n')
+        for line in lines:
+            sigma = 500 + 0.01 * pixels + rng.normal(0, 1, len(pixels))
+            fh.write(f'<calibrationVector><line>{line}</line><pixel count="{len(pixels)}">{" ".join(map(str, pixels))}</pixel>'
+                     + ''.join(f'<{tag} count="{len(pixels)}">{" ".join(f"{value:.6e}" for value in sigma * factor)}</{tag}>'
+                               for tag, factor in (('sigmaNought', 1.0), ('betaNought', 0.95), ('gamma', 0.9), ('dn', 0.95)))
+                     + '</calibrationVector>\n')
+        fh.write('</calibrationVectorList></calibration>')
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 16384
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 8192
+    output_dir = sys.argv[3] if len(sys.argv) > 3 else tempfile.mkdtemp()
+    path = os.path.join(output_dir, 'calibration-s1a-iw-grd-vv.xml')
+    write_calibration_file(path, width, height)
+
+    start = time.perf_counter()
+    lut, = calibration.read_calibration(path)
+    parsed = time.perf_counter() - start
+    calibration.get_calibration(path)
+    start = time.perf_counter()
+    calibration.get_calibration(path)
+    cached = time.perf_counter() - start
+    print(f"{width}x{height} scene, LUT of {len(lut.lines)} x {len(lut.pixels)}: "
+          f"parse {parsed * 1e3:.1f} ms, cached {cached * 1e6:.1f} us")
+
+    grid = lut.values['sigma0']
+    interpolator = RegularGridInterpolator((lut.lines, lut.pixels), grid)
+    naive, separable, error = 0.0, 0.0, 0.0
+    for row in range(0, height, BLOCK_LINES):
+        window = Window(0, row, width, min(BLOCK_LINES, height - row))
+        start = time.perf_counter()
+        rows, cols = np.meshgrid(np.arange(row, row + window.height), np.arange(width), indexing='ij')
+        expected = interpolator(np.stack([rows.ravel(), cols.ravel()], axis=1)).reshape(rows.shape)
+        naive += time.perf_counter() - start
+        start = time.perf_counter()
+        gain = calibration.interpolate_lut(lut.lines, lut.pixels, grid, window)
+        separable += time.perf_counter() - start
+        error = max(error, float(np.max(np.abs(gain / expected - 1))))
+    print(f"interpolation: per-pixel RegularGridInterpolator {naive:.2f} s, separable blocks {separable:.2f} s "
+          f"({naive / separable:.0f}x), max relative difference {error:.1e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+'''
+BENCHMARK: VECTORIZED GEOHASH ENCODING AND DECODING AGAINST THE PER-POINT PYGEOHASH PATH.
+
+Usage: python benchmarks/bench_geohash_array.py [points] [precision]
+'''
+
+import sys
+import time
+import numpy as np
+import pygeohash as gh
+from earthml.geohash_array import encode_array, decode_exactly_array
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    precision = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(-90, 90, points)
+    longitudes = rng.uniform(-180, 180, points)
+
+    start = time.perf_counter()
+    expected = [gh.encode(lat, lon, precision=precision) for lat, lon in zip(latitudes, longitudes)]
+    loop_encode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    geohashes = encode_array(latitudes, longitudes, precision)
+    array_encode = time.perf_counter() - start
+    assert geohashes.tolist() == expected, "vectorized geohashes differ from pygeohash"
+
+    start = time.perf_counter()
+    for geohash in expected:
+        gh.decode_exactly(geohash)
+    loop_decode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decode_exactly_array(geohashes)
+    array_decode = time.perf_counter() - start
+
+    print(f"{points} points at precision {precision}")
+    print(f"encode: pygeohash {loop_encode:.2f} s, encode_array {array_encode:.3f} s ({loop_encode / array_encode:.0f}x)")
+    print(f"decode: pygeohash {loop_decode:.2f} s, decode_exactly_array {array_decode:.3f} s ({loop_decode / array_decode:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+'''
+BENCHMARK: GEOHASH INDEX AREA QUERIES AGAINST A BRUTE-FORCE SCAN OVER ALL FILE BOUNDS.
+
+Usage: python benchmarks/bench_geohash_index.py [entries] [queries]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from earthml.geohash_index import GeohashIndex
+
+
+def random_boxes(rng, count, min_size, max_size):
+    centers_x = rng.uniform(-180, 180, count)
+    centers_y = rng.uniform(-85, 85, count)
+    sizes = 10 ** rng.uniform(np.log10(min_size), np.log10(max_size), (2, count)) / 2
+    return np.stack([np.clip(centers_x - sizes[0], -180, 180), centers_y - sizes[1],
+                     np.clip(centers_x + sizes[0], -180, 180), centers_y + sizes[1]], axis=1)
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = np.random.default_rng(0)
+    boxes = random_boxes(rng, entries, 0.01, 2.0)  # scene and tile footprints
+    query_boxes = random_boxes(rng, queries, 0.001, 0.5)
+    paths = [f'/archive/{i:08d}.tif' for i in range(entries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        with GeohashIndex(os.path.join(tmp, 'index.sqlite')) as index:
+            index.insert_many(zip(paths, boxes.tolist()))
+        build = time.perf_counter() - start
+
+        with GeohashIndex(os.path.join(tmp, 'index.sqlite')) as index:
+            start = time.perf_counter()
+            results = [index.query(tuple(query)) for query in query_boxes]
+            indexed = time.perf_counter() - start
+
+        # brute force: test every file's bounds, in Python and vectorized
+        catalogue = dict(zip(paths, map(tuple, boxes.tolist())))
+        scanned = query_boxes[:max(queries // 100, 1)]
+        start = time.perf_counter()
+        for minx, miny, maxx, maxy in scanned:
+            [path for path, (x0, y0, x1, y1) in catalogue.items() if x0 <= maxx and x1 >= minx and y0 <= maxy and y1 >= miny]
+        loop = (time.perf_counter() - start) / len(scanned) * queries
+
+        start = time.perf_counter()
+        for result, (minx, miny, maxx, maxy) in zip(results, query_boxes):
+            hits = np.nonzero((boxes[:, 0] <= maxx) & (boxes[:, 2] >= minx) & (boxes[:, 1] <= maxy) & (boxes[:, 3] >= miny))[0]
+            assert set(result) == {paths[i] for i in hits}, "index results differ from the brute-force scan"
+        vectorized = time.perf_counter() - start
+
+    found = sum(len(result) for result in results) / queries
+    print(f"{entries} files, {queries} queries, {found:.1f} files found per query, index built in {build:.1f} s")
+    print(f"per query: index {indexed / queries * 1e3:.3f} ms, numpy scan {vectorized / queries * 1e3:.2f} ms, "
+          f"python scan {loop / queries * 1e3:.1f} ms ({loop / indexed:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
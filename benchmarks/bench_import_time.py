@@ -0,0 +1,49 @@
+'''
+BENCHMARK: COLD IMPORT TIME OF THE PACKAGE.
+
+Every case runs in a fresh interpreter, as in a short-lived worker or a serverless invocation,
+and reports the median time to import earthml and use one function, together with the heavy
+dependencies that ended up loaded. 'all submodules' is what every import cost before the
+package became lazy.
+
+Usage: python benchmarks/bench_import_time.py [runs]
+'''
+
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('osgeo', 'rasterio', 'fiona', 'scipy', 'laspy', 'PIL')
+
+CASES = {
+    'import earthml': 'import earthml',
+    'geohash of points': 'import earthml; earthml.encode_array([48.8], [2.3], 8)',
+    'SAR pipeline': 'import earthml; earthml.run_pipeline',
+    'all submodules': 'from earthml import *',
+}
+
+PROBE = '''
+import sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(elapsed, ','.join(name for name in {heavy!r} if name in sys.modules))
+'''
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"median of {runs} cold starts")
+    print(f"{'case':<22}{'ms':>9}  heavy modules loaded")
+    for name, code in CASES.items():
+        timings = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, '-c', PROBE.format(code=code, heavy=HEAVY_MODULES)],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            timings.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 else '-'
+        print(f"{name:<22}{1000 * statistics.median(timings):>9.1f}  {loaded}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+'''
+BENCHMARK: FILE SIZE AND WRITE THROUGHPUT OF THE OUTPUT FORMATS.
+
+A dual-polarisation scene of gamma-distributed backscatter is written once as a plain striped
+float64 GeoTIFF (what an upcast stage used to produce) and once per OutputFormat.
+
+Usage: python benchmarks/bench_output_format.py [size] [output_dir]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from earthml.output_format import OutputFormat, write_output
+
+FORMATS = {
+    'float32, deflate': OutputFormat(),
+    'float32, zstd': OutputFormat(compress='zstd'),
+    'float32, deflate, COG': OutputFormat(overviews=True, cog=True),
+    'db_int16, deflate': OutputFormat('db_int16'),
+    'db_int16, zstd': OutputFormat('db_int16', 'zstd'),
+    'db_int16, zstd, COG': OutputFormat('db_int16', 'zstd', overviews=True, cog=True),
+}
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else tempfile.mkdtemp()
+    # a smooth backscatter field under multiplicative speckle, as after a speckle filter
+    rng = np.random.default_rng(0)
+    field = np.exp(np.cumsum(rng.normal(0, 0.01, (2, size, size)), axis=-1))
+    image = (0.05 * field * rng.gamma(8.0, 1 / 8.0, (2, size, size))).astype(np.float32)
+    profile = {'driver': 'GTiff', 'height': size, 'width': size, 'count': 2, 'dtype': 'float64',
+               'crs': 'EPSG:32633', 'transform': from_origin(500000, 5300000, 10, 10)}
+    megapixels = image.size / 1e6
+
+    path = os.path.join(output_dir, 'plain.tif')
+    start = time.perf_counter()
+    with rasterio.open(path, 'w', **profile) as dst:
+        dst.write(image.astype(np.float64))
+    elapsed = time.perf_counter() - start
+    plain = os.path.getsize(path)
+
+    print(f"2 bands of {size} x {size} pixels")
+    print(f"{'format':<24}{'MB':>9}{'ratio':>8}{'Mpx/s':>9}")
+    print(f"{'float64, striped':<24}{plain / 1e6:>9.1f}{1:>8.2f}{megapixels / elapsed:>9.1f}")
+    for name, output_format in FORMATS.items():
+        path = os.path.join(output_dir, name.replace(', ', '_') + '.tif')
+        start = time.perf_counter()
+        write_output(path, image, profile, output_format)
+        elapsed = time.perf_counter() - start
+        written = os.path.getsize(path)
+        print(f"{name:<24}{written / 1e6:>9.1f}{plain / written:>8.2f}{megapixels / elapsed:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+'''
+BENCHMARK: MEMORY-MAPPED READS AND IN-PLACE STAGES ON AN UNCOMPRESSED SCENE.
+
+A dual-polarisation float32 scene is written as an uncompressed, striped, band-interleaved GeoTIFF (the layout
+the pipeline maps). Thermal noise removal and calibration then run once on a GDAL read with a new array per
+stage (the former behaviour) and once on a copy-on-write memory map with the stages updating the image in
+place. The peak of the NumPy allocations is measured with tracemalloc, so the pages of the file itself (shared
+in the page cache) are not counted.
+
+Usage: python benchmarks/bench_raster_memmap.py [size] [output_dir]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+from earthml.raster_memmap import memmap_raster
+from earthml.sar_pipeline import radiometric_scaling
+from earthml.thermal_noise import estimate_thermal_noise, thermal_noise_removal
+
+
+def run_stages(path, mapped):
+    with rasterio.open(path) as src:
+        profile = src.profile
+        tracemalloc.start()
+        start = time.perf_counter()
+        image = memmap_raster(src, 'c') if mapped else src.read()
+        context = {'profile': profile, 'in_place': mapped}
+        estimate_thermal_noise([(Window(0, 0, src.width, src.height), image)], context, 'row')
+        image = thermal_noise_removal(image, context, 'row')
+        image = radiometric_scaling(image, context, [2.0, 3.0])
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak, np.array(image[:, ::97, ::89])
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 8192
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else tempfile.mkdtemp()
+    path = os.path.join(output_dir, 'uncompressed.tif')
+    image = np.random.default_rng(0).gamma(4.0, 0.05 / 4.0, (2, size, size)).astype(np.float32)
+    with rasterio.open(path, 'w', driver='GTiff', height=size, width=size, count=2, dtype='float32', interleave='band',
+                       crs='EPSG:32633', transform=from_origin(500000, 5300000, 10, 10)) as dst:
+        dst.write(image)
+    del image
+    scene_mb = 2 * size * size * 4 / 2 ** 20
+    print(f"{size}x{size} x 2 bands float32 ({scene_mb:.0f} MB), noise removal per row and calibration")
+
+    samples = []
+    for name, mapped in (('GDAL read, new arrays', False), ('memmap, in place', True)):
+        run_stages(path, mapped)  # warm the page cache
+        elapsed, peak, sample = run_stages(path, mapped)
+        samples.append(sample)
+        print(f"{name:>22}: {elapsed:6.2f} s, peak NumPy memory {peak / 2 ** 20:7.0f} MB ({peak / 2 ** 20 / scene_mb:.1f}x the scene)")
+    assert np.array_equal(*samples), "the in-place stages differ from the former ones"
+
+
+if __name__ == '__main__':
+    main()
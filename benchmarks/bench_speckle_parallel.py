@@ -0,0 +1,39 @@
+'''
+BENCHMARK: TILE-PARALLEL SPECKLE FILTERING SCALING FROM 1 TO N CPU CORES.
+
+Usage: python benchmarks/bench_speckle_parallel.py [size] [max_workers]
+'''
+
+import os
+import sys
+import time
+from functools import partial
+import numpy as np
+from earthml.speckle_filters import speckle_filter
+from earthml.tile_scheduler import map_tiles
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    image = np.random.default_rng(0).gamma(2.0, 50.0, size=(size, size)).astype(np.float32)
+    func = partial(speckle_filter, method='median', size=3)
+
+    start = time.perf_counter()
+    serial = func(image)
+    baseline = time.perf_counter() - start
+    print(f"serial median_filter on {size}x{size}: {baseline:.2f} s")
+
+    for executor in ['thread', 'process']:
+        workers = 1
+        while workers <= max_workers:
+            start = time.perf_counter()
+            parallel = map_tiles(image, func, halo=1, workers=workers, executor=executor)
+            elapsed = time.perf_counter() - start
+            assert np.array_equal(serial, parallel), "tiled result differs from the serial result"
+            print(f"{executor:>7} x {workers:<3}: {elapsed:.2f} s  speed-up {baseline / elapsed:.2f}x")
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
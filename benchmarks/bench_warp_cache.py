@@ -0,0 +1,84 @@
+'''
+BENCHMARK: SOURCE-PIXEL MAPPING CACHE OF THE WARP PLANS ON A FULL-SIZE SCENE.
+
+A 25000 x 17000 float32 UTM scene (the size of a Sentinel-1 GRD scene) is written as an uncompressed GeoTIFF and
+warped to EPSG:4326 tile by tile from its memory map, twice, as two scenes on the same grid. This runs once with a
+least-recently-used cache of MAPPING_CACHE_BYTES per plan (the former policy, which evicts every block of a scene
+larger than the cache just before the next scene needs it) and once with the shared cache of the warp plans. The
+number of block mappings rebuilt for the second scene and the bytes held by the cache are reported.
+
+Usage: python benchmarks/bench_warp_cache.py [width] [height] [cache_mb] [output_dir]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from earthml import warp_plan
+from earthml.raster_memmap import window_reader
+from earthml.tile_scheduler import iter_windows
+
+
+class LRUMappingCache(warp_plan.MappingCache):
+    # the former policy: the least recently used block is evicted, whatever its plan
+    def put(self, plan_id, key, mapping):
+        size = sum(array.nbytes for array in mapping)
+        mappings = self.plans.setdefault(plan_id, {})
+        mappings[key] = mapping
+        self.nbytes += size
+        while self.nbytes > self.max_bytes and len(mappings) > 1:
+            evicted = mappings.pop(next(iter(mappings)))
+            self.nbytes -= sum(array.nbytes for array in evicted)
+
+    def get(self, plan_id, key):
+        mapping = self.plans.get(plan_id, {}).pop(key, None)
+        if mapping is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.plans[plan_id][key] = mapping  # most recently used last
+        return mapping
+
+
+def warp_scene(path, plan):
+    with rasterio.open(path) as src:
+        read = window_reader(src, copy=False)
+        start = time.perf_counter()
+        for window, _ in iter_windows(plan.width, plan.height, plan.block_size):
+            plan.warp_window(read, window, np.float32)
+        return time.perf_counter() - start
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 25000
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 17000
+    cache_mb = int(sys.argv[3]) if len(sys.argv) > 3 else warp_plan.MAPPING_CACHE_BYTES // 2 ** 20
+    output_dir = sys.argv[4] if len(sys.argv) > 4 else tempfile.mkdtemp()
+    path = os.path.join(output_dir, 'scene.tif')
+    transform = from_origin(300000, 5500000, 10, 10)
+    rng = np.random.default_rng(0)
+    with rasterio.open(path, 'w', driver='GTiff', width=width, height=height, count=1, dtype='float32',
+                       crs='EPSG:32633', transform=transform) as dst:
+        for row in range(0, height, 1024):
+            rows = min(1024, height - row)
+            dst.write(rng.gamma(2.0, 50.0, (1, rows, width)).astype(np.float32), window=((row, row + rows), (0, width)))
+
+    plan = warp_plan.get_warp_plan('EPSG:32633', transform, width, height, 'EPSG:4326')
+    mapping_mb = plan.width * plan.height * 13 / 2 ** 20
+    print(f"{width}x{height} scene to EPSG:4326 ({plan.width}x{plan.height}, {len(plan.overlapping)} blocks, "
+          f"{mapping_mb:.0f} MB of mappings), cache of {cache_mb} MB, lattice {plan.lattice.nbytes / 2 ** 20:.0f} MB")
+
+    for name, cache in (('per-plan LRU', LRUMappingCache(cache_mb * 2 ** 20)), ('shared cache', warp_plan.MappingCache(cache_mb * 2 ** 20))):
+        warp_plan._mapping_cache = cache
+        first = warp_scene(path, plan)
+        rebuilt = cache.misses
+        repeat = warp_scene(path, plan)
+        print(f"{name:>12}: first scene {first:6.1f} s, repeat scene {repeat:6.1f} s, "
+              f"{cache.misses - rebuilt} of {rebuilt} block mappings rebuilt, cache {cache.nbytes / 2 ** 20:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+'''
+BENCHMARK: REPEAT-SCENE GEOMETRIC CORRECTION WITH A CACHED WARP PLAN AGAINST REPROJECTING EVERY SCENE FROM SCRATCH.
+
+A time series of scenes on the same grid is warped from UTM to EPSG:4326, once with
+calculate_default_transform + reproject per scene, and once through get_warp_plan.
+
+Usage: python benchmarks/bench_warp_plan.py [size] [scenes] [workers]
+'''
+
+import sys
+import time
+import numpy as np
+from rasterio.transform import array_bounds, from_origin
+from rasterio.warp import calculate_default_transform, reproject, Resampling
+from earthml.warp_plan import get_warp_plan
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    scenes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    src_crs, dst_crs = 'EPSG:32633', 'EPSG:4326'
+    transform = from_origin(500000, 5300000, 10, 10)
+    rng = np.random.default_rng(0)
+    stack = [rng.gamma(2.0, 50.0, (size, size)).astype(np.float32) for _ in range(min(scenes, 3))]
+
+    start = time.perf_counter()
+    for i in range(scenes):
+        dst_transform, width, height = calculate_default_transform(src_crs, dst_crs, size, size, *array_bounds(size, size, transform))
+        destination = np.zeros((height, width), dtype=np.float32)
+        reproject(stack[i % len(stack)], destination, src_transform=transform, src_crs=src_crs,
+                  dst_transform=dst_transform, dst_crs=dst_crs, resampling=Resampling.bilinear, num_threads=workers)
+    gdal = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plan = get_warp_plan(src_crs, transform, size, size, dst_crs)
+    plan.warp(stack[0], workers)
+    first = time.perf_counter() - start
+    for i in range(1, scenes):
+        get_warp_plan(src_crs, transform, size, size, dst_crs).warp(stack[i % len(stack)], workers)
+    planned = time.perf_counter() - start
+    repeat = (planned - first) / max(scenes - 1, 1)
+
+    print(f"{scenes} scenes of {size} x {size} pixels, {workers} worker(s)")
+    print(f"reproject per scene: {gdal / scenes:.2f} s ({scenes / gdal:.2f} scenes/s)")
+    print(f"warp plan: first scene {first:.2f} s, repeat scenes {repeat:.2f} s ({scenes / planned:.2f} scenes/s, {gdal / planned:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
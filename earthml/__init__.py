@@ -1,4 +1,96 @@
-from .geodata_to_geohash import *
-from .s1_preprocessing import *
-from .alospalsar_preprocessing import *
-from .terrasarx_preprocessing import *
+'''
+THE EARTHML PACKAGE.
+EVERY PUBLIC NAME OF THE SUBMODULES IS AVAILABLE AS earthml.<name>, BUT A SUBMODULE IS ONLY IMPORTED WHEN ONE OF ITS
+NAMES IS FIRST USED. `import earthml` THEREFORE LOADS NEITHER GDAL NOR RASTERIO, FIONA, SCIPY, LASPY OR PILLOW, AND
+THE GEOHASH FUNCTIONS ONLY NEED NUMPY.
+'''
+
+import importlib
+
+# geohash_cover is both a function and the submodule that defines it; importing the function
+# here keeps earthml.geohash_cover the function whenever the submodule is loaded (it needs NumPy only)
+from .geohash_cover import geohash_cover
+
+# Public names of every submodule, in the order of the former star imports (a name defined in
+# two submodules comes from the later one, e.g. radiometric_calibration from TerraSAR-X)
+_EXPORTS = {
+    'stage_arrays': ('working_dtype', 'stage_output'),
+    'sar_pipeline': ('Stage', 'PARALLEL_TILE_SIZE', 'gdal_env', 'block_tile_shape', 'read_raster', 'write_raster',
+                     'band_values', 'radiometric_scaling', 'intensity_stage', 'thermal_noise_stage',
+                     'calibration_stage', 'speckle_stage',
+                     'reproject_array', 'process_tile', 'stream_tiles', 'warp_tile', 'reproject_tiled', 'run_pipeline_tiled',
+                     'run_pipeline', 'speckle_filtering', 'geometric_correction'),
+    'warp_plan': ('LATTICE_STEP', 'WARP_BLOCK_SIZE', 'MAPPING_CACHE_BYTES', 'PLAN_CACHE_SIZE', 'MappingCache',
+                  'WarpPlan', 'get_warp_plan'),
+    'tile_scheduler': ('iter_windows', 'aligned_tile_shape', 'get_executor', 'run_tile', 'imap_tiles', 'map_tiles'),
+    'speckle_filters': ('SPECKLE_FILTERS', 'FROST_LEVELS', 'register_speckle_filter', 'window_shape', 'window_sum',
+                        'local_statistics', 'variation', 'lee_weighting', 'median_speckle_filter', 'lee_filter',
+                        'refined_lee_filter', 'exponential_sum', 'frost_filter', 'gamma_map_filter', 'speckle_filter'),
+    'thermal_noise': ('NOISE_MODES', 'ESTIMATE_CHUNK_ROWS', 'burst_starts', 'valid_pixels', 'NoiseAccumulator',
+                      'noise_field', 'estimate_thermal_noise', 'thermal_noise_removal'),
+    'calibration': ('CALIBRATION_TYPES', 'CALIBRATION_UNITS', 'CALIBRATION_CACHE_SIZE', 'CALIBRATION_BLOCK_LINES',
+                    'ALOS_CALIBRATION_FACTOR', 'TSX_INCIDENCE_SAMPLES', 'CalibrationLUT', 'local_tag', 'child_text',
+                    'lut_grid', 'read_s1_calibration', 'read_tsx_calibration', 'read_alos_calibration',
+                    'read_calibration', 'get_calibration', 'grid_weights', 'interpolate_lut', 'lut_gain', 'band_luts',
+                    'detected_intensity', 'calibrate'),
+    'output_format': ('OutputFormat', 'DB_SCALE', 'DB_NODATA', 'DEFAULT_BLOCKSIZE', 'OUTPUT_DTYPES', 'COMPRESSIONS',
+                      'SOURCE_LAYOUT_KEYS', 'get_output_format', 'output_blocksize', 'output_profile', 'encode_output',
+                      'decode_db', 'overview_factors', 'finish_output', 'open_output', 'write_output'),
+    'raster_memmap': ('ENVI_LAYOUTS', 'NATIVE_BYTE_ORDER', 'tiff_block_offset', 'tiff_layout', 'envi_layout',
+                      'memmap_raster', 'window_reader', 'create_raster_memmap'),
+    'geohash_array': ('BASE32', 'BASE32_CHARS', 'BASE32_LOOKUP', 'MAX_PRECISION', 'CHUNK_TO_CODE',
+                      'CODE_TO_LON_CHUNK', 'CODE_TO_LAT_CHUNK', 'precision_bits', 'quantize', 'encode_cells',
+                      'cells_to_codes', 'codes_to_cells', 'codes_to_geohashes', 'geohashes_to_codes', 'encode_array',
+                      'cell_bounds', 'geohash_bounds_array', 'decode_exactly_array', 'smallest_covering_geohashes'),
+    'geohash_cover': ('DEFAULT_MAX_PRECISION', 'EDGE_CHUNK_SIZE', 'children_cells', 'polygon_edges', 'bbox_relation',
+                      'polygon_relation', 'compact_cells', 'geohash_cover'),
+    'bounds_cache': ('CACHE_VERSION', 'DEFAULT_CACHE_PATH', 'COMMIT_INTERVAL', 'MISSING', 'file_content_hash',
+                     'BoundsCache'),
+    'geohash_index': ('DEFAULT_INDEX_PRECISION', 'INSERT_CHUNK_SIZE', 'bounds_to_cells', 'query_bounds',
+                      'GeohashIndex'),
+    'geohash_assign': ('FEATURE_CHUNK_SIZE', 'POINT_CHUNK_SIZE', 'BLOCK_CHUNK_SIZE', 'feature_bounds_array',
+                       'coordinates_to_wgs84', 'bounds_to_wgs84', 'bounds_geohashes', 'assign_feature_geohashes',
+                       'assign_point_geohashes', 'raster_blocks', 'assign_block_geohashes', 'assign_pixel_geohashes',
+                       'assign_geohashes'),
+    'geohash_partition': ('DEFAULT_PREFIX_LENGTH', 'POINT_BUFFER_SIZE', 'FEATURE_BUFFER_SIZE', 'UNASSIGNED_PARTITION',
+                          'MANIFEST_FILE', 'PartitionWriter', 'PointPartitionWriter', 'FeaturePartitionWriter',
+                          'partition_point_clouds', 'partition_vector_files'),
+    'geodata_to_geohash': ('DENSIFY_POINTS', 'TRANSFORMER_CACHE_SIZE', 'get_file_extension', 'open_tiff_file', 'open_vector_file', 'open_las_file',
+                           'open_fgb_file', 'load_tiff_bounds', 'load_vector_bounds', 'load_las_bounds',
+                           'load_fgb_bounds', 'get_image_bounds', 'get_geotagging', 'get_decimal_from_dms',
+                           'get_coordinates', 'load_and_calculate_union_bounds', 'calculate_initial_geohash',
+                           'check_coverage', 'generate_geohashes', 'find_smallest_geohash', 'check_coverage_array',
+                           'open_las_reader', 'check_file_extension', 'load_file_bounds', 'BoundsScan', 'scan_bounds',
+                           'read_fgb_header_bounds', 'geometry_coordinate_arrays', 'read_fgb_header',
+                           'flatbuffer_fields', 'read_fgb_header_crs', 'read_las_crs', 'get_wgs84_transformer',
+                           'transform_bounds_to_wgs84'),
+    'orbit': ('StateVectors', 'ORBIT_CACHE_SIZE', 'ACQUISITION_TIME_TAGS', 'parse_eof_time', 'read_orbit_file', 'Orbit',
+              'get_orbit', 'orbit_tags'),
+    's1_preprocessing': ('NOISE_TILE_SIZE', 'apply_orbit_file', 'remove_thermal_noise', 'radiometric_correction',
+                         'preprocess_s1'),
+    'alospalsar_preprocessing': ('preprocess_alos_palsar',),
+    'terrasarx_preprocessing': ('radiometric_calibration', 'preprocess_terra_sar_x'),
+}
+
+# Submodule of every public name
+_NAMES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+# Submodules, reachable as attributes as well
+_SUBMODULES = set(_EXPORTS) | {'batch'}
+
+__all__ = sorted(_NAMES)
+
+
+# Import a submodule the first time one of its names is used
+def __getattr__(name):
+    if name in _NAMES:
+        value = getattr(importlib.import_module(f'.{_NAMES[name]}', __name__), name)
+        globals()[name] = value  # later lookups no longer go through __getattr__
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_NAMES) | _SUBMODULES)
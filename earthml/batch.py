@@ -0,0 +1,191 @@
+'''
+BATCH PRE-PROCESSING OF MANY SAR SCENES ACROSS A PROCESS POOL.
+EVERY SCENE RUNS IN ITS OWN SCRATCH DIRECTORY, ITS STATUS IS REPORTED AS SOON AS IT FINISHES,
+AND A FAILING SCENE DOES NOT STOP THE REST OF THE BATCH.
+
+A scene is a dict with the keys 'sensor' ('s1', 'alos_palsar' or 'terra_sar_x'), 'input_file',
+'output_file' and 'dst_crs', plus 'orbit_file' for Sentinel-1 and optionally 'speckle_method',
+'speckle_size', 'output_format' (e.g. {"dtype": "db_int16", "cog": true}), 'gdal_threads',
+'calibration_file', 'calibration_type' and 'calibration_unit', and for Sentinel-1 'noise_mode' and
+'bursts'. From the command line:
+
+    earthml-batch scenes.json --workers 8 --scratch-dir /scratch
+
+where scenes.json holds a list of such dicts.
+'''
+
+import argparse
+import importlib
+import json
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import rasterio
+
+# Sensor name -> (module, pre-processing function)
+SENSORS = {
+    's1': ('.s1_preprocessing', 'preprocess_s1'),
+    'alos_palsar': ('.alospalsar_preprocessing', 'preprocess_alos_palsar'),
+    'terra_sar_x': ('.terrasarx_preprocessing', 'preprocess_terra_sar_x'),
+}
+
+# Keys every scene needs, and the extra keys of some sensors
+REQUIRED_KEYS = ('sensor', 'input_file', 'output_file', 'dst_crs')
+SENSOR_KEYS = {'s1': ('orbit_file',)}
+
+# Look up the pre-processing function of a sensor
+def get_preprocessor(sensor):
+    if sensor not in SENSORS:
+        raise ValueError(f"Invalid sensor '{sensor}'. The sensor must be one of {', '.join(SENSORS)}.")
+
+    # imported on demand, so e.g. ALOS PALSAR batches do not need the GDAL bindings of the S1 module
+    module_name, function_name = SENSORS[sensor]
+    return getattr(importlib.import_module(module_name, __package__), function_name)
+
+# Check that a scene holds the keys of its sensor, returning the error or None
+def scene_error(scene):
+    if not isinstance(scene, dict):
+        return f"ValueError: Invalid scene. A scene must be a dict, not {type(scene).__name__}."
+    missing = [key for key in REQUIRED_KEYS + SENSOR_KEYS.get(scene.get('sensor'), ()) if key not in scene]
+    if missing:
+        return f"ValueError: Invalid scene. The scene has no {', '.join(missing)}."
+    return None
+
+# Process a single scene in an isolated scratch directory
+def run_scene(scene, scratch, tile_size=None):
+    """
+    Pre-process one scene and return its status instead of raising.
+
+    Args:
+        scene (dict): The scene description.
+        scratch (str): The scratch directory of the scene. It is created and removed by the caller, so it
+            is also removed when the worker process running the scene dies.
+        tile_size (int, optional): Stream the scene in tiles of this size.
+
+    Returns:
+        dict: The scene with 'status' ('ok' or 'failed'), 'error' and 'seconds' added.
+    """
+    result = dict(scene, status='ok', error=None)
+    start = time.perf_counter()
+    try:
+        preprocess = get_preprocessor(scene['sensor'])
+        arguments = [scene['input_file'], scene['output_file'], scene['dst_crs']]
+        if scene['sensor'] == 's1':
+            arguments.insert(1, scene['orbit_file'])
+        options = {key: scene[key] for key in ('speckle_method', 'speckle_size', 'output_format', 'gdal_threads', 'noise_mode', 'bursts',
+                                                'calibration_file', 'calibration_type', 'calibration_unit') if key in scene}
+
+        # GDAL's own temporary files go to the scratch directory as well
+        with rasterio.Env(CPL_TMPDIR=scratch):
+            preprocess(*arguments, tile_size=tile_size, scratch_dir=scratch, **options)
+    except Exception as error:
+        result.update({'status': 'failed', 'error': f"{type(error).__name__}: {error}", 'traceback': traceback.format_exc()})
+
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+# Print the status of a finished scene
+def report_scene(scene, result):
+    message = f" ({result['error']})" if result['error'] else ''
+    name = scene.get('input_file', '<scene without input_file>') if isinstance(scene, dict) else repr(scene)
+    print(f"[{result['status'].upper()}] {name} in {result['seconds']:.1f} s{message}")
+
+# Run some of the scenes in one process pool
+def run_pool(scenes, indices, results, workers=None, scratch_root=None, tile_size=None):
+    """
+    Pre-process scenes[i] for every i of indices in a new process pool, storing their status in results.
+
+    Returns:
+        list of int: The indices of the scenes lost because a worker process died (e.g. killed when out of
+        memory or crashed in GDAL), which breaks the whole pool.
+    """
+    broken = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for n, i in enumerate(indices):
+            # the scratch directory is made here and removed below, even when the worker dies
+            scratch = tempfile.mkdtemp(prefix='earthml_', dir=scratch_root)
+            try:
+                futures[pool.submit(run_scene, scenes[i], scratch, tile_size)] = i, scratch
+            except BrokenProcessPool:
+                shutil.rmtree(scratch, ignore_errors=True)
+                broken.extend(indices[n:])
+                break
+        for future in as_completed(futures):
+            i, scratch = futures[future]
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool:
+                broken.append(i)
+                continue
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+            report_scene(scenes[i], results[i])
+    return broken
+
+# Process many scenes across a process pool
+def preprocess_batch(scenes, workers=None, scratch_root=None, tile_size=None):
+    """
+    Pre-process scenes concurrently, one scene per worker process.
+
+    A worker process that dies takes its pool down without telling which scene killed it, so the
+    scenes lost with the pool run again in a fresh pool, and those lost a second time one by one in
+    pools of their own. Only a scene that kills its own worker is reported as failed. A scene
+    without the keys of its sensor is reported as failed without running.
+
+    Args:
+        scenes (list of dict): The scene descriptions.
+        workers (int, optional): Number of worker processes. Defaults to all CPU cores.
+        scratch_root (str, optional): Directory for the per-scene scratch directories.
+        tile_size (int, optional): Stream each scene in tiles of this size to bound memory.
+
+    Returns:
+        list of dict: One status dict per scene, in the order of scenes.
+    """
+    results = [None] * len(scenes)
+    runnable = []
+    for i, scene in enumerate(scenes):
+        error = scene_error(scene)
+        if error is None:
+            runnable.append(i)
+            continue
+        results[i] = dict(scene if isinstance(scene, dict) else {'scene': scene}, status='failed', error=error, seconds=0.0)
+        report_scene(scene, results[i])
+    broken = run_pool(scenes, runnable, results, workers, scratch_root, tile_size)
+    if broken:
+        broken = run_pool(scenes, sorted(broken), results, workers, scratch_root, tile_size)
+    for i in sorted(broken):
+        if run_pool(scenes, [i], results, 1, scratch_root, tile_size):
+            results[i] = dict(scenes[i], status='failed', seconds=0.0,
+                              error='BrokenProcessPool: the worker process died (e.g. killed when out of memory or crashed)')
+            report_scene(scenes[i], results[i])
+    return results
+
+# Command Line Entry Point
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='earthml-batch', description='Pre-process a batch of SAR scenes.')
+    parser.add_argument('scenes', help='JSON file holding a list of scenes')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: all cores)')
+    parser.add_argument('--scratch-dir', default=None, help='directory for per-scene scratch space')
+    parser.add_argument('--tile-size', type=int, default=None, help='stream scenes in tiles of this size')
+    parser.add_argument('--report', default=None, help='write the per-scene status to this JSON file')
+    args = parser.parse_args(argv)
+
+    with open(args.scenes, 'r', encoding='utf-8') as fh:
+        scenes = json.load(fh)
+
+    results = preprocess_batch(scenes, args.workers, args.scratch_dir, args.tile_size)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+    failed = sum(result['status'] != 'ok' for result in results)
+    print(f"{len(results) - failed} of {len(results)} scenes pre-processed")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,270 @@
+'''
+THE GOAL OF THIS PYTHON SCRIPT IS TO KEEP A PERSISTENT SQLITE CACHE OF THE BOUNDS AND GEOHASHES OF GEOSPATIAL FILES,
+KEYED BY FILE IDENTITY (PATH, SIZE, MODIFICATION TIME AND AN OPTIONAL CONTENT HASH), SO UNCHANGED FILES ARE NEVER
+OPENED TWICE!
+'''
+
+
+
+
+
+# IMPORTING THE ESSENTIAL LIBRARIES
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+
+
+
+# CACHE SETTINGS
+CACHE_VERSION = 3  # bump when the meaning of the cached values changes, old caches are then discarded
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'earthml', 'bounds.sqlite')
+COMMIT_INTERVAL = 1000  # writes between two commits
+MISSING = object()  # returned by lookups that miss
+
+
+
+
+
+# FUNCTION 1: TO HASH THE CONTENT OF A FILE
+def file_content_hash(file, block_size = 1 << 20):
+    """
+        Calculates a BLAKE2b hash of the content of a file.
+
+        Args:
+            file (str): The file name.
+            block_size (int, optional): Number of bytes read at a time. Defaults to 1 MiB.
+
+        Returns:
+            str: The hexadecimal digest.
+    """
+    digest = hashlib.blake2b(digest_size = 20)
+    with open(file, 'rb') as fh:
+        for block in iter(lambda: fh.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+
+
+
+# CLASS 1: PERSISTENT BOUNDS AND GEOHASH CACHE
+class BoundsCache:
+    """
+        A persistent cache of per-file bounds and geohashes stored in SQLite.
+
+        An entry is valid while the path, size and modification time of the file (and its content hash when
+        content_hash is True) are unchanged. The cache can be shared by the threads of scan_bounds.
+
+        Args:
+            path (str, optional): The SQLite database file. Defaults to ~/.cache/earthml/bounds.sqlite.
+            max_entries (int, optional): Keep at most this many files, evicting the least recently used ones
+                                         on flush. Defaults to None (unbounded).
+            content_hash (bool, optional): Also compare a hash of the file content. Defaults to False.
+    """
+
+    def __init__(self, path = DEFAULT_CACHE_PATH, max_entries = None, content_hash = False):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+        self.path = path
+        self.max_entries = max_entries
+        self.content_hash = content_hash
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending_writes = 0
+        self._accessed = {}
+        self._connection = sqlite3.connect(path, check_same_thread = False)
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock:
+            version, = self._connection.execute('PRAGMA user_version').fetchone()
+            if version != CACHE_VERSION:
+                self._connection.execute('DROP TABLE IF EXISTS files')
+                self._connection.execute(f'PRAGMA user_version = {CACHE_VERSION}')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, content_hash TEXT, '
+                'bounds TEXT, geohashes TEXT, last_access REAL)'
+            )
+            self._connection.commit()
+
+    def file_key(self, file):
+        """
+            Calculates the identity of a file.
+
+            Args:
+                file (str): The file name.
+
+            Returns:
+                tuple: The absolute path, size, modification time in ns and content hash (or None).
+        """
+        stat = os.stat(file)
+        content = file_content_hash(file) if self.content_hash else None
+        return os.path.abspath(file), stat.st_size, stat.st_mtime_ns, content
+
+    def _lookup(self, key, column):
+        path, size, mtime_ns, content = key
+        with self._lock:
+            row = self._connection.execute(
+                f'SELECT size, mtime_ns, content_hash, {column} FROM files WHERE path = ?', (path,)
+            ).fetchone()
+            if row is None or row[:3] != (size, mtime_ns, content) or row[3] is None:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            self._accessed[path] = time.time()  # written on flush, not on every hit
+        return json.loads(row[3])
+
+    def _store(self, key, column, value):
+        path, size, mtime_ns, content = key
+        with self._lock:
+            row = self._connection.execute('SELECT size, mtime_ns, content_hash FROM files WHERE path = ?', (path,)).fetchone()
+            if row is not None and row != (size, mtime_ns, content):  # the file changed, drop its stale values
+                self._connection.execute('DELETE FROM files WHERE path = ?', (path,))
+            self._connection.execute(
+                'INSERT INTO files (path, size, mtime_ns, content_hash, last_access) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(path) DO NOTHING', (path, size, mtime_ns, content, time.time())
+            )
+            self._connection.execute(f'UPDATE files SET {column} = ?, last_access = ? WHERE path = ?', (json.dumps(value), time.time(), path))
+            self._pending_writes += 1
+            if self._pending_writes >= COMMIT_INTERVAL:
+                self._connection.commit()
+                self._pending_writes = 0
+
+    def get_bounds(self, file, loader, params = ''):
+        """
+            Returns the cached bounds of a file for the given parameters, or loads and caches them.
+
+            Args:
+                file (str): The file name.
+                loader (callable): Called with the file name on a miss, e.g. load_file_bounds.
+                params (str, optional): The parameters loader reads the bounds with, e.g. 'points' when the
+                                        points of a LAS file are scanned instead of its header. Defaults to ''.
+
+            Returns:
+                tuple or None: The bounds returned by loader.
+        """
+        key = self.file_key(file)
+        cached = self._lookup(key, 'bounds')
+        if cached is MISSING or params not in cached:
+            if cached is not MISSING:  # the file is cached for other parameters only
+                self.hits -= 1
+                self.misses += 1
+            bounds = loader(file)
+            cached = {} if cached is MISSING else cached
+            cached[params] = None if bounds is None else [float(value) for value in bounds]
+            self._store(key, 'bounds', cached)
+            return bounds
+        bounds = cached[params]
+        return None if bounds is None else tuple(bounds)
+
+    def get_geohash(self, file, params):
+        """
+            Returns the cached geohash result of a file for the given parameters.
+
+            Args:
+                file (str): The file name.
+                params (str): The parameters the geohash was computed with, e.g. '10/32'.
+
+            Returns:
+                str, list of str or MISSING: The cached result, or MISSING on a miss.
+        """
+        cached = self._lookup(self.file_key(file), 'geohashes')
+        if cached is MISSING or params not in cached:
+            return MISSING
+        return cached[params]
+
+    def put_geohash(self, file, params, geohash):
+        """
+            Caches the geohash result of a file for the given parameters.
+
+            Args:
+                file (str): The file name.
+                params (str): The parameters the geohash was computed with.
+                geohash (str or list of str): The result of find_smallest_geohash.
+        """
+        key = self.file_key(file)
+        with self._lock:
+            row = self._connection.execute('SELECT size, mtime_ns, content_hash, geohashes FROM files WHERE path = ?', (key[0],)).fetchone()
+        geohashes = json.loads(row[3]) if row is not None and row[:3] == key[1:] and row[3] else {}
+        geohashes[params] = geohash
+        self._store(key, 'geohashes', geohashes)
+
+    def invalidate(self, file = None):
+        """
+            Removes a file, or every file when file is None, from the cache.
+
+            Args:
+                file (str, optional): The file name. Defaults to None.
+        """
+        with self._lock:
+            if file is None:
+                self._connection.execute('DELETE FROM files')
+            else:
+                self._connection.execute('DELETE FROM files WHERE path = ?', (os.path.abspath(file),))
+            self._connection.commit()
+
+    def evict(self):
+        """
+            Removes the least recently used files beyond max_entries.
+
+            Returns:
+                int: The number of removed files.
+        """
+        if self.max_entries is None:
+            return 0
+        with self._lock:
+            cursor = self._connection.execute(
+                'DELETE FROM files WHERE path IN (SELECT path FROM files ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+            self._connection.commit()
+        return cursor.rowcount
+
+    def flush(self):
+        """
+            Writes pending changes and access times to disk and applies the size bound.
+        """
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+            self._connection.executemany('UPDATE files SET last_access = ? WHERE path = ?', [(when, path) for path, when in accessed.items()])
+            self._connection.commit()
+            self._pending_writes = 0
+        self.evict()
+
+    def stats(self):
+        """
+            Returns the hit/miss statistics of this cache object.
+
+            Returns:
+                dict: The number of hits, misses, cached files and the hit rate.
+        """
+        with self._lock:
+            entries, = self._connection.execute('SELECT COUNT(*) FROM files').fetchone()
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def close(self):
+        """
+            Flushes and closes the cache.
+        """
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+
+
+# END OF THE PYTHON SCRIPT
@@ -0,0 +1,285 @@
+'''
+RADIOMETRIC CALIBRATION OF SENTINEL-1, ALOS PALSAR AND TERRASAR-X SCENES FOR THE SAR PRE-PROCESSING PIPELINE.
+THE CALIBRATION ANNOTATION OF EVERY SENSOR IS PARSED INTO A SPARSE LOOK-UP TABLE (LUT) ON A GRID OF IMAGE LINES AND
+PIXELS, CACHED PER ANNOTATION FILE. THE LUT IS INTERPOLATED BILINEARLY TO FULL RESOLUTION ONE BLOCK AT A TIME AND IN TWO
+SEPARABLE STEPS: THE FEW GRID COLUMNS ARE FIRST INTERPOLATED TO THE LINES OF THE BLOCK, AND THE PIXELS THEN ONLY GATHER
+THEIR TWO NEIGHBOURING GRID COLUMNS, SO NO PER-PIXEL SEARCH OR FULL-SCENE GAIN IS EVER COMPUTED.
+THE OUTPUT IS SIGMA0, BETA0 OR GAMMA0 IN LINEAR OR DECIBEL UNITS. NODATA PIXELS ARE LEFT UNTOUCHED.
+'''
+
+import os
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+from rasterio.windows import Window
+from .stage_arrays import stage_output, working_dtype
+from .thermal_noise import valid_pixels
+
+# Backscatter coefficients and units of the calibrated output
+CALIBRATION_TYPES = ('sigma0', 'beta0', 'gamma0')
+CALIBRATION_UNITS = ('linear', 'db')
+
+# Number of parsed calibration files kept by get_calibration
+CALIBRATION_CACHE_SIZE = 16
+
+# Image lines calibrated at a time, so the gains and masks of a whole scene are never held in memory
+CALIBRATION_BLOCK_LINES = 1024
+
+# Calibration factor of ALOS PALSAR and PALSAR-2 level 1.5 products, in dB
+ALOS_CALIBRATION_FACTOR = -83.0
+
+# Range samples of the TerraSAR-X incidence angle grid
+TSX_INCIDENCE_SAMPLES = 64
+
+# A calibration LUT: the product and polarisation it belongs to, the sorted image lines (m,) and
+# pixels (n,) of its grid, a dict of (m, n) grids per calibration type, and the exponent that turns
+# an interpolated value into the gain applied to |DN|^2 (-2 for the Sentinel-1 A^2 divisor, 1 for gains)
+CalibrationLUT = namedtuple('CalibrationLUT', ['product', 'polarisation', 'lines', 'pixels', 'values', 'exponent'])
+
+# Tag of an XML element without its namespace
+def local_tag(element):
+    return element.tag.rsplit('}', 1)[-1]
+
+# Text of the first child of an XML element with a tag, without its namespace
+def child_text(element, tag, default=None):
+    for child in element:
+        if local_tag(child) == tag:
+            return child.text.strip() if child.text else default
+    return default
+
+# Grid of a LUT with at least two points along each axis, so every position has two neighbours
+def lut_grid(lines, pixels, values):
+    lines, pixels = np.asarray(lines, dtype=np.float64), np.asarray(pixels, dtype=np.float64)
+    values = {key: np.asarray(grid, dtype=np.float64).reshape(len(lines), len(pixels)) for key, grid in values.items()}
+    if len(lines) == 1:
+        lines = np.append(lines, lines[0] + 1)
+        values = {key: np.repeat(grid, 2, axis=0) for key, grid in values.items()}
+    if len(pixels) == 1:
+        pixels = np.append(pixels, pixels[0] + 1)
+        values = {key: np.repeat(grid, 2, axis=1) for key, grid in values.items()}
+    return lines, pixels, values
+
+# Read Sentinel-1 Calibration
+def read_s1_calibration(calibration_file):
+    """Parse the calibration vectors of a Sentinel-1 calibration annotation (calibration-*.xml), streaming its XML."""
+    header, lines, pixels, values = {}, [], [], {'sigma0': [], 'beta0': [], 'gamma0': []}
+    for _, element in ET.iterparse(calibration_file):
+        tag = local_tag(element)
+        if tag == 'calibrationVector':
+            fields = {local_tag(child): child.text for child in element}
+            lines.append(int(fields['line']))
+            pixels.append(np.array(fields['pixel'].split(), dtype=np.float64))
+            for key, field in (('sigma0', 'sigmaNought'), ('beta0', 'betaNought'), ('gamma0', 'gamma')):
+                values[key].append(np.array(fields[field].split(), dtype=np.float64))
+            element.clear()
+        elif tag in ('missionId', 'productType', 'polarisation', 'swath', 'startTime'):
+            header[tag] = element.text.strip()
+    if not lines:
+        raise ValueError("Invalid calibration file. The calibration file must hold at least one calibrationVector.")
+
+    # the vectors normally share their pixels; any that do not are resampled onto those of the first
+    grid = pixels[0]
+    for key in values:
+        values[key] = [vector if len(columns) == len(grid) and np.array_equal(columns, grid) else np.interp(grid, columns, vector)
+                       for columns, vector in zip(pixels, values[key])]
+    order = np.argsort(lines, kind='stable')
+    product = '_'.join(header[key] for key in ('missionId', 'productType', 'swath', 'polarisation', 'startTime') if key in header)
+    lines, grid, values = lut_grid(np.array(lines)[order], grid, {key: np.array(vectors)[order] for key, vectors in values.items()})
+    return (CalibrationLUT(product or os.path.basename(calibration_file), header.get('polarisation'), lines, grid, values, -2),)
+
+# Read TerraSAR-X Calibration
+def read_tsx_calibration(annotation_file):
+    """
+    Parse the calibration constants of a TerraSAR-X annotation (the main .xml of the product), one LUT per
+    polarisation layer.
+
+    beta0 is calFactor * |DN|^2, and sigma0 and gamma0 scale it with the sine and tangent of the incidence
+    angle, interpolated between the scene corners (or taken at the scene centre).
+    """
+    root = ET.parse(annotation_file).getroot()
+    constants, corners, center, product = [], [], None, None
+    for element in root.iter():
+        tag = local_tag(element)
+        if tag == 'calibrationConstant':
+            constants.append((child_text(element, 'polLayer'), float(child_text(element, 'calFactor'))))
+        elif tag == 'sceneCornerCoord':
+            corners.append(tuple(float(child_text(element, key)) for key in ('refRow', 'refColumn', 'incidenceAngle')))
+        elif tag == 'sceneCenterCoord':
+            center = float(child_text(element, 'incidenceAngle'))
+        elif tag == 'sceneID' and product is None:
+            product = element.text.strip()
+    if not constants:
+        raise ValueError("Invalid annotation file. The annotation file must hold at least one calibrationConstant.")
+
+    # incidence angles at the first and last line, sampled across the range; refRow and refColumn are 1-based
+    rows, cols = sorted({corner[0] for corner in corners}), sorted({corner[1] for corner in corners})
+    if len(corners) == 4 and len(rows) == 2 and len(cols) == 2:
+        angle = {(row, col): incidence for row, col, incidence in corners}
+        lines, pixels = np.array(rows) - 1, np.linspace(cols[0], cols[1], TSX_INCIDENCE_SAMPLES) - 1
+        incidence = np.array([np.interp(pixels + 1, cols, [angle[row, cols[0]], angle[row, cols[1]]]) for row in rows])
+    elif center is not None:
+        lines, pixels, incidence = np.zeros(1), np.zeros(1), np.array([[center]])
+    else:
+        raise ValueError("Invalid annotation file. The annotation file must hold the incidence angles of the scene.")
+    incidence = np.radians(incidence)
+
+    luts = []
+    for polarisation, factor in constants:
+        values = {'sigma0': factor * np.sin(incidence), 'beta0': np.full(incidence.shape, factor), 'gamma0': factor * np.tan(incidence)}
+        luts.append(CalibrationLUT(product or os.path.basename(annotation_file), polarisation, *lut_grid(lines, pixels, values), 1))
+    return tuple(luts)
+
+# Read ALOS PALSAR Calibration
+def read_alos_calibration(summary_file):
+    """
+    Parse the calibration factor of an ALOS PALSAR product from its summary.txt (ALOS_CALIBRATION_FACTOR
+    when it has none). sigma0 is 10 ** (CF / 10) * |DN|^2 for every band.
+    """
+    summary = {}
+    with open(summary_file) as fh:
+        for line in fh:
+            if '=' in line:
+                key, value = line.split('=', 1)
+                summary[key.strip()] = value.strip().strip('"')
+    factors = [value for key, value in summary.items() if key.endswith('CalibrationFactor')]
+    factor = float(factors[0]) if factors else ALOS_CALIBRATION_FACTOR
+    product = summary.get('Scs_SceneID') or summary.get('Odi_SceneID') or os.path.basename(os.path.dirname(os.path.abspath(summary_file)))
+    values = {'sigma0': np.array([[10 ** (factor / 10)]])}
+    return (CalibrationLUT(product, None, *lut_grid([0], [0], values), 1),)
+
+# Read the calibration of any supported sensor
+def read_calibration(calibration_file):
+    """Parse a Sentinel-1 calibration annotation, a TerraSAR-X annotation or an ALOS PALSAR summary into a tuple of LUTs."""
+    with open(calibration_file, 'rb') as fh:
+        xml = fh.read(64).lstrip().startswith(b'<')
+    if not xml:
+        return read_alos_calibration(calibration_file)
+    _, root = next(ET.iterparse(calibration_file, events=('start',)))
+    readers = {'calibration': read_s1_calibration, 'level1Product': read_tsx_calibration}
+    if local_tag(root) not in readers:
+        raise ValueError("Invalid calibration file. The calibration file must be a Sentinel-1 calibration annotation, "
+                         "a TerraSAR-X annotation or an ALOS PALSAR summary.")
+    return readers[local_tag(root)](calibration_file)
+
+@lru_cache(maxsize=CALIBRATION_CACHE_SIZE)
+def _cached_calibration(calibration_file, modified, size):
+    return read_calibration(calibration_file)
+
+# Cached Calibration
+def get_calibration(calibration_file):
+    """Return the LUTs of a calibration file, parsing the file only the first time (or when it changes)."""
+    stat = os.stat(calibration_file)
+    return _cached_calibration(os.path.abspath(calibration_file), stat.st_mtime_ns, stat.st_size)
+
+# Interpolation index and weight of positions on a sorted grid: a position lies between grid[index]
+# and grid[index + 1], at weight from the first; positions beyond the grid take its first or last value
+def grid_weights(grid, positions):
+    index = np.clip(np.searchsorted(grid, positions, side='right') - 1, 0, len(grid) - 2)
+    weight = (positions - grid[index]) / (grid[index + 1] - grid[index])
+    return index, np.clip(weight, 0.0, 1.0)
+
+# Bilinear interpolation of a LUT grid to every pixel of a window
+def interpolate_lut(lines, pixels, values, window, dtype=np.float32):
+    """
+    Interpolate an (m, n) grid given at lines (m,) and pixels (n,) to the (height, width) pixels of a window.
+
+    The interpolation is separable: the grid is first interpolated to the lines of the window, an
+    (height, n) array, and every pixel then blends the two grid columns around it.
+    """
+    i, t = grid_weights(lines, window.row_off + np.arange(window.height, dtype=np.float64))
+    j, u = grid_weights(pixels, window.col_off + np.arange(window.width, dtype=np.float64))
+    along = (values[i] * (1 - t)[:, None] + values[i + 1] * t[:, None]).astype(dtype)
+    step = np.diff(along, axis=1)
+    result = step[:, j]
+    result *= u.astype(dtype)
+    result += along[:, j]
+    return result
+
+# Gain applied to |DN|^2 over a window
+def lut_gain(lut, window, calibration_type='sigma0', dtype=np.float32):
+    if calibration_type not in lut.values:
+        raise ValueError(f"Invalid calibration type. The calibration of {lut.product} only provides "
+                         f"{', '.join(key for key in CALIBRATION_TYPES if key in lut.values)}.")
+    gain = interpolate_lut(lut.lines, lut.pixels, lut.values[calibration_type], window, dtype)
+    if lut.exponent == -2:
+        np.multiply(gain, gain, out=gain)
+        np.reciprocal(gain, out=gain)
+    elif lut.exponent != 1:
+        np.power(gain, lut.exponent, out=gain)
+    return gain
+
+# LUT of every band: a single LUT applies to all bands, otherwise there is one per band
+def band_luts(luts, bands):
+    luts = (luts,) if isinstance(luts, CalibrationLUT) else tuple(luts)
+    if len(luts) == 1:
+        return luts * bands
+    if len(luts) != bands:
+        raise ValueError(f"Invalid calibration. The calibration must hold one LUT or one LUT per band ({bands}), not {len(luts)}.")
+    return luts
+
+# Detected Intensity Stage
+def detected_intensity(image, context=None):
+    """
+    Square the amplitude DNs of every band (|DN|^2 for complex pixels) into intensities, leaving nodata
+    pixels untouched, so that thermal noise is subtracted from intensities before calibrate(amplitude=False).
+    """
+    context = context or {}
+    nodata = context.get('profile', {}).get('nodata')
+    valid = valid_pixels(image, nodata) if nodata is not None else True
+    intensity = stage_output(image, context)
+    if intensity is None:
+        intensity = np.empty(image.shape, dtype=working_dtype(image))
+        np.copyto(intensity, np.abs(image) if np.iscomplexobj(image) else image, casting='unsafe')
+    np.square(intensity, out=intensity, where=valid)
+    return intensity
+
+# Radiometric Calibration Stage
+def calibrate(image, context=None, luts=(), calibration_type='sigma0', unit='linear', amplitude=True):
+    """
+    Calibrate every band to sigma0, beta0 or gamma0 in 'linear' or 'db' units, leaving nodata pixels untouched.
+
+    luts holds one CalibrationLUT for all bands or one per band, and the gain of a pixel is
+    interpolated at its position in the scene (context['window'] for a tile), one block of
+    CALIBRATION_BLOCK_LINES lines at a time, also for a whole scene. With amplitude=True the
+    image holds amplitude DNs, which are squared first; otherwise it already holds intensities.
+    Negative values (e.g. where noise removal took away more than the signal) have no backscatter and
+    are clipped to 0, whose decibel value is -inf.
+    """
+    if calibration_type not in CALIBRATION_TYPES:
+        raise ValueError(f"Invalid calibration type. The calibration type must be one of {', '.join(CALIBRATION_TYPES)}.")
+    if unit not in CALIBRATION_UNITS:
+        raise ValueError(f"Invalid unit. The unit must be one of {', '.join(CALIBRATION_UNITS)}.")
+    context = context or {}
+    stack = image if image.ndim == 3 else image[None]
+    window = context.get('window') or Window(0, 0, stack.shape[-1], stack.shape[-2])
+    nodata = context.get('profile', {}).get('nodata')
+
+    calibrated = stage_output(stack, context)
+    in_place = calibrated is not None
+    if not in_place:
+        calibrated = np.empty(stack.shape, dtype=working_dtype(stack))
+    luts = band_luts(luts, stack.shape[0])
+    height = stack.shape[-2]
+    for row in range(0, height, CALIBRATION_BLOCK_LINES):
+        lines = slice(row, min(row + CALIBRATION_BLOCK_LINES, height))
+        block = Window(window.col_off, window.row_off + row, window.width, lines.stop - row)
+        gains = {}
+        for band, lut in enumerate(luts):
+            # bands sharing a LUT (e.g. the polarisations of an ALOS product) share its gain
+            if id(lut) not in gains:
+                gains[id(lut)] = lut_gain(lut, block, calibration_type, calibrated.dtype)
+            source = stack[band, lines]
+            valid = valid_pixels(source, nodata) if nodata is not None else True
+            values = calibrated[band, lines]
+            if not in_place:
+                np.copyto(values, np.abs(source) if np.iscomplexobj(source) else source, casting='unsafe')
+            np.maximum(values, 0, out=values, where=valid)
+            if amplitude:
+                np.square(values, out=values, where=valid)
+            np.multiply(values, gains[id(lut)], out=values, where=valid)
+            if unit == 'db':
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    np.log10(values, out=values, where=valid)
+                np.multiply(values, 10, out=values, where=valid)
+    return calibrated if image.ndim == 3 else calibrated[0]
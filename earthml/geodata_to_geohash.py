@@ -8,13 +8,26 @@ GEOSPATIAL DATASET IN DIFFERENT FORMATS INCLUDING .shp, .geojson, .tif, .las, .p
 
 
 # IMPORTING THE ESSENTIAL LIBRARIES
+# (fiona, rasterio, laspy, pyproj and Pillow are imported by the functions that use them, so that
+# importing this script stays fast and works on hosts without the GDAL bindings)
 import os
-import fiona
-import rasterio
-import pygeohash as gh
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
-import laspy
+import struct
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from .geohash_array import encode_array, geohash_bounds_array, smallest_covering_geohashes
+from .geohash_cover import geohash_cover
+from .bounds_cache import MISSING
+
+
+
+
+
+# REPROJECTION SETTINGS
+DENSIFY_POINTS = 21  # points inserted along every edge of a bounding box before it is reprojected
+TRANSFORMER_CACHE_SIZE = 64  # number of source CRSs whose transformer to WGS84 is kept
 
 
 
@@ -48,6 +61,7 @@ def open_tiff_file(tiff_file):
         Returns:
             rasterio.io.DatasetReader: A file object representing the opened GeoTIFF file.
     """
+    import rasterio
     return rasterio.open(tiff_file)
 
 
@@ -65,6 +79,7 @@ def open_vector_file(vector_file):
         Returns:
             geopandas.geodataframe.GeoDataFrame: A GeoDataFrame object representing the opened vector file.
     """
+    import fiona
     return fiona.open(vector_file, 'r')
 
 
@@ -82,6 +97,7 @@ def open_las_file(las_file):
     Returns:
         laspy.LasData.LasData: A file object representing the opened LAS file.
     """
+    import laspy
     return laspy.read(las_file)
 
 
@@ -99,6 +115,7 @@ def open_fgb_file(fgb_file):
         Returns:
             geopandas.geodataframe.GeoDataFrame: A GeoDataFrame object representing the opened FlatGeobuf file.
     """
+    import fiona
     return fiona.open(fgb_file, 'r')
 
 
@@ -106,87 +123,113 @@ def open_fgb_file(fgb_file):
 
 
 # FUNCTION 6: TO GET BOUNDS OF A GEOTIFF FILE
-def load_tiff_bounds(tiff_file):
+def load_tiff_bounds(tiff_file, to_wgs84 = True):
     """
-        Get the geographical bounds of a GeoTIFF file.
+        Get the geographical bounds of a GeoTIFF file. No pixels are read.
 
         Args:
             tiff_file (str): The name of the GeoTIFF file.
+            to_wgs84 (bool, optional): Reproject the bounds from the CRS of the file to lon/lat. Defaults to True.
 
         Returns:
             tuple: A tuple of four values representing the geographical bounds of the data in the file.
     """
     with open_tiff_file(tiff_file) as src:
-        bounds = src.bounds
-    return bounds
+        bounds, crs = src.bounds, src.crs.to_wkt() if src.crs else None
+    return transform_bounds_to_wgs84(bounds, crs) if to_wgs84 else tuple(bounds)
 
 
 
 
 
 # FUNCTION 7: TO GET BOUNDS OF A SHAPEFILE OR GEOJSON FILE
-def load_vector_bounds(vector_file):
+def load_vector_bounds(vector_file, to_wgs84 = True):
     """
         Get the geographical bounds of a vector file.
 
         Args:
             vector_file (str): The name of the vector file.
+            to_wgs84 (bool, optional): Reproject the bounds from the CRS of the file to lon/lat. Defaults to True.
 
         Returns:
             tuple: A tuple of four values representing the geographical bounds of the data in the file.
     """
     with open_vector_file(vector_file) as src:
-        bounds = src.bounds
-    return bounds
+        bounds, crs = src.bounds, src.crs_wkt or None
+    return transform_bounds_to_wgs84(bounds, crs) if to_wgs84 else tuple(bounds)
 
 
 
 
 
 # FUNCTION 8: TO GET BOUNDS OF POINT CLOUD FILE
-def load_las_bounds(las_file):
+def load_las_bounds(las_file, trust_header = True, chunk_size = 1000000, to_wgs84 = True):
     """
-    Get the geographical bounds of a LAS file.
+    Get the geographical bounds of a LAS or LAZ file.
+
+    Only the header is read by default, so no points are decompressed or loaded. For files whose
+    header extent cannot be trusted, the points are streamed in chunks and their extent is computed.
 
     Args:
-        las_file (str): The name of the LAS file.
+        las_file (str): The name of the LAS or LAZ file.
+        trust_header (bool, optional): Use the extent stored in the header. Defaults to True.
+        chunk_size (int, optional): Number of points per chunk when the header is not trusted. Defaults to 1000000.
+        to_wgs84 (bool, optional): Reproject the bounds from the CRS of the file to lon/lat. Defaults to True.
 
     Returns:
         tuple: A tuple of four values representing the 2D geographical bounds of the data in the file.
     """
-    src = open_las_file(las_file)
-    min_x, min_y, _ = src.header.min
-    max_x, max_y, _ = src.header.max
-    return min_x, min_y, max_x, max_y
+    with open_las_reader(las_file) as src:
+        crs = read_las_crs(src.header) if to_wgs84 else None
+        if trust_header:
+            min_x, min_y, _ = src.header.mins
+            max_x, max_y, _ = src.header.maxs
+        else:
+            min_x, min_y, max_x, max_y = np.inf, np.inf, -np.inf, -np.inf
+            for points in src.chunk_iterator(chunk_size):
+                x, y = np.asarray(points.x), np.asarray(points.y)
+                if x.size:
+                    min_x, max_x = min(min_x, x.min()), max(max_x, x.max())
+                    min_y, max_y = min(min_y, y.min()), max(max_y, y.max())
+    return transform_bounds_to_wgs84((min_x, min_y, max_x, max_y), crs)
 
 
 
 
 
 # FUNCTION 9: TO GET BOUNDS OF A .FGB FILE
-def load_fgb_bounds(fgb_file):
+def load_fgb_bounds(fgb_file, to_wgs84 = True):
     """
         Get the geographical bounds of a FlatGeobuf file.
 
+        The bounds are read from the envelope in the file header or from the root node of the packed
+        R-tree index when present. Otherwise the coordinates of all features are scanned with NumPy.
+
         Args:
             fgb_file (str): The name of the FlatGeobuf file.
+            to_wgs84 (bool, optional): Reproject the bounds from the CRS of the file to lon/lat. Defaults to True.
 
         Returns:
             tuple: A tuple of four values representing the geographical bounds of the data in the file.
     """
+    crs = read_fgb_header_crs(fgb_file) if to_wgs84 else None
+    bounds = read_fgb_header_bounds(fgb_file)
+    if bounds is not None:
+        return transform_bounds_to_wgs84(bounds, crs)
+
+    minx, miny, maxx, maxy = np.inf, np.inf, -np.inf, -np.inf
     with open_fgb_file(fgb_file) as src:
-        minx, miny, maxx, maxy = float('inf'), float('inf'), float('-inf'), float('-inf')
-        for feature in src:
-            bounds = feature['geometry']['coordinates']
-            for polygon in bounds:
-                for coords in polygon:
-                    for coord in coords:
-                        x, y = coord
-                        minx = min(minx, x)
-                        maxx = max(maxx, x)
-                        miny = min(miny, y)
-                        maxy = max(maxy, y)
-    return minx, miny, maxx, maxy
+        features = iter(src)
+        while True:
+            chunk = list(islice(features, 10000))  # Reduce 10000 features at a time
+            if not chunk:
+                break
+            arrays = [coords for feature in chunk for coords in geometry_coordinate_arrays(feature['geometry'])]
+            if arrays:
+                coords = np.concatenate(arrays)
+                minx, miny = min(minx, coords[:, 0].min()), min(miny, coords[:, 1].min())
+                maxx, maxy = max(maxx, coords[:, 0].max()), max(maxy, coords[:, 1].max())
+    return transform_bounds_to_wgs84((minx, miny, maxx, maxy), crs)
 
 
 
@@ -204,6 +247,7 @@ def get_image_bounds(image_file):
             tuple: A tuple of four values representing the geographical bounds of the image,
                    or None if the image does not have geolocation data.
     """
+    from PIL import Image
     img = Image.open(image_file)
     geotags = get_geotagging(img)
     if geotags is None:
@@ -227,6 +271,7 @@ def get_geotagging(img):
         Returns:
             dict or None: A dictionary containing the geotagging data, or None if no geotagging data can be found.
     """
+    from PIL.ExifTags import TAGS, GPSTAGS
     exif = img._getexif()
     if not exif:
         return None  # No EXIF metadata found
@@ -295,48 +340,31 @@ def get_coordinates(geotags):
 
 
 # FUNCTION 14: TO IDENTIFY THE EXTREMES FOR MULTIPLE FILES
-def load_and_calculate_union_bounds(files):
+def load_and_calculate_union_bounds(files, trust_las_header = True, max_workers = 16, cache = None):
     """
         Calculates the smallest bounding box that includes all points in the given files.
 
         Args:
             files (list of str): A list of file names.
+            trust_las_header (bool, optional): Read LAS/LAZ bounds from the header only. Defaults to True.
+            max_workers (int, optional): Number of files opened concurrently. Defaults to 16.
+            cache (BoundsCache, optional): A persistent cache of per-file bounds. Defaults to None.
 
         Returns:
             tuple or None: A tuple of four values representing the geographical bounds of the data in the files,
                            or None if no geolocation data is found in any of the files.
     """
-    minx, miny, maxx, maxy = [], [], [], []
-    no_geolocation_data = False
     for file in files:
-        extension = get_file_extension(file)
-        if extension in ['.shp', '.geojson']:
-            bounds = load_vector_bounds(file)
-        elif extension == '.tif':
-            bounds = load_tiff_bounds(file)
-        elif extension == '.fgb':
-            bounds = load_fgb_bounds(file)
-        elif extension == '.las':
-            bounds = load_las_bounds(file)
-        elif extension in ['.png', '.jpeg', '.jpg']:
-            bounds = get_image_bounds(file)
-            if bounds is None:  # No geolocation data found
-                print(f"No geolocation data found in {file}")
-                no_geolocation_data = True
-                continue
-        else:
-            raise ValueError("Invalid file type. The file must be a Shapefile (.shp), GeoJSON (.geojson), GeoTiff (.tif), Point Cloud (.las), png (.png), or jpeg (.jpeg).")
-
-        minx.append(bounds[0])
-        miny.append(bounds[1])
-        maxx.append(bounds[2])
-        maxy.append(bounds[3])
+        check_file_extension(file)  # Fail on unsupported files before opening any of them
 
-    if no_geolocation_data and not (minx and miny and maxx and maxy):  # No bounds were added
-        return None
+    scan = scan_bounds(files, max_workers, trust_las_header, cache)
+    for file in files:
+        if file in scan.errors:
+            raise scan.errors[file]
+        if scan.bounds[file] is None:  # No geolocation data found
+            print(f"No geolocation data found in {file}")
 
-    union_bounds = (min(minx), min(miny), max(maxx), max(maxy))
-    return union_bounds
+    return scan.union
 
 
 
@@ -356,7 +384,7 @@ def calculate_initial_geohash(bounds, precision):
     """
     center_lng = (bounds[0] + bounds[2]) / 2  # calculate center longitude
     center_lat = (bounds[1] + bounds[3]) / 2  # calculate center latitude
-    geohash = gh.encode(center_lat, center_lng, precision = precision)  # calculate geohash of center point with initial precision
+    geohash = str(encode_array(center_lat, center_lng, precision = precision)[0])  # calculate geohash of center point with initial precision
     return geohash
 
 
@@ -375,16 +403,7 @@ def check_coverage(geohash, bounds):
         Returns:
             bool: True if the geohash completely covers the bounding box, False otherwise.
     """
-    lat_centroid, lon_centroid, lat_err, lon_err = gh.decode_exactly(geohash)  # decode geohash to its bounding box
-    gh_bounds = {
-        's': lat_centroid - lat_err,
-        'w': lon_centroid - lon_err,
-        'n': lat_centroid + lat_err,
-        'e': lon_centroid + lon_err
-    }
-    covers_area = gh_bounds['s'] <= bounds[1] and gh_bounds['w'] <= bounds[0] and gh_bounds['n'] >= bounds[3] and gh_bounds['e'] >= bounds[2]
-    # print(f"Does geohash {geohash} cover the entire area? {'Yes' if covers_area else 'No'}")
-    return covers_area
+    return bool(check_coverage_array([geohash], bounds)[0])
 
 
 
@@ -392,46 +411,37 @@ def check_coverage(geohash, bounds):
 
 # FUNCTION 17: Function to identify a list of smallest possible geohash which covers a given study area
 # This function is useful when we are not able to bound a study area in 1 geohash
-def generate_geohashes(bounds):
+def generate_geohashes(bounds, precision = None, max_cells = 32):
     """
-        Generates a list of geohashes that together cover a bounding box.
+        Generates a complete, minimal list of geohashes that together cover a bounding box.
 
         Args:
             bounds (tuple): A tuple of four values representing the geographical bounds.
+            precision (int, optional): The finest geohash precision to use. Defaults to None (no limit besides max_cells).
+            max_cells (int, optional): The maximum number of geohashes. Defaults to 32.
 
         Returns:
             list of str: A list of geohashes that together cover the bounding box.
     """
-    lat_step = (bounds[3] - bounds[1]) / 5.0
-    lon_step = (bounds[2] - bounds[0]) / 5.0
-    geohashes = set()  # change this to a set to ensure uniqueness
-
-    for lat in range(0, 5):
-        for lon in range(0, 5):
-            min_lat = bounds[1] + lat * lat_step
-            max_lat = min_lat + lat_step
-            min_lon = bounds[0] + lon * lon_step
-            max_lon = min_lon + lon_step
-            center_lat = (min_lat + max_lat) / 2.0
-            center_lon = (min_lon + max_lon) / 2.0
-            geohash = gh.encode(center_lat, center_lon, precision = 1)
-            geohashes.add(geohash)  # add the geohash to the set
+    return geohash_cover(bounds, precision = precision, max_cells = max_cells)
 
-    return list(geohashes)  # convert back to a list for the return
 
 
 
 
-
-# FUNCTION 18: IDENTIFY THE EXTREMES, PRECISION ADJUSTMENTS AND ITERATIVE REFINEMENT
+# FUNCTION 18: IDENTIFY THE EXTREMES AND THE COMMON GEOHASH PREFIX OF THE CORNERS
 # FUNCTION TO IDENTIFY THE SMALLEST POSSIBLE GEOHASH WHICH COVERS A GIVEN STUDY AREA
-def find_smallest_geohash(dataset, initial_precision = 10):
+def find_smallest_geohash(dataset, initial_precision = 10, max_cells = 32, max_workers = 16, cache = None):
     """
         Finds the smallest geohash that covers the geographical area represented by the given dataset.
 
         Args:
             dataset (list of str): A list of file names representing the dataset.
-            initial_precision (int, optional): The initial geohash precision level. Defaults to 10.
+            initial_precision (int, optional): The finest geohash precision level. Defaults to 10.
+            max_cells (int, optional): The maximum number of geohashes returned when a single geohash cannot
+                                       cover the entire area. Defaults to 32.
+            max_workers (int, optional): Number of files opened concurrently. Defaults to 16.
+            cache (BoundsCache, optional): A persistent cache of per-file bounds and geohashes. Defaults to None.
 
         Returns:
             str or list of str: The smallest geohash that covers the geographical area of the dataset,
@@ -442,32 +452,419 @@ def find_smallest_geohash(dataset, initial_precision = 10):
     if isinstance(dataset, str):
         dataset = [dataset]  # If a single file is provided, turn it into a list
 
-    bounds = load_and_calculate_union_bounds(dataset)
+    # The geohash of a single unchanged file is taken from the cache
+    params = f'{initial_precision}/{max_cells}'
+    if cache is not None and len(dataset) == 1 and get_file_extension(dataset[0]) in ['.shp', '.geojson', '.tif', '.fgb', '.las', '.laz']:
+        smallest_geohash = cache.get_geohash(dataset[0], params)
+        if smallest_geohash is not MISSING:
+            return smallest_geohash
+
+    bounds = load_and_calculate_union_bounds(dataset, max_workers = max_workers, cache = cache)
 
     if bounds is None:  # No geolocation data found in any JPG/PNG file
         return '7zzzzzzzzz'
 
-    geohash = calculate_initial_geohash(bounds, initial_precision)  # Calculate initial geohash
-    covers_area = check_coverage(geohash, bounds)  # Test coverage
-
-    # If the geohash bounding box doesn't cover the entire city, decrement precision
-    while not covers_area and initial_precision > 1:  # Precision adjustment
-        initial_precision -= 1  # Iterative refinement
-        geohash = calculate_initial_geohash(bounds, initial_precision)
-        covers_area = check_coverage(geohash, bounds)
+    # The smallest covering geohash is the longest common prefix of the geohashes of the south-west
+    # and north-east corners, found in one pass instead of testing one precision after the other
+    geohash = str(smallest_covering_geohashes(bounds, initial_precision)[0])
+    covers_area = geohash != ''
 
     # Ensure the final geohash covers the entire area
     if covers_area:
         smallest_geohash = geohash
     else:
-        geohashes = generate_geohashes(bounds)  # Here we generate all geohashes for the area
+        geohashes = generate_geohashes(bounds, initial_precision, max_cells)  # Here we generate all geohashes for the area
         # If there's only one geohash, return it as a string, and not a list
         smallest_geohash = geohashes[0] if len(geohashes) == 1 else geohashes
 
+    if cache is not None and len(dataset) == 1:
+        cache.put_geohash(dataset[0], params, smallest_geohash)
+        cache.flush()
+
     return smallest_geohash
 
 
 
 
 
+# FUNCTION 19: TEST COVERAGE OF MANY GEOHASHES
+def check_coverage_array(geohashes, bounds):
+    """
+        Checks which of many geohashes completely cover a bounding box.
+
+        Args:
+            geohashes (list of str): The geohashes.
+            bounds (tuple): A tuple of four values representing the geographical bounds.
+
+        Returns:
+            numpy.ndarray: A boolean array, True where the geohash completely covers the bounding box.
+    """
+    west, south, east, north = geohash_bounds_array(geohashes)  # decode geohashes to their bounding boxes
+    return (south <= bounds[1]) & (west <= bounds[0]) & (north >= bounds[3]) & (east >= bounds[2])
+
+
+
+
+
+# FUNCTION 20: TO OPEN A POINT CLOUD FILE WITHOUT READING ITS POINTS
+def open_las_reader(las_file):
+    """
+    Opens a LAS or LAZ file for streaming. Only the header is read until points are requested.
+
+    Args:
+        las_file (str): The name of the LAS or LAZ file.
+
+    Returns:
+        laspy.LasReader: A reader with the header and a chunk_iterator over the points.
+    """
+    import laspy
+    return laspy.open(las_file)
+
+
+
+
+
+# FUNCTION 21: TO CHECK THAT A FILE TYPE IS SUPPORTED
+def check_file_extension(file):
+    """
+        Checks that the bounds of a file can be loaded.
+
+        Args:
+            file (str): The file name.
+
+        Returns:
+            str: The file extension.
+    """
+    extension = get_file_extension(file)
+    if extension not in ['.shp', '.geojson', '.tif', '.fgb', '.las', '.laz', '.png', '.jpeg', '.jpg']:
+        raise ValueError("Invalid file type. The file must be a Shapefile (.shp), GeoJSON (.geojson), GeoTiff (.tif), FlatGeobuf (.fgb), Point Cloud (.las, .laz), png (.png), or jpeg (.jpeg).")
+    return extension
+
+
+
+
+
+# FUNCTION 22: TO GET THE BOUNDS OF ANY SUPPORTED FILE
+def load_file_bounds(file, trust_las_header = True):
+    """
+        Get the geographical bounds of a file of any supported type.
+
+        Args:
+            file (str): The file name.
+            trust_las_header (bool, optional): Read LAS/LAZ bounds from the header only. Defaults to True.
+
+        Returns:
+            tuple or None: A tuple of four values representing the geographical bounds of the data in the file,
+                           or None if an image does not have geolocation data.
+    """
+    extension = check_file_extension(file)
+    if extension in ['.shp', '.geojson']:
+        return tuple(load_vector_bounds(file))
+    elif extension == '.tif':
+        return tuple(load_tiff_bounds(file))
+    elif extension == '.fgb':
+        return tuple(load_fgb_bounds(file))
+    elif extension in ['.las', '.laz']:
+        return tuple(load_las_bounds(file, trust_las_header))
+    else:
+        return get_image_bounds(file)
+
+
+
+
+
+# FUNCTION 23: TO SCAN THE BOUNDS OF MANY FILES CONCURRENTLY
+BoundsScan = namedtuple('BoundsScan', ['union', 'bounds', 'errors'])
+
+def scan_bounds(files, max_workers = 16, trust_las_header = True, cache = None):
+    """
+        Loads the bounds of many files concurrently, capturing the errors of individual files.
+
+        Opening files is dominated by I/O latency on network storage, so the files are opened from a pool of
+        at most max_workers threads. A file that fails does not stop the scan.
+
+        Args:
+            files (list of str): A list of file names.
+            max_workers (int, optional): Number of files opened concurrently. Defaults to 16.
+            trust_las_header (bool, optional): Read LAS/LAZ bounds from the header only. Defaults to True.
+            cache (BoundsCache, optional): A persistent cache; unchanged files are not opened again. Defaults to None.
+
+        Returns:
+            BoundsScan: A named tuple with the union bounds of all files (or None), a dict mapping each
+                        successfully read file to its bounds (None for images without geolocation data),
+                        and a dict mapping each failed file to its exception.
+    """
+    loader = lambda file: load_file_bounds(file, trust_las_header)
+
+    def load(file):
+        # bounds scanned from the points of a LAS file are cached apart from those of its header
+        params = 'points' if not trust_las_header and get_file_extension(file) in ['.las', '.laz'] else ''
+        try:
+            return file, loader(file) if cache is None else cache.get_bounds(file, loader, params), None
+        except Exception as error:
+            return file, None, error
+
+    bounds, errors = {}, {}
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+        for file, file_bounds, error in pool.map(load, files):
+            if error is None:
+                bounds[file] = file_bounds
+            else:
+                errors[file] = error
+    if cache is not None:
+        cache.flush()
+
+    found = [file_bounds for file_bounds in bounds.values() if file_bounds is not None]
+    if not found:  # No bounds were found
+        return BoundsScan(None, bounds, errors)
+
+    minx, miny, maxx, maxy = zip(*found)
+    return BoundsScan((min(minx), min(miny), max(maxx), max(maxy)), bounds, errors)
+
+
+
+
+
+# FUNCTION 24: TO READ THE BOUNDS OF A .FGB FILE FROM ITS HEADER
+def read_fgb_header_bounds(fgb_file):
+    """
+        Reads the bounds of a FlatGeobuf file from its header envelope, or from the root node of its packed
+        R-tree index when the header has no envelope, without reading any features.
+
+        Args:
+            fgb_file (str): The name of the FlatGeobuf file.
+
+        Returns:
+            tuple or None: A tuple of four values representing the geographical bounds of the data in the file,
+                           or None if neither an envelope nor an index is present.
+    """
+    with open(fgb_file, 'rb') as fh:
+        header = read_fgb_header(fh)
+        if header is None:
+            return None
+        header, table = header
+        field_offset = flatbuffer_fields(header, table)
+
+        # field 1: envelope, a vector of doubles (minx, miny, maxx, maxy)
+        offset = field_offset(1)
+        if offset:
+            vector = table + offset + struct.unpack_from('<I', header, table + offset)[0]
+            length, = struct.unpack_from('<I', header, vector)
+            if length >= 4:
+                envelope = struct.unpack_from('<4d', header, vector + 4)
+                if all(np.isfinite(envelope)):
+                    return envelope
+
+        # field 8: features_count, field 9: index_node_size (16 by default, 0 means no index)
+        offset = field_offset(8)
+        features_count = struct.unpack_from('<Q', header, table + offset)[0] if offset else 0
+        offset = field_offset(9)
+        index_node_size = struct.unpack_from('<H', header, table + offset)[0] if offset else 16
+        if features_count and index_node_size:
+            # the index directly follows the header and starts with the root node, whose box is the full extent
+            root = fh.read(32)
+            if len(root) == 32:
+                return struct.unpack('<4d', root)
+    return None
+
+
+
+
+
+# FUNCTION 25: TO GET THE COORDINATE ARRAYS OF ANY GEOMETRY
+def geometry_coordinate_arrays(geometry):
+    """
+        Collects the coordinates of a geometry of any type as (N, 2) arrays, one per point sequence.
+
+        Args:
+            geometry (dict): A GeoJSON-like geometry, including GeometryCollections, or None.
+
+        Returns:
+            list of numpy.ndarray: The x and y coordinates of the geometry.
+    """
+    if geometry is None:
+        return []
+    if geometry['type'] == 'GeometryCollection':
+        return [coords for part in geometry['geometries'] for coords in geometry_coordinate_arrays(part)]
+
+    arrays, stack = [], [geometry['coordinates']]
+    while stack:
+        coordinates = stack.pop()
+        if len(coordinates) == 0:
+            continue
+        if isinstance(coordinates[0], (int, float)):  # a single position
+            arrays.append(np.asarray([coordinates], dtype=np.float64)[:, :2])
+        elif len(coordinates[0]) and isinstance(coordinates[0][0], (int, float)):  # a sequence of positions
+            arrays.append(np.asarray(coordinates, dtype=np.float64)[:, :2])
+        else:
+            stack.extend(coordinates)
+    return arrays
+
+
+
+
+
+# FUNCTION 26: TO READ THE HEADER OF A .FGB FILE
+def read_fgb_header(fh):
+    """
+        Reads the header flatbuffer of a FlatGeobuf file, leaving the file positioned after it.
+
+        Args:
+            fh (file): The FlatGeobuf file, opened in binary mode and positioned at its start.
+
+        Returns:
+            tuple or None: The header bytes and the position of its root table, or None if the file is not
+                           a FlatGeobuf file.
+    """
+    if fh.read(8)[:3] != b'fgb':  # magic bytes
+        return None
+    header_size, = struct.unpack('<I', fh.read(4))
+    header = fh.read(header_size)
+    table, = struct.unpack_from('<I', header, 0)
+    return header, table
+
+
+
+
+
+# FUNCTION 27: TO LOCATE THE FIELDS OF A FLATBUFFER TABLE
+def flatbuffer_fields(buffer, table):
+    """
+        Reads the vtable of a flatbuffer table.
+
+        Args:
+            buffer (bytes): The flatbuffer.
+            table (int): The position of the table in the buffer.
+
+        Returns:
+            function: Maps the index of a field to its offset from the table, 0 when the field is absent.
+    """
+    vtable = table - struct.unpack_from('<i', buffer, table)[0]
+    vtable_size, = struct.unpack_from('<H', buffer, vtable)
+
+    def field_offset(index):
+        position = vtable + 4 + 2 * index
+        return struct.unpack_from('<H', buffer, position)[0] if position < vtable + vtable_size else 0
+    return field_offset
+
+
+
+
+
+# FUNCTION 28: TO READ THE CRS OF A .FGB FILE FROM ITS HEADER
+def read_fgb_header_crs(fgb_file):
+    """
+        Reads the CRS of a FlatGeobuf file from its header, without reading any features.
+
+        Args:
+            fgb_file (str): The name of the FlatGeobuf file.
+
+        Returns:
+            str or None: The WKT of the CRS, or an authority string such as 'EPSG:32633', or None if the
+                         header has no CRS.
+    """
+    with open(fgb_file, 'rb') as fh:
+        header = read_fgb_header(fh)
+    if header is None:
+        return None
+    header, table = header
+
+    # field 10 of the header: crs, a table of org (0), code (1), wkt (4) and code_string (5)
+    offset = flatbuffer_fields(header, table)(10)
+    if not offset:
+        return None
+    crs_table = table + offset + struct.unpack_from('<I', header, table + offset)[0]
+    crs_offset = flatbuffer_fields(header, crs_table)
+
+    def string(index):
+        offset = crs_offset(index)
+        if not offset:
+            return None
+        position = crs_table + offset + struct.unpack_from('<I', header, crs_table + offset)[0]
+        length, = struct.unpack_from('<I', header, position)
+        return header[position + 4:position + 4 + length].decode('utf-8') or None
+
+    wkt, code_string = string(4), string(5)
+    code = struct.unpack_from('<i', header, crs_table + crs_offset(1))[0] if crs_offset(1) else 0
+    if wkt:
+        return wkt
+    if code_string:
+        return code_string
+    return f"{string(0) or 'EPSG'}:{code}" if code else None
+
+
+
+
+
+# FUNCTION 29: TO READ THE CRS OF A POINT CLOUD FROM ITS HEADER
+def read_las_crs(header):
+    """
+        Reads the CRS of a LAS or LAZ file from the WKT or GeoTIFF keys of its header.
+
+        Args:
+            header (laspy.LasHeader): The header of the point cloud.
+
+        Returns:
+            str or None: The WKT of the CRS, or None if the header has no CRS.
+    """
+    crs = header.parse_crs()
+    return crs.to_wkt() if crs is not None else None
+
+
+
+
+
+# FUNCTION 30: TO GET A CACHED TRANSFORMER TO WGS84
+@lru_cache(maxsize = TRANSFORMER_CACHE_SIZE)
+def get_wgs84_transformer(crs):
+    """
+        Creates the transformer from a CRS to lon/lat on WGS84. Transformers are cached per CRS, so a batch of
+        files in the same CRS sets up the transformation only once.
+
+        Args:
+            crs (str): The WKT or an authority string of the source CRS.
+
+        Returns:
+            pyproj.Transformer or None: The transformer, or None if the CRS already is lon/lat on WGS84.
+    """
+    from pyproj import CRS, Transformer
+    source = CRS.from_user_input(crs)
+    if source.equals(CRS.from_epsg(4326), ignore_axis_order = True):
+        return None
+    return Transformer.from_crs(source, 'EPSG:4326', always_xy = True)
+
+
+
+
+
+# FUNCTION 31: TO REPROJECT BOUNDS TO WGS84
+def transform_bounds_to_wgs84(bounds, crs, densify_points = DENSIFY_POINTS):
+    """
+        Reprojects a bounding box to lon/lat on WGS84.
+
+        Every edge of the box is densified before it is transformed, so the result also covers the curved edges
+        of the box in lon/lat. Boxes that cross the antimeridian get the full range of longitudes.
+
+        Args:
+            bounds (tuple): A tuple of four values (minx, miny, maxx, maxy) in the source CRS.
+            crs (str): The WKT or an authority string of the source CRS, or None for bounds already in lon/lat.
+            densify_points (int, optional): Points inserted along every edge. Defaults to 21.
+
+        Returns:
+            tuple: A tuple of four values representing the geographical bounds in lon/lat.
+    """
+    minx, miny, maxx, maxy = (float(value) for value in bounds)
+    transformer = get_wgs84_transformer(crs) if crs else None
+    if transformer is None:
+        return minx, miny, maxx, maxy
+
+    west, south, east, north = transformer.transform_bounds(minx, miny, maxx, maxy, densify_pts = densify_points)
+    if west > east:
+        west, east = -180.0, 180.0
+    return west, south, east, north
+
+
+
+
+
 # END OF THE PYTHON SCRIPT
\ No newline at end of file
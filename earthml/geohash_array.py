@@ -0,0 +1,335 @@
+'''
+THE GOAL OF THIS PYTHON SCRIPT IS TO ENCODE AND DECODE GEOHASHES FOR WHOLE NUMPY COORDINATE ARRAYS IN ONE CALL,
+USING INTERLEAVED INTEGER BIT OPERATIONS INSTEAD OF ENCODING ONE POINT AT A TIME!
+'''
+
+
+
+
+
+# IMPORTING THE ESSENTIAL LIBRARIES
+import numpy as np
+
+
+
+
+
+# GEOHASH ALPHABET AND LIMITS
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+BASE32_CHARS = np.array(list(BASE32))
+BASE32_LOOKUP = np.full(128, -1, dtype=np.int64)
+BASE32_LOOKUP[[ord(char) for char in BASE32]] = np.arange(32)
+BASE32_LOOKUP[[ord(char.upper()) for char in BASE32]] = np.arange(32)
+MAX_PRECISION = 24  # 60 bits per axis, the most an int64 cell index can hold
+
+# Characters at even positions hold 3 longitude and 2 latitude bits (lon, lat, lon, lat, lon),
+# characters at odd positions 2 longitude and 3 latitude bits (lat, lon, lat, lon, lat). These
+# tables map (position parity, longitude chunk, latitude chunk) to a character code and back.
+CHUNK_TO_CODE = np.zeros((2, 8, 8), dtype=np.int64)
+CODE_TO_LON_CHUNK = np.zeros((2, 32), dtype=np.int64)
+CODE_TO_LAT_CHUNK = np.zeros((2, 32), dtype=np.int64)
+for parity in range(2):
+    for code in range(32):
+        lon_chunk, lat_chunk = 0, 0
+        for bit in range(5):
+            value = (code >> (4 - bit)) & 1
+            if (bit + parity) % 2 == 0:
+                lon_chunk = (lon_chunk << 1) | value
+            else:
+                lat_chunk = (lat_chunk << 1) | value
+        CHUNK_TO_CODE[parity, lon_chunk, lat_chunk] = code
+        CODE_TO_LON_CHUNK[parity, code] = lon_chunk
+        CODE_TO_LAT_CHUNK[parity, code] = lat_chunk
+
+
+
+
+
+# FUNCTION 1: TO GET THE NUMBER OF LATITUDE AND LONGITUDE BITS OF A PRECISION
+def precision_bits(precision):
+    """
+        Splits the 5 bits per character of a geohash into longitude and latitude bits.
+
+        Args:
+            precision (int): The geohash precision (number of characters).
+
+        Returns:
+            tuple: The number of latitude bits and the number of longitude bits.
+    """
+    if not 1 <= precision <= MAX_PRECISION:
+        raise ValueError(f"Invalid precision. The precision must be between 1 and {MAX_PRECISION}.")
+    return (5 * precision) // 2, (5 * precision + 1) // 2
+
+
+
+
+
+# FUNCTION 2: TO QUANTIZE COORDINATES INTO CELL INDICES
+def quantize(values, low, high, bits, lower=False):
+    """
+        Converts coordinates into the index of the cell they fall in along one axis.
+
+        Args:
+            values (numpy.ndarray): The coordinates.
+            low (float): The lower limit of the axis (-90 or -180).
+            high (float): The upper limit of the axis (90 or 180).
+            bits (int): The number of bits of the axis.
+            lower (bool, optional): Assign values lying exactly on a cell edge to the lower cell. By default
+                                    they go to the upper cell, like pygeohash. Defaults to False.
+
+        Returns:
+            numpy.ndarray: The cell indices as int64.
+    """
+    scaled = (np.asarray(values, dtype=np.float64) - low) / (high - low) * 2.0 ** bits
+    cells = np.ceil(scaled) - 1 if lower else np.floor(scaled)
+    return np.clip(cells, 0, 2 ** bits - 1).astype(np.int64)
+
+
+
+
+
+# FUNCTION 3: TO ENCODE COORDINATES INTO CELL INDICES
+def encode_cells(latitudes, longitudes, precision, lower=False):
+    """
+        Calculates the latitude and longitude cell indices of points at a geohash precision.
+
+        Args:
+            latitudes (array-like): The latitudes of the points.
+            longitudes (array-like): The longitudes of the points.
+            precision (int): The geohash precision.
+            lower (bool, optional): Assign points on a cell edge to the lower cell. Defaults to False.
+
+        Returns:
+            tuple: The latitude and longitude cell indices as int64 arrays.
+    """
+    lat_bits, lon_bits = precision_bits(precision)
+    return quantize(latitudes, -90.0, 90.0, lat_bits, lower), quantize(longitudes, -180.0, 180.0, lon_bits, lower)
+
+
+
+
+
+# FUNCTION 4: TO INTERLEAVE CELL INDICES INTO GEOHASH CHARACTER CODES
+def cells_to_codes(lat_cells, lon_cells, precision):
+    """
+        Interleaves latitude and longitude cell indices into base32 character codes.
+
+        Args:
+            lat_cells (numpy.ndarray): The latitude cell indices.
+            lon_cells (numpy.ndarray): The longitude cell indices.
+            precision (int): The geohash precision.
+
+        Returns:
+            numpy.ndarray: An (N, precision) array of character codes between 0 and 31.
+    """
+    lat_bits, lon_bits = precision_bits(precision)
+    lat_cells, lon_cells = np.broadcast_arrays(np.asarray(lat_cells, dtype=np.int64).ravel(), np.asarray(lon_cells, dtype=np.int64).ravel())
+    codes = np.empty((lat_cells.size, precision), dtype=np.int64)
+    lon_used, lat_used = 0, 0
+    for position in range(precision):
+        # take the next 3 + 2 (even positions) or 2 + 3 (odd positions) bits, most significant first
+        parity = position % 2
+        lon_size, lat_size = 3 - parity, 2 + parity
+        lon_used, lat_used = lon_used + lon_size, lat_used + lat_size
+        lon_chunk = (lon_cells >> (lon_bits - lon_used)) & ((1 << lon_size) - 1)
+        lat_chunk = (lat_cells >> (lat_bits - lat_used)) & ((1 << lat_size) - 1)
+        codes[:, position] = CHUNK_TO_CODE[parity, lon_chunk, lat_chunk]
+    return codes
+
+
+
+
+
+# FUNCTION 5: TO DE-INTERLEAVE GEOHASH CHARACTER CODES INTO CELL INDICES
+def codes_to_cells(codes):
+    """
+        Splits base32 character codes back into latitude and longitude cell indices.
+
+        Args:
+            codes (numpy.ndarray): An (N, precision) array of character codes.
+
+        Returns:
+            tuple: The latitude and longitude cell indices as int64 arrays.
+    """
+    lat_cells = np.zeros(codes.shape[0], dtype=np.int64)
+    lon_cells = np.zeros(codes.shape[0], dtype=np.int64)
+    for position in range(codes.shape[1]):
+        parity = position % 2
+        lon_cells = (lon_cells << (3 - parity)) | CODE_TO_LON_CHUNK[parity, codes[:, position]]
+        lat_cells = (lat_cells << (2 + parity)) | CODE_TO_LAT_CHUNK[parity, codes[:, position]]
+    return lat_cells, lon_cells
+
+
+
+
+
+# FUNCTION 6: TO CONVERT CHARACTER CODES INTO GEOHASH STRINGS
+def codes_to_geohashes(codes):
+    """
+        Converts base32 character codes into geohash strings.
+
+        Args:
+            codes (numpy.ndarray): An (N, precision) array of character codes.
+
+        Returns:
+            numpy.ndarray: An array of N geohash strings.
+    """
+    chars = np.ascontiguousarray(BASE32_CHARS[codes])
+    return chars.view(f'<U{codes.shape[1]}').ravel()
+
+
+
+
+
+# FUNCTION 7: TO CONVERT GEOHASH STRINGS INTO CHARACTER CODES
+def geohashes_to_codes(geohashes):
+    """
+        Converts geohash strings into base32 character codes.
+
+        Args:
+            geohashes (array-like): The geohash strings.
+
+        Returns:
+            tuple: An (N, max_precision) array of character codes, padded with -1 after the end of shorter
+                   geohashes, and an array with the length of every geohash.
+    """
+    geohashes = np.asarray(geohashes, dtype=str).ravel()
+    width = max(geohashes.dtype.itemsize // 4, 1)
+    points = np.ascontiguousarray(geohashes.astype(f'<U{width}')).view(np.uint32).reshape(-1, width)
+    lengths = np.count_nonzero(points, axis=1)
+    codes = BASE32_LOOKUP[np.minimum(points, 127)]
+    valid = (codes >= 0) | (np.arange(width) >= lengths[:, None])
+    if not valid.all() or (points > 127).any() or (lengths == 0).any():
+        raise ValueError("Invalid geohash. Geohashes must be non-empty and use the base32 geohash alphabet.")
+    return codes, lengths
+
+
+
+
+
+# FUNCTION 8: TO ENCODE COORDINATE ARRAYS INTO GEOHASHES
+def encode_array(latitudes, longitudes, precision=12):
+    """
+        Encodes arrays of points into geohashes in one vectorized call.
+
+        Args:
+            latitudes (array-like): The latitudes of the points.
+            longitudes (array-like): The longitudes of the points.
+            precision (int, optional): The geohash precision. Defaults to 12.
+
+        Returns:
+            numpy.ndarray: An array of geohash strings, one per point, equal to pygeohash.encode.
+    """
+    lat_cells, lon_cells = encode_cells(latitudes, longitudes, precision)
+    return codes_to_geohashes(cells_to_codes(lat_cells, lon_cells, precision))
+
+
+
+
+
+# FUNCTION 9: TO GET THE CELL BOUNDS OF CELL INDICES
+def cell_bounds(lat_cells, lon_cells, precision):
+    """
+        Calculates the bounds of geohash cells from their cell indices.
+
+        Args:
+            lat_cells (numpy.ndarray): The latitude cell indices.
+            lon_cells (numpy.ndarray): The longitude cell indices.
+            precision (int): The geohash precision.
+
+        Returns:
+            tuple: Four arrays with the west, south, east and north edges of the cells.
+    """
+    lat_bits, lon_bits = precision_bits(precision)
+    lat_size, lon_size = 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+    west = -180.0 + lon_cells * lon_size
+    south = -90.0 + lat_cells * lat_size
+    return west, south, west + lon_size, south + lat_size
+
+
+
+
+
+# FUNCTION 10: TO GET THE BOUNDS OF GEOHASHES
+def geohash_bounds_array(geohashes):
+    """
+        Decodes geohashes into the bounds of their cells. Geohashes may have different lengths.
+
+        Args:
+            geohashes (array-like): The geohash strings.
+
+        Returns:
+            tuple: Four float64 arrays with the west, south, east and north edges of the cells.
+    """
+    codes, lengths = geohashes_to_codes(geohashes)
+    bounds = np.empty((4, lengths.size), dtype=np.float64)
+    precisions = np.unique(lengths)
+    for precision in precisions:
+        mask = lengths == precision if len(precisions) > 1 else slice(None)  # no copy for equal lengths
+        lat_cells, lon_cells = codes_to_cells(codes[mask, :precision])
+        bounds[:, mask] = cell_bounds(lat_cells, lon_cells, int(precision))
+    return bounds[0], bounds[1], bounds[2], bounds[3]
+
+
+
+
+
+# FUNCTION 11: TO DECODE GEOHASHES INTO CENTERS AND ERRORS
+def decode_exactly_array(geohashes):
+    """
+        Decodes geohashes into their cell centers and half sizes, like pygeohash.decode_exactly.
+
+        Args:
+            geohashes (array-like): The geohash strings.
+
+        Returns:
+            tuple: Four float64 arrays with the latitudes, longitudes, latitude errors and longitude errors.
+    """
+    west, south, east, north = geohash_bounds_array(geohashes)
+    return (south + north) / 2, (west + east) / 2, (north - south) / 2, (east - west) / 2
+
+
+
+
+
+# FUNCTION 12: TO FIND THE SMALLEST GEOHASH COVERING EACH OF MANY BOUNDING BOXES
+def smallest_covering_geohashes(bounds, max_precision=12):
+    """
+        Finds the smallest single geohash that covers each bounding box, in one vectorized pass.
+
+        A geohash cell covers a box exactly when it contains both the south-west and the north-east
+        corner, i.e. when its code is a prefix of both corner codes. The answer is therefore the longest
+        common prefix of the two corner geohashes. Corners on a cell edge are assigned to the cell on
+        the inside of the box, so a box that matches a cell exactly is covered by that cell.
+
+        Args:
+            bounds (array-like): An (N, 4) array, or a single tuple, of (minx, miny, maxx, maxy) in lon/lat.
+            max_precision (int, optional): The finest precision to return. Defaults to 12.
+
+        Returns:
+            numpy.ndarray: An array of N geohashes, with an empty string where no single cell covers the box.
+    """
+    bounds = np.atleast_2d(np.asarray(bounds, dtype=np.float64))
+    minx, miny, maxx, maxy = bounds.T
+    lat_bits, lon_bits = precision_bits(max_precision)
+
+    # south-west corners go to the cell above/right of an edge, north-east corners to the one below/left,
+    # except on an axis where the box has no extent and both corners must land in the same cell
+    sw_codes = cells_to_codes(quantize(miny, -90.0, 90.0, lat_bits), quantize(minx, -180.0, 180.0, lon_bits), max_precision)
+    ne_lat = np.where(maxy > miny, quantize(maxy, -90.0, 90.0, lat_bits, lower=True), quantize(maxy, -90.0, 90.0, lat_bits))
+    ne_lon = np.where(maxx > minx, quantize(maxx, -180.0, 180.0, lon_bits, lower=True), quantize(maxx, -180.0, 180.0, lon_bits))
+    ne_codes = cells_to_codes(ne_lat, ne_lon, max_precision)
+
+    # length of the common prefix of both corner codes
+    differs = sw_codes != ne_codes
+    prefix = np.where(differs.any(axis=1), differs.argmax(axis=1), max_precision)
+
+    chars = BASE32_CHARS[sw_codes]
+    chars[np.arange(max_precision)[None, :] >= prefix[:, None]] = ''
+    return np.ascontiguousarray(chars).view(f'<U{max_precision}').ravel()
+
+
+
+
+
+# END OF THE PYTHON SCRIPT
@@ -0,0 +1,339 @@
+'''
+THE GOAL OF THIS PYTHON SCRIPT IS TO ASSIGN A GEOHASH TO EVERY FEATURE OF A VECTOR FILE, EVERY POINT OF A POINT CLOUD
+AND EVERY BLOCK OR PIXEL OF A GEOTIFF, STREAMING THE DATA IN CHUNKS SO THAT MEMORY DOES NOT GROW WITH THE FILE SIZE!
+'''
+
+
+
+
+
+# IMPORTING THE ESSENTIAL LIBRARIES
+from itertools import islice
+import numpy as np
+from .geohash_array import encode_array, smallest_covering_geohashes
+from .geodata_to_geohash import (get_file_extension, open_vector_file, open_fgb_file, open_las_reader, open_tiff_file,
+                                 geometry_coordinate_arrays, read_las_crs, get_wgs84_transformer, DENSIFY_POINTS)
+
+
+
+
+
+# DEFAULT CHUNK SIZES
+FEATURE_CHUNK_SIZE = 10000  # features per chunk
+POINT_CHUNK_SIZE = 1000000  # point cloud points per chunk
+BLOCK_CHUNK_SIZE = 1024  # raster blocks per chunk
+
+
+
+
+
+# FUNCTION 1: TO GET THE BOUNDS OF MANY FEATURES
+def feature_bounds_array(features):
+    """
+        Calculates the bounds of every feature in one vectorized pass over their coordinates.
+
+        Args:
+            features (list): GeoJSON-like features, e.g. as read by fiona.
+
+        Returns:
+            numpy.ndarray: An (N, 4) array of (minx, miny, maxx, maxy), with NaN for features without coordinates.
+    """
+    arrays, owners = [], []
+    for i, feature in enumerate(features):
+        for coords in geometry_coordinate_arrays(feature['geometry']):
+            arrays.append(coords)
+            owners.append(i)
+
+    bounds = np.full((len(features), 4), np.nan)
+    if not arrays:
+        return bounds
+    coords = np.concatenate(arrays)
+    lengths = np.array([len(coords) for coords in arrays])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    owners = np.asarray(owners)
+
+    # reduce every coordinate sequence first, then the sequences of every feature (owners are sorted)
+    part_min = np.minimum.reduceat(coords, starts)
+    part_max = np.maximum.reduceat(coords, starts)
+    first = np.concatenate([[0], np.nonzero(np.diff(owners))[0] + 1])
+    located = owners[first]
+    bounds[located, :2] = np.minimum.reduceat(part_min, first)
+    bounds[located, 2:] = np.maximum.reduceat(part_max, first)
+    return bounds
+
+
+
+
+
+# FUNCTION 2: TO CONVERT COORDINATES TO LON/LAT
+def coordinates_to_wgs84(xs, ys, crs):
+    """
+        Reprojects coordinates from the CRS of a file to lon/lat on WGS84.
+
+        Coordinates without a CRS are taken as lon/lat, and must lie within the range of longitudes and latitudes:
+        geohashing clips them to that range, so projected coordinates would all fall in the cells at its edges.
+
+        Args:
+            xs (numpy.ndarray): The x coordinates.
+            ys (numpy.ndarray): The y coordinates.
+            crs (str): The WKT or an authority string of the CRS of the coordinates, or None for lon/lat.
+
+        Returns:
+            tuple: Two arrays with the longitudes and latitudes, NaN where the coordinates cannot be reprojected.
+    """
+    transformer = get_wgs84_transformer(crs) if crs else None
+    if transformer is not None:
+        xs, ys = transformer.transform(xs, ys)
+        xs, ys = np.asarray(xs, dtype = np.float64), np.asarray(ys, dtype = np.float64)
+        failed = ~(np.isfinite(xs) & np.isfinite(ys))
+        if failed.any():
+            xs, ys = np.where(failed, np.nan, xs), np.where(failed, np.nan, ys)
+        return xs, ys
+
+    xs, ys = np.asarray(xs, dtype = np.float64), np.asarray(ys, dtype = np.float64)
+    with np.errstate(invalid = 'ignore'):
+        outside = (np.abs(xs) > 180) | (np.abs(ys) > 90)
+    if outside.any():
+        raise ValueError("Invalid coordinates. Without a CRS the coordinates must be longitudes in [-180, 180] and latitudes in [-90, 90].")
+    return xs, ys
+
+
+
+
+
+# FUNCTION 3: TO CONVERT BOUNDING BOXES TO LON/LAT
+def bounds_to_wgs84(bounds, crs, densify_points = DENSIFY_POINTS):
+    """
+        Reprojects bounding boxes from the CRS of a file to lon/lat on WGS84, in one vectorized pass.
+
+        Every edge of every box is densified before it is transformed, as in transform_bounds_to_wgs84, so the
+        result also covers the curved edges of the boxes in lon/lat.
+
+        Args:
+            bounds (numpy.ndarray): An (N, 4) array of (minx, miny, maxx, maxy) in the CRS, NaN when empty.
+            crs (str): The WKT or an authority string of the CRS of the boxes, or None for lon/lat.
+            densify_points (int, optional): Points inserted along every edge. Defaults to 21.
+
+        Returns:
+            numpy.ndarray: An (N, 4) array of (minx, miny, maxx, maxy) in lon/lat, NaN when empty.
+    """
+    if not crs or get_wgs84_transformer(crs) is None:
+        coordinates_to_wgs84(bounds[:, [0, 2]], bounds[:, [1, 3]], None)
+        return bounds
+
+    minx, miny, maxx, maxy = (bounds[:, [i]] for i in range(4))
+    steps = np.linspace(0.0, 1.0, densify_points + 2)[None, :]
+    along_x, along_y = minx + (maxx - minx) * steps, miny + (maxy - miny) * steps
+    xs = np.concatenate([along_x, np.broadcast_to(maxx, along_y.shape), along_x, np.broadcast_to(minx, along_y.shape)], axis = 1)
+    ys = np.concatenate([np.broadcast_to(miny, along_x.shape), along_y, np.broadcast_to(maxy, along_x.shape), along_y], axis = 1)
+    lons, lats = coordinates_to_wgs84(xs, ys, crs)
+    with np.errstate(invalid = 'ignore'):
+        return np.stack([lons.min(axis = 1), lats.min(axis = 1), lons.max(axis = 1), lats.max(axis = 1)], axis = 1)
+
+
+
+
+
+# FUNCTION 4: TO GET THE GEOHASHES OF BOUNDING BOXES
+def bounds_geohashes(bounds, precision = 12, method = 'center'):
+    """
+        Assigns a geohash to every bounding box.
+
+        Args:
+            bounds (numpy.ndarray): An (N, 4) array of (minx, miny, maxx, maxy) in lon/lat, NaN when empty.
+            precision (int, optional): The geohash precision. Defaults to 12.
+            method (str, optional): 'center' for the geohash of the center of the box, or 'cover' for the
+                                    smallest geohash that covers the whole box. Defaults to 'center'.
+
+        Returns:
+            numpy.ndarray: An array of N geohashes, with an empty string for empty boxes (and, for 'cover',
+                           for boxes that no single cell covers).
+    """
+    empty = np.isnan(bounds).any(axis = 1)
+    bounds = np.where(empty[:, None], 0.0, bounds)
+    if method == 'center':
+        geohashes = encode_array((bounds[:, 1] + bounds[:, 3]) / 2, (bounds[:, 0] + bounds[:, 2]) / 2, precision)
+    elif method == 'cover':
+        geohashes = smallest_covering_geohashes(bounds, precision)
+    else:
+        raise ValueError(f"Invalid method '{method}'. The method must be 'center' or 'cover'.")
+    geohashes[empty] = ''
+    return geohashes
+
+
+
+
+
+# FUNCTION 5: TO ASSIGN GEOHASHES TO THE FEATURES OF A VECTOR FILE
+def assign_feature_geohashes(vector_file, precision = 12, method = 'center', chunk_size = FEATURE_CHUNK_SIZE):
+    """
+        Streams the features of a Shapefile, GeoJSON or FlatGeobuf file with a geohash for every feature.
+
+        Args:
+            vector_file (str): The name of the vector file. Coordinates are reprojected from its CRS to lon/lat.
+            precision (int, optional): The geohash precision. Defaults to 12.
+            method (str, optional): 'center' or 'cover', see bounds_geohashes. Defaults to 'center'.
+            chunk_size (int, optional): Number of features per chunk. Defaults to 10000.
+
+        Yields:
+            tuple: A list of features and an array with their geohashes.
+    """
+    open_file = open_fgb_file if get_file_extension(vector_file) == '.fgb' else open_vector_file
+    with open_file(vector_file) as src:
+        crs = src.crs_wkt or None
+        features = iter(src)
+        while True:
+            chunk = list(islice(features, chunk_size))
+            if not chunk:
+                break
+            yield chunk, bounds_geohashes(bounds_to_wgs84(feature_bounds_array(chunk), crs), precision, method)
+
+
+
+
+
+# FUNCTION 6: TO ASSIGN GEOHASHES TO THE POINTS OF A POINT CLOUD
+def assign_point_geohashes(las_file, precision = 12, chunk_size = POINT_CHUNK_SIZE):
+    """
+        Streams the points of a LAS or LAZ file with a geohash for every point.
+
+        Only one chunk of points is held in memory at a time, so clouds of any size are processed in
+        constant memory.
+
+        Args:
+            las_file (str): The name of the LAS or LAZ file. Coordinates are reprojected from its CRS to lon/lat.
+            precision (int, optional): The geohash precision. Defaults to 12.
+            chunk_size (int, optional): Number of points per chunk. Defaults to 1000000.
+
+        Yields:
+            tuple: A chunk of points (laspy.ScaleAwarePointRecord) and an array with their geohashes, with an
+                   empty string for points that cannot be reprojected.
+    """
+    with open_las_reader(las_file) as src:
+        crs = read_las_crs(src.header)
+        for points in src.chunk_iterator(chunk_size):
+            lons, lats = coordinates_to_wgs84(np.asarray(points.x), np.asarray(points.y), crs)
+            failed = np.isnan(lons)
+            geohashes = encode_array(np.where(failed, 0.0, lats), np.where(failed, 0.0, lons), precision)
+            geohashes[failed] = ''
+            yield points, geohashes
+
+
+
+
+
+# FUNCTION 7: TO GET THE WINDOWS OF A RASTER IN BLOCKS
+def raster_blocks(src, block_size = None):
+    """
+        Lists the blocks of a raster: its internal tiles or strips, or a regular grid of square blocks.
+
+        Args:
+            src (rasterio.io.DatasetReader): The opened raster.
+            block_size (int, optional): The size of square blocks. Defaults to None (internal blocks).
+
+        Returns:
+            iterator of rasterio.windows.Window: The block windows, row by row.
+    """
+    from rasterio.windows import Window
+    if block_size is None:
+        return (window for _, window in src.block_windows(1))
+    return (Window(col, row, min(block_size, src.width - col), min(block_size, src.height - row))
+            for row in range(0, src.height, block_size) for col in range(0, src.width, block_size))
+
+
+
+
+
+# FUNCTION 8: TO ASSIGN GEOHASHES TO THE BLOCKS OF A GEOTIFF
+def assign_block_geohashes(tiff_file, precision = 12, method = 'center', block_size = None, chunk_size = BLOCK_CHUNK_SIZE):
+    """
+        Streams the blocks of a GeoTIFF with a geohash for every block. No pixels are read.
+
+        Args:
+            tiff_file (str): The name of the GeoTIFF file. Block bounds are reprojected from its CRS to lon/lat.
+            precision (int, optional): The geohash precision. Defaults to 12.
+            method (str, optional): 'center' or 'cover', see bounds_geohashes. Defaults to 'center'.
+            block_size (int, optional): The size of square blocks. Defaults to None (internal blocks).
+            chunk_size (int, optional): Number of blocks per chunk. Defaults to 1024.
+
+        Yields:
+            tuple: A list of windows and an array with their geohashes.
+    """
+    with open_tiff_file(tiff_file) as src:
+        crs = src.crs.to_wkt() if src.crs else None
+        blocks = raster_blocks(src, block_size)
+        a, b, c, d, e, f = src.transform[:6]
+        while True:
+            windows = list(islice(blocks, chunk_size))
+            if not windows:
+                break
+            cols = np.array([[w.col_off, w.col_off + w.width] for w in windows], dtype = np.float64)
+            rows = np.array([[w.row_off, w.row_off + w.height] for w in windows], dtype = np.float64)
+            # the four corners of every block, through the affine transform
+            cols, rows = np.repeat(cols, 2, axis = 1), np.tile(rows, 2)
+            xs, ys = a * cols + b * rows + c, d * cols + e * rows + f
+            bounds = np.stack([xs.min(axis = 1), ys.min(axis = 1), xs.max(axis = 1), ys.max(axis = 1)], axis = 1)
+            yield windows, bounds_geohashes(bounds_to_wgs84(bounds, crs), precision, method)
+
+
+
+
+
+# FUNCTION 9: TO ASSIGN GEOHASHES TO THE PIXELS OF A GEOTIFF
+def assign_pixel_geohashes(tiff_file, precision = 12, block_size = None):
+    """
+        Streams the blocks of a GeoTIFF with the geohash of the center of every pixel. No pixels are read.
+
+        Args:
+            tiff_file (str): The name of the GeoTIFF file. Pixel centers are reprojected from its CRS to lon/lat.
+            precision (int, optional): The geohash precision. Defaults to 12.
+            block_size (int, optional): The size of square blocks. Defaults to None (internal blocks).
+
+        Yields:
+            tuple: A window and a (height, width) array with the geohashes of its pixels.
+    """
+    with open_tiff_file(tiff_file) as src:
+        crs = src.crs.to_wkt() if src.crs else None
+        a, b, c, d, e, f = src.transform[:6]
+        for window in raster_blocks(src, block_size):
+            cols = window.col_off + 0.5 + np.arange(window.width)[None, :]
+            rows = window.row_off + 0.5 + np.arange(window.height)[:, None]
+            lons, lats = coordinates_to_wgs84(a * cols + b * rows + c, d * cols + e * rows + f, crs)
+            failed = np.isnan(lons)
+            geohashes = encode_array(np.where(failed, 0.0, lats), np.where(failed, 0.0, lons), precision)
+            geohashes[failed.ravel()] = ''
+            yield window, geohashes.reshape(window.height, window.width)
+
+
+
+
+
+# FUNCTION 10: TO ASSIGN GEOHASHES TO THE RECORDS OF ANY SUPPORTED FILE
+def assign_geohashes(file, precision = 12, **kwargs):
+    """
+        Streams the records of a file with their geohashes: features of vector files, points of point clouds
+        and blocks of GeoTIFFs.
+
+        Args:
+            file (str): The file name.
+            precision (int, optional): The geohash precision. Defaults to 12.
+            **kwargs: Passed to assign_feature_geohashes, assign_point_geohashes or assign_block_geohashes.
+
+        Yields:
+            tuple: A chunk of records and an array with their geohashes.
+    """
+    file_extension = get_file_extension(file)
+    if file_extension in ['.shp', '.geojson', '.fgb']:
+        return assign_feature_geohashes(file, precision, **kwargs)
+    elif file_extension in ['.las', '.laz']:
+        return assign_point_geohashes(file, precision, **kwargs)
+    elif file_extension == '.tif':
+        return assign_block_geohashes(file, precision, **kwargs)
+    else:
+        raise ValueError("Invalid file type. The file must be a Shapefile (.shp), GeoJSON (.geojson), FlatGeobuf (.fgb), Point Cloud (.las, .laz), or GeoTiff (.tif).")
+
+
+
+
+
+# END OF THE PYTHON SCRIPT
@@ -0,0 +1,247 @@
+'''
+THE GOAL OF THIS PYTHON SCRIPT IS TO FIND A COMPLETE AND MINIMAL SET OF GEOHASHES THAT COVERS A BOUNDING BOX OR A
+POLYGON, BY HIERARCHICAL REFINEMENT OF THE GEOHASH CELLS ALONG THE BOUNDARY OF THE AREA!
+'''
+
+
+
+
+
+# IMPORTING THE ESSENTIAL LIBRARIES
+import numpy as np
+from .geohash_array import cell_bounds, cells_to_codes, codes_to_geohashes
+
+
+
+
+
+# DEFAULT LIMITS
+DEFAULT_MAX_PRECISION = 12  # finest precision used when only max_cells is given
+EDGE_CHUNK_SIZE = 4000000  # cells x polygon edges tested at once
+
+
+
+
+
+# FUNCTION 1: TO GET THE CHILDREN OF GEOHASH CELLS
+def children_cells(lat_cells, lon_cells, precision):
+    """
+        Calculates the 32 child cells of every geohash cell.
+
+        Args:
+            lat_cells (numpy.ndarray): The latitude cell indices.
+            lon_cells (numpy.ndarray): The longitude cell indices.
+            precision (int): The precision of the given cells.
+
+        Returns:
+            tuple: The latitude and longitude cell indices of the children at precision + 1.
+    """
+    # the next character adds 3 longitude and 2 latitude bits at even positions, and 2 and 3 at odd ones
+    lon_added, lat_added = 3 - precision % 2, 2 + precision % 2
+    lon_children = (lon_cells[:, None, None] << lon_added) | np.arange(2 ** lon_added)[None, :, None]
+    lat_children = (lat_cells[:, None, None] << lat_added) | np.arange(2 ** lat_added)[None, None, :]
+    lon_children, lat_children = np.broadcast_arrays(lon_children, lat_children)
+    return lat_children.ravel(), lon_children.ravel()
+
+
+
+
+
+# FUNCTION 2: TO GET THE EDGES OF A POLYGON
+def polygon_edges(geometry):
+    """
+        Collects the edges of all rings of a Polygon or MultiPolygon.
+
+        Args:
+            geometry (dict or list): A GeoJSON-like Polygon or MultiPolygon mapping, or a single ring of (lon, lat) pairs.
+
+        Returns:
+            numpy.ndarray: An (M, 4) array of edges as x1, y1, x2, y2.
+    """
+    if isinstance(geometry, dict) or hasattr(geometry, 'keys'):
+        if geometry['type'] == 'Polygon':
+            rings = geometry['coordinates']
+        elif geometry['type'] == 'MultiPolygon':
+            rings = [ring for polygon in geometry['coordinates'] for ring in polygon]
+        else:
+            raise ValueError("Invalid geometry. The geometry must be a Polygon or a MultiPolygon.")
+    else:
+        rings = [geometry]
+
+    edges = []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=np.float64)[:, :2]
+        edges.append(np.hstack([ring, np.roll(ring, -1, axis=0)]))  # closes the ring if it is open
+    return np.vstack(edges)
+
+
+
+
+
+# FUNCTION 3: TO RELATE CELLS TO A BOUNDING BOX
+def bbox_relation(west, south, east, north, bounds):
+    """
+        Tests which cells intersect and which lie completely inside a bounding box.
+
+        Args:
+            west, south, east, north (numpy.ndarray): The edges of the cells.
+            bounds (tuple): A tuple of four values representing the geographical bounds.
+
+        Returns:
+            tuple: Two boolean arrays, intersects and contains.
+    """
+    minx, miny, maxx, maxy = bounds
+
+    # cells that only touch the box along an edge are left out, unless the box has no extent on that axis
+    if maxx > minx:
+        overlaps_x = (west < maxx) & (east > minx)
+    else:
+        overlaps_x = (west <= maxx) & (east >= minx)
+    if maxy > miny:
+        overlaps_y = (south < maxy) & (north > miny)
+    else:
+        overlaps_y = (south <= maxy) & (north >= miny)
+
+    contains = (west >= minx) & (east <= maxx) & (south >= miny) & (north <= maxy)
+    return overlaps_x & overlaps_y, contains
+
+
+
+
+
+# FUNCTION 4: TO RELATE CELLS TO A POLYGON
+def polygon_relation(west, south, east, north, edges):
+    """
+        Tests which cells intersect and which lie completely inside a polygon.
+
+        Args:
+            west, south, east, north (numpy.ndarray): The edges of the cells.
+            edges (numpy.ndarray): The (M, 4) polygon edges from polygon_edges.
+
+        Returns:
+            tuple: Two boolean arrays, intersects and contains.
+    """
+    crossed = np.zeros(west.shape, dtype=bool)
+    inside = np.zeros(west.shape, dtype=bool)
+    center_x, center_y = (west + east) / 2, (south + north) / 2
+
+    chunk = max(EDGE_CHUNK_SIZE // max(west.size, 1), 1)
+    for start in range(0, len(edges), chunk):
+        x1, y1, x2, y2 = (column[None, :] for column in edges[start:start + chunk].T)
+        w, s, e, n = west[:, None], south[:, None], east[:, None], north[:, None]
+
+        # an edge crosses a cell when their bounding boxes overlap and the cell corners are not all
+        # on one side of the edge's line (separating axis test)
+        boxes_overlap = (np.minimum(x1, x2) <= e) & (np.maximum(x1, x2) >= w) & (np.minimum(y1, y2) <= n) & (np.maximum(y1, y2) >= s)
+        dx, dy = x2 - x1, y2 - y1
+        sides = [dx * (cy - y1) - dy * (cx - x1) for cx, cy in [(w, s), (w, n), (e, s), (e, n)]]
+        straddles = (np.minimum.reduce(sides) <= 0) & (np.maximum.reduce(sides) >= 0)
+        crossed |= (boxes_overlap & straddles).any(axis=1)
+
+        # even-odd rule for the cell centers
+        py, px = center_y[:, None], center_x[:, None]
+        spans = (y1 > py) != (y2 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (py - y1) * dx / dy
+        inside ^= (np.count_nonzero(spans & (px < x_cross), axis=1) % 2).astype(bool)
+
+    return crossed | inside, inside & ~crossed
+
+
+
+
+
+# FUNCTION 5: TO MERGE COMPLETE SETS OF 32 SIBLINGS INTO THEIR PARENT
+def compact_cells(levels):
+    """
+        Replaces every complete set of 32 sibling cells by their parent cell, from the finest level up.
+
+        Args:
+            levels (dict): Maps a precision to a (lat_cells, lon_cells) tuple of the cells at that precision.
+
+        Returns:
+            dict: The compacted levels.
+    """
+    for precision in sorted(levels, reverse=True):
+        lat_cells, lon_cells = levels[precision]
+        if precision == 1 or len(lat_cells) < 32:
+            continue
+        lon_added, lat_added = 3 - (precision - 1) % 2, 2 + (precision - 1) % 2
+        parents = np.stack([lat_cells >> lat_added, lon_cells >> lon_added], axis=1)
+        unique_parents, inverse, counts = np.unique(parents, axis=0, return_inverse=True, return_counts=True)
+        complete = counts[inverse.ravel()] == 32
+        if not complete.any():
+            continue
+        levels[precision] = (lat_cells[~complete], lon_cells[~complete])
+        promoted = unique_parents[counts == 32]
+        lat_parent, lon_parent = levels.get(precision - 1, (np.empty(0, np.int64), np.empty(0, np.int64)))
+        levels[precision - 1] = (np.concatenate([lat_parent, promoted[:, 0]]), np.concatenate([lon_parent, promoted[:, 1]]))
+    return levels
+
+
+
+
+
+# FUNCTION 6: TO FIND A MINIMAL GEOHASH COVER
+def geohash_cover(region, precision=None, max_cells=None):
+    """
+        Finds a complete, minimal set of geohashes that covers a bounding box or a polygon.
+
+        Cells along the boundary of the region are refined one precision level at a time, cells that lie
+        completely inside the region are kept at the coarsest level that fits, and complete sets of 32
+        siblings are merged into their parent. The union of the returned cells always covers the region.
+
+        Args:
+            region (tuple or dict): A bounding box (minx, miny, maxx, maxy) in lon/lat, a GeoJSON-like
+                                    Polygon or MultiPolygon mapping, or a single ring of (lon, lat) pairs.
+            precision (int, optional): The finest precision to refine the boundary to.
+            max_cells (int, optional): The maximum number of geohashes. Refinement stops at the last level
+                                       that stays within this limit (the 32 level-1 cells at least).
+
+        Returns:
+            list of str: The geohashes of the cover, sorted.
+    """
+    if precision is None and max_cells is None:
+        raise ValueError("Invalid arguments. A precision, a max_cells limit or both must be given.")
+    target = precision or DEFAULT_MAX_PRECISION
+
+    if not isinstance(region, dict) and not hasattr(region, 'keys') and np.ndim(region) == 1 and len(region) == 4:
+        relation = lambda w, s, e, n: bbox_relation(w, s, e, n, region)
+    else:
+        edges = polygon_edges(region)
+        relation = lambda w, s, e, n: polygon_relation(w, s, e, n, edges)
+
+    # the 32 cells of precision 1: 3 longitude bits and 2 latitude bits
+    lon_cells, lat_cells = (grid.ravel() for grid in np.meshgrid(np.arange(8), np.arange(4)))
+    levels = {}
+    level = 1
+    while True:
+        intersects, contains = relation(*cell_bounds(lat_cells, lon_cells, level))
+        full, partial = intersects & contains, intersects & ~contains
+
+        count = sum(len(cells[0]) for cells in levels.values()) + np.count_nonzero(intersects)
+        if levels and max_cells is not None and count > max_cells:
+            # the refinement of the previous level's boundary cells does not fit, keep those instead
+            levels[level - 1] = (np.concatenate([levels[level - 1][0], parent_lat]), np.concatenate([levels[level - 1][1], parent_lon]))
+            break
+
+        levels[level] = (lat_cells[full], lon_cells[full])
+        parent_lat, parent_lon = lat_cells[partial], lon_cells[partial]
+        if level == target or not partial.any():
+            levels[level] = (lat_cells[intersects], lon_cells[intersects])
+            break
+
+        lat_cells, lon_cells = children_cells(parent_lat, parent_lon, level)
+        level += 1
+
+    geohashes = []
+    for cell_precision, (lat_cells, lon_cells) in compact_cells(levels).items():
+        if len(lat_cells):
+            geohashes.extend(codes_to_geohashes(cells_to_codes(lat_cells, lon_cells, cell_precision)).tolist())
+    return sorted(geohashes)
+
+
+
+
+
+# END OF THE PYTHON SCRIPT
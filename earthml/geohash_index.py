@@ -0,0 +1,284 @@
+'''
+THE GOAL OF THIS PYTHON SCRIPT IS TO KEEP A PERSISTENT GEOHASH-PREFIX INDEX OVER A CATALOGUE OF GEOSPATIAL FILES,
+SO THE FILES THAT INTERSECT A BOUNDING BOX OR A GEOHASH ARE FOUND WITHOUT SCANNING THE WHOLE CATALOGUE!
+'''
+
+
+
+
+
+# IMPORTING THE ESSENTIAL LIBRARIES
+import sqlite3
+import threading
+import numpy as np
+from .geohash_array import cells_to_codes, codes_to_geohashes, geohash_bounds_array, precision_bits, quantize
+from .geodata_to_geohash import scan_bounds
+
+
+
+
+
+# INDEX SETTINGS
+DEFAULT_INDEX_PRECISION = 10  # finest precision of the indexed cells
+INSERT_CHUNK_SIZE = 100000  # entries indexed per transaction
+
+
+
+
+
+# FUNCTION 1: TO FIND THE INDEX CELLS OF BOUNDING BOXES
+def bounds_to_cells(bounds, max_precision = DEFAULT_INDEX_PRECISION, expand = False):
+    """
+        Covers every bounding box with at most 2 x 2 geohash cells, at the finest precision where that is possible.
+
+        Every cell that intersects a box is then an ancestor or a descendant of one of its cells, which is what
+        makes prefix queries complete. Boxes wider than two precision-1 cells get all precision-1 cells they touch.
+
+        Args:
+            bounds (array-like): An (N, 4) array, or a single tuple, of (minx, miny, maxx, maxy) in lon/lat.
+            max_precision (int, optional): The finest precision to use. Defaults to 10.
+            expand (bool, optional): Also include the cells that only touch a box along an edge. Defaults to False.
+
+        Returns:
+            tuple: An array with the row of the box each cell belongs to, and an array with the geohashes.
+    """
+    bounds = np.atleast_2d(np.asarray(bounds, dtype=np.float64))
+    minx, miny, maxx, maxy = bounds.T
+    lat_bits, lon_bits = precision_bits(max_precision)
+    south = quantize(miny, -90.0, 90.0, lat_bits, lower = expand)
+    west = quantize(minx, -180.0, 180.0, lon_bits, lower = expand)
+    north = quantize(maxy, -90.0, 90.0, lat_bits)
+    east = quantize(maxx, -180.0, 180.0, lon_bits)
+    if not expand:
+        # north-east corners on a cell edge belong to the cell below/left, unless the box has no extent
+        north = np.where(maxy > miny, quantize(maxy, -90.0, 90.0, lat_bits, lower = True), north)
+        east = np.where(maxx > minx, quantize(maxx, -180.0, 180.0, lon_bits, lower = True), east)
+
+    # the finest precision at which each box spans at most two cells on both axes (precision 1 at worst)
+    precisions = np.arange(max_precision, 0, -1)
+    lat_shifts = lat_bits - (5 * precisions) // 2
+    lon_shifts = lon_bits - (5 * precisions + 1) // 2
+    fits = ((north[:, None] >> lat_shifts) - (south[:, None] >> lat_shifts) <= 1) & ((east[:, None] >> lon_shifts) - (west[:, None] >> lon_shifts) <= 1)
+    fits[:, -1] = True
+    box_precision = precisions[fits.argmax(axis = 1)]
+
+    rows, geohashes = [], []
+    for precision in np.unique(box_precision):
+        precision = int(precision)
+        pending = np.nonzero(box_precision == precision)[0]
+        lat_shift, lon_shift = lat_bits - precision_bits(precision)[0], lon_bits - precision_bits(precision)[1]
+        s, w = south[pending] >> lat_shift, west[pending] >> lon_shift
+        n, e = north[pending] >> lat_shift, east[pending] >> lon_shift
+
+        if precision > 1:
+            # the (up to) four cells of every box, without repeating a cell
+            distinct = np.stack([np.ones(len(pending), dtype = bool), e != w, n != s, (n != s) & (e != w)], axis = 1)
+            lat_cells = np.stack([s, s, n, n], axis = 1)[distinct]
+            lon_cells = np.stack([w, e, w, e], axis = 1)[distinct]
+            box_rows = np.repeat(pending, 4)[distinct.ravel()]
+        else:
+            # precision 1 has only 4 x 8 cells, every box gets the full range it touches
+            box_rows, lat_cells, lon_cells = [], [], []
+            for row, s1, w1, n1, e1 in zip(pending, s, w, n, e):
+                lats, lons = np.meshgrid(np.arange(s1, n1 + 1), np.arange(w1, e1 + 1))
+                box_rows.append(np.full(lats.size, row))
+                lat_cells.append(lats.ravel())
+                lon_cells.append(lons.ravel())
+            box_rows, lat_cells, lon_cells = np.concatenate(box_rows), np.concatenate(lat_cells), np.concatenate(lon_cells)
+
+        rows.append(box_rows)
+        geohashes.append(codes_to_geohashes(cells_to_codes(lat_cells, lon_cells, precision)).astype(object))
+
+    if not rows:
+        return np.empty(0, dtype = np.int64), np.empty(0, dtype = object)
+    return np.concatenate(rows), np.concatenate(geohashes)
+
+
+
+
+
+# FUNCTION 2: TO GET THE BOUNDING BOX OF A QUERY
+def query_bounds(region):
+    """
+        Converts a query region into a bounding box.
+
+        Args:
+            region (tuple or str): A bounding box (minx, miny, maxx, maxy) in lon/lat, or a geohash.
+
+        Returns:
+            tuple: A tuple of four values representing the geographical bounds of the query.
+    """
+    if isinstance(region, str):
+        west, south, east, north = geohash_bounds_array([region])
+        return float(west[0]), float(south[0]), float(east[0]), float(north[0])
+    minx, miny, maxx, maxy = region
+    return float(minx), float(miny), float(maxx), float(maxy)
+
+
+
+
+
+# CLASS 1: PERSISTENT GEOHASH-PREFIX INDEX
+class GeohashIndex:
+    """
+        A persistent index of file bounds, keyed by geohash cells and stored in SQLite.
+
+        Every file is indexed under the (at most four) cells of bounds_to_cells. A query looks up the ancestors
+        of its own cells by equality and their descendants by a range scan over the sorted geohashes, and then
+        filters the candidates by their exact bounds, so a query costs a few B-tree lookups whatever the size
+        of the catalogue.
+
+        Args:
+            path (str, optional): The SQLite database file. Defaults to ':memory:'.
+            precision (int, optional): The finest precision of the index cells. An existing index keeps the
+                                       precision it was built with. Defaults to 10.
+    """
+
+    def __init__(self, path = ':memory:', precision = DEFAULT_INDEX_PRECISION):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread = False)
+        with self._lock:
+            self._connection.executescript(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);'
+                'CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, path TEXT UNIQUE, '
+                'minx REAL, miny REAL, maxx REAL, maxy REAL);'
+                'CREATE TABLE IF NOT EXISTS cells (geohash TEXT, entry_id INTEGER, PRIMARY KEY (geohash, entry_id)) WITHOUT ROWID;'
+                'CREATE INDEX IF NOT EXISTS cells_entry ON cells (entry_id);'
+            )
+            self._connection.execute("INSERT OR IGNORE INTO meta VALUES ('precision', ?)", (str(precision),))
+            self._connection.commit()
+            self.precision = int(self._connection.execute("SELECT value FROM meta WHERE key = 'precision'").fetchone()[0])
+
+    def insert_many(self, items):
+        """
+            Adds files with known bounds to the index, replacing files that are already indexed.
+
+            Args:
+                items (dict or iterable): Maps, or yields (path, bounds) pairs of, file names to their bounds.
+                                          Files with None bounds are removed from the index.
+        """
+        items = list(items.items() if hasattr(items, 'items') else items)
+        for start in range(0, len(items), INSERT_CHUNK_SIZE):
+            chunk = items[start:start + INSERT_CHUNK_SIZE]
+            paths = [path for path, _ in chunk]
+            located = [(path, tuple(map(float, bounds))) for path, bounds in chunk if bounds is not None]
+            rows, geohashes = bounds_to_cells([bounds for _, bounds in located], self.precision, expand = True) if located else ([], [])
+
+            with self._lock:
+                self._delete(paths)
+                cursor = self._connection.cursor()
+                ids = []
+                for path, bounds in located:
+                    cursor.execute('INSERT INTO entries (path, minx, miny, maxx, maxy) VALUES (?, ?, ?, ?, ?)', (path, *bounds))
+                    ids.append(cursor.lastrowid)
+                cursor.executemany('INSERT INTO cells VALUES (?, ?)', zip(geohashes, (ids[row] for row in rows)))
+                self._connection.commit()
+
+    def insert(self, path, bounds):
+        """
+            Adds a single file to the index.
+
+            Args:
+                path (str): The file name.
+                bounds (tuple): A tuple of four values representing the geographical bounds of the file.
+        """
+        self.insert_many([(path, bounds)])
+
+    def insert_files(self, files, max_workers = 16, trust_las_header = True, cache = None):
+        """
+            Reads the bounds of files and adds them to the index.
+
+            Args:
+                files (list of str): A list of file names.
+                max_workers (int, optional): Number of files opened concurrently. Defaults to 16.
+                trust_las_header (bool, optional): Read LAS/LAZ bounds from the header only. Defaults to True.
+                cache (BoundsCache, optional): A persistent cache of per-file bounds. Defaults to None.
+
+            Returns:
+                dict: Maps every file that could not be read to its exception.
+        """
+        scan = scan_bounds(files, max_workers, trust_las_header, cache)
+        self.insert_many(scan.bounds)
+        return scan.errors
+
+    def _delete(self, paths):
+        ids = []
+        for start in range(0, len(paths), 900):  # stays below SQLite's limit of bound parameters
+            chunk = paths[start:start + 900]
+            ids.extend(row[0] for row in self._connection.execute(
+                f'SELECT id FROM entries WHERE path IN ({",".join("?" * len(chunk))})', chunk))
+        self._connection.executemany('DELETE FROM cells WHERE entry_id = ?', [(entry_id,) for entry_id in ids])
+        self._connection.executemany('DELETE FROM entries WHERE id = ?', [(entry_id,) for entry_id in ids])
+        return len(ids)
+
+    def delete(self, paths):
+        """
+            Removes files from the index.
+
+            Args:
+                paths (str or list of str): A file name or a list of file names.
+
+            Returns:
+                int: The number of removed files.
+        """
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        with self._lock:
+            removed = self._delete(paths)
+            self._connection.commit()
+        return removed
+
+    def query(self, region):
+        """
+            Finds the indexed files that intersect a bounding box or a geohash cell.
+
+            Args:
+                region (tuple or str): A bounding box (minx, miny, maxx, maxy) in lon/lat, or a geohash.
+
+            Returns:
+                dict: Maps every intersecting file name to its bounds.
+        """
+        bounds = query_bounds(region)
+        _, cells = bounds_to_cells(bounds, self.precision)
+        ancestors = sorted({cell[:length] for cell in cells for length in range(1, len(cell) + 1)})
+
+        # ancestors by equality, descendants by range: every base32 character sorts before '~'
+        candidates = ' UNION ALL '.join(
+            [f'SELECT entry_id FROM cells WHERE geohash IN ({",".join("?" * len(ancestors))})']
+            + ['SELECT entry_id FROM cells WHERE geohash > ? AND geohash < ?'] * len(cells)
+        )
+        parameters = ancestors + [value for cell in cells for value in (cell, cell + '~')]
+        minx, miny, maxx, maxy = bounds
+        with self._lock:
+            rows = self._connection.execute(
+                f'SELECT path, minx, miny, maxx, maxy FROM entries WHERE id IN ({candidates}) '
+                'AND minx <= ? AND maxx >= ? AND miny <= ? AND maxy >= ?',
+                parameters + [maxx, minx, maxy, miny]
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def __contains__(self, path):
+        with self._lock:
+            return self._connection.execute('SELECT 1 FROM entries WHERE path = ?', (path,)).fetchone() is not None
+
+    def close(self):
+        """
+            Closes the index.
+        """
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+
+
+# END OF THE PYTHON SCRIPT
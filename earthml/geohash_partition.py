@@ -0,0 +1,318 @@
+'''
+THE GOAL OF THIS PYTHON SCRIPT IS TO WRITE THE POINTS OF POINT CLOUDS AND THE FEATURES OF VECTOR FILES INTO ONE OUTPUT
+FILE PER GEOHASH PREFIX, WITH BOUNDED WRITE BUFFERS AND A MANIFEST OF THE PARTITIONS, SO THAT SPATIAL QUERIES ONLY READ
+THE PARTITIONS THEY NEED!
+'''
+
+
+
+
+
+# IMPORTING THE ESSENTIAL LIBRARIES
+# (laspy and fiona are imported by the writers that use them)
+import json
+import os
+import numpy as np
+from .geohash_array import geohash_bounds_array
+from .geohash_assign import assign_feature_geohashes, assign_point_geohashes, FEATURE_CHUNK_SIZE, POINT_CHUNK_SIZE
+from .geodata_to_geohash import get_file_extension, open_fgb_file, open_las_reader, open_vector_file, read_las_crs
+
+
+
+
+
+# PARTITION SETTINGS
+DEFAULT_PREFIX_LENGTH = 4  # geohash characters per partition key
+POINT_BUFFER_SIZE = 5000000  # points buffered across all partitions before a flush
+FEATURE_BUFFER_SIZE = 100000  # features buffered across all partitions before a flush
+UNASSIGNED_PARTITION = '_'  # partition of the records without a geohash
+MANIFEST_FILE = 'manifest.json'
+
+
+
+
+
+# CLASS 1: COMMON BUFFERING AND MANIFEST LOGIC
+class PartitionWriter:
+    """
+        Buffers records per geohash prefix and appends them to one output file per prefix.
+
+        The buffers of all partitions together hold at most buffer_size records. When they are full, the
+        largest buffers are written until half of the budget is free, so partitions that receive few records
+        are written in a few large appends instead of many small ones.
+
+        Args:
+            output_dir (str): The directory of the partitions and of the manifest.
+            prefix_length (int, optional): The length of the geohash prefix of a partition. Defaults to 4.
+            buffer_size (int, optional): The maximum number of buffered records. Defaults to 100000.
+    """
+    extension = None
+    crs_wkt = None  # the CRS of the partitions, set by the writers
+
+    def __init__(self, output_dir, prefix_length = DEFAULT_PREFIX_LENGTH, buffer_size = FEATURE_BUFFER_SIZE):
+        os.makedirs(output_dir, exist_ok = True)
+        self.output_dir = output_dir
+        self.prefix_length = prefix_length
+        self.buffer_size = buffer_size
+        self.buffers = {}
+        self.buffered = 0
+        self.partitions = {}
+        self.sources = []
+
+    def check_crs(self, crs_wkt):
+        # records are written unchanged, so every source must be in the CRS of the partitions
+        from pyproj import CRS
+        if crs_wkt is None and self.crs_wkt is None:
+            return
+        if crs_wkt is None or self.crs_wkt is None or not CRS.from_user_input(crs_wkt).equals(self.crs_wkt):
+            raise ValueError("Invalid source. All sources must have the same CRS.")
+
+    def partition_path(self, prefix):
+        return os.path.join(self.output_dir, f'{prefix}{self.extension}')
+
+    def write(self, records, geohashes):
+        """
+            Buffers records under the prefixes of their geohashes, writing buffers when the budget is used up.
+
+            Args:
+                records: A chunk of records that can be indexed with an integer array.
+                geohashes (numpy.ndarray): The geohashes of the records.
+        """
+        prefixes = np.asarray(geohashes).astype(f'<U{self.prefix_length}')
+        prefixes[prefixes == ''] = UNASSIGNED_PARTITION
+        keys, inverse = np.unique(prefixes, return_inverse = True)
+        order = np.argsort(inverse, kind = 'stable')
+        splits = np.cumsum(np.bincount(inverse.ravel(), minlength = len(keys)))[:-1]
+        for key, indices in zip(keys.tolist(), np.split(order, splits)):
+            self.buffers.setdefault(key, []).append(self.take(records, indices))
+            self.buffered += len(indices)
+
+        if self.buffered > self.buffer_size:
+            sizes = {key: sum(map(len, chunks)) for key, chunks in self.buffers.items()}
+            for key in sorted(sizes, key = sizes.get, reverse = True):
+                self.flush_partition(key)
+                if self.buffered <= self.buffer_size // 2:
+                    break
+
+    def flush_partition(self, key):
+        chunks = self.buffers.pop(key, [])
+        count = sum(map(len, chunks))
+        if not count:
+            return
+        path = self.partition_path(key)
+        self.append(path, chunks, append = key in self.partitions)
+        entry = self.partitions.setdefault(key, {'path': os.path.basename(path), 'count': 0})
+        entry['count'] += count
+        self.buffered -= count
+
+    def flush(self):
+        """
+            Writes all buffered records.
+        """
+        for key in list(self.buffers):
+            self.flush_partition(key)
+
+    def write_manifest(self):
+        """
+            Writes manifest.json, listing every partition with its file, record count and the bounds of its prefix.
+
+            Returns:
+                dict: The manifest.
+        """
+        keys = sorted(key for key in self.partitions if key != UNASSIGNED_PARTITION)
+        west, south, east, north = geohash_bounds_array(keys) if keys else ([], [], [], [])
+        for key, bounds in zip(keys, zip(west, south, east, north)):
+            self.partitions[key]['bounds'] = [float(value) for value in bounds]
+        manifest = {
+            'prefix_length': self.prefix_length,
+            'format': self.extension,
+            'sources': self.sources,
+            'count': sum(entry['count'] for entry in self.partitions.values()),
+            'partitions': {key: self.partitions[key] for key in sorted(self.partitions)},
+        }
+        with open(os.path.join(self.output_dir, MANIFEST_FILE), 'w', encoding = 'utf-8') as fh:
+            json.dump(manifest, fh, indent = 2)
+        return manifest
+
+    def close(self):
+        """
+            Writes all buffered records and the manifest.
+
+            Returns:
+                dict: The manifest.
+        """
+        self.flush()
+        return self.write_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+
+
+
+
+
+# CLASS 2: PARTITION WRITER FOR POINT CLOUDS
+class PointPartitionWriter(PartitionWriter):
+    """
+        Writes points into one LAS file per geohash prefix. All sources must share the point format, scales,
+        offsets and CRS of the header the writer was created with.
+
+        Args:
+            output_dir (str): The directory of the partitions and of the manifest.
+            header (laspy.LasHeader): The header of the source point cloud.
+            prefix_length (int, optional): The length of the geohash prefix of a partition. Defaults to 4.
+            buffer_size (int, optional): The maximum number of buffered points. Defaults to 5000000.
+    """
+    extension = '.las'
+
+    def __init__(self, output_dir, header, prefix_length = DEFAULT_PREFIX_LENGTH, buffer_size = POINT_BUFFER_SIZE):
+        import laspy
+        super().__init__(output_dir, prefix_length, buffer_size)
+        self.header = laspy.LasHeader(point_format = header.point_format, version = header.version)
+        self.header.scales, self.header.offsets = header.scales, header.offsets
+        self.header.vlrs.extend(header.vlrs)  # keeps the CRS and other metadata records
+        self.crs_wkt = read_las_crs(header)
+
+    def check_header(self, header):
+        if (header.point_format != self.header.point_format or np.any(header.scales != self.header.scales)
+                or np.any(header.offsets != self.header.offsets)):
+            raise ValueError("Invalid point cloud. All sources must have the same point format, scales and offsets.")
+        self.check_crs(read_las_crs(header))
+
+    def take(self, points, indices):
+        return points.array[indices]
+
+    def append(self, path, chunks, append):
+        import laspy
+        points = laspy.ScaleAwarePointRecord(np.concatenate(chunks), self.header.point_format, self.header.scales, self.header.offsets)
+        if append:
+            with laspy.open(path, mode = 'a') as writer:
+                writer.append_points(points)
+        else:
+            with laspy.open(path, mode = 'w', header = self.header) as writer:
+                writer.write_points(points)
+
+
+
+
+
+# CLASS 3: PARTITION WRITER FOR VECTOR FILES
+class FeaturePartitionWriter(PartitionWriter):
+    """
+        Writes features into one vector file per geohash prefix. All sources must share the schema and CRS
+        the writer was created with.
+
+        Args:
+            output_dir (str): The directory of the partitions and of the manifest.
+            schema (dict): The fiona schema of the source features.
+            crs: The CRS of the source features, as read by fiona.
+            crs_wkt (str, optional): The same CRS as WKT, to check the other sources against. Defaults to None
+                                     (no CRS).
+            driver (str, optional): An OGR driver that supports appending. Defaults to 'GPKG'.
+            prefix_length (int, optional): The length of the geohash prefix of a partition. Defaults to 4.
+            buffer_size (int, optional): The maximum number of buffered features. Defaults to 100000.
+    """
+    extensions = {'GPKG': '.gpkg', 'ESRI Shapefile': '.shp', 'GeoJSON': '.geojson'}
+
+    def __init__(self, output_dir, schema, crs, driver = 'GPKG', prefix_length = DEFAULT_PREFIX_LENGTH, buffer_size = FEATURE_BUFFER_SIZE,
+                 crs_wkt = None):
+        if driver not in self.extensions:
+            raise ValueError(f"Invalid driver. The driver must be one of {', '.join(self.extensions)}.")
+        super().__init__(output_dir, prefix_length, buffer_size)
+        self.extension = self.extensions[driver]
+        self.schema, self.crs, self.driver, self.crs_wkt = schema, crs, driver, crs_wkt
+
+    def check_source(self, schema, crs_wkt):
+        if schema != self.schema:
+            raise ValueError("Invalid vector file. All sources must have the same schema.")
+        self.check_crs(crs_wkt)
+
+    def take(self, features, indices):
+        return [features[i] for i in indices]
+
+    def append(self, path, chunks, append):
+        import fiona
+        with fiona.open(path, 'a' if append else 'w', driver = self.driver, schema = self.schema, crs = self.crs) as dst:
+            for chunk in chunks:
+                dst.writerecords(chunk)
+
+
+
+
+
+# FUNCTION 1: TO PARTITION POINT CLOUDS BY GEOHASH
+def partition_point_clouds(las_files, output_dir, prefix_length = DEFAULT_PREFIX_LENGTH, chunk_size = POINT_CHUNK_SIZE,
+                           buffer_size = POINT_BUFFER_SIZE):
+    """
+        Streams the points of LAS or LAZ files into one LAS file per geohash prefix.
+
+        Args:
+            las_files (str or list of str): A file name or a list of file names, all in the same CRS.
+            output_dir (str): The directory of the partitions and of the manifest.
+            prefix_length (int, optional): The length of the geohash prefix of a partition. Defaults to 4.
+            chunk_size (int, optional): Number of points read at a time. Defaults to 1000000.
+            buffer_size (int, optional): The maximum number of buffered points. Defaults to 5000000.
+
+        Returns:
+            dict: The manifest.
+    """
+    las_files = [las_files] if isinstance(las_files, str) else las_files
+    writer = None
+    for las_file in las_files:
+        with open_las_reader(las_file) as src:
+            header = src.header
+        if writer is None:
+            writer = PointPartitionWriter(output_dir, header, prefix_length, buffer_size)
+        writer.check_header(header)
+        for points, geohashes in assign_point_geohashes(las_file, prefix_length, chunk_size):
+            writer.write(points, geohashes)
+        writer.sources.append(las_file)
+    return writer.close() if writer is not None else None
+
+
+
+
+
+# FUNCTION 2: TO PARTITION VECTOR FILES BY GEOHASH
+def partition_vector_files(vector_files, output_dir, prefix_length = DEFAULT_PREFIX_LENGTH, method = 'center',
+                           driver = 'GPKG', chunk_size = FEATURE_CHUNK_SIZE, buffer_size = FEATURE_BUFFER_SIZE):
+    """
+        Streams the features of Shapefile, GeoJSON or FlatGeobuf files into one vector file per geohash prefix.
+
+        Args:
+            vector_files (str or list of str): A file name or a list of file names, all in the same CRS.
+            output_dir (str): The directory of the partitions and of the manifest.
+            prefix_length (int, optional): The length of the geohash prefix of a partition. Defaults to 4.
+            method (str, optional): 'center' partitions a feature by the center of its bounds, 'cover' by the
+                                    smallest geohash covering it, so large features go to shorter prefixes.
+                                    Defaults to 'center'.
+            driver (str, optional): The output driver, 'GPKG', 'ESRI Shapefile' or 'GeoJSON'. Defaults to 'GPKG'.
+            chunk_size (int, optional): Number of features read at a time. Defaults to 10000.
+            buffer_size (int, optional): The maximum number of buffered features. Defaults to 100000.
+
+        Returns:
+            dict: The manifest.
+    """
+    vector_files = [vector_files] if isinstance(vector_files, str) else vector_files
+    writer = None
+    for vector_file in vector_files:
+        open_file = open_fgb_file if get_file_extension(vector_file) == '.fgb' else open_vector_file
+        with open_file(vector_file) as src:
+            schema, crs, crs_wkt = src.schema, src.crs, src.crs_wkt or None
+        if writer is None:
+            writer = FeaturePartitionWriter(output_dir, schema, crs, driver, prefix_length, buffer_size, crs_wkt)
+        writer.check_source(schema, crs_wkt)
+        for features, geohashes in assign_feature_geohashes(vector_file, prefix_length, method, chunk_size):
+            writer.write(features, geohashes)
+        writer.sources.append(vector_file)
+    return writer.close() if writer is not None else None
+
+
+
+
+
+# END OF THE PYTHON SCRIPT
@@ -0,0 +1,120 @@
+'''
+SENTINEL-1 ORBIT FILES FOR THE SAR PRE-PROCESSING PIPELINE.
+THE STATE VECTORS OF A PRECISE (AUX_POEORB) OR RESTITUTED (AUX_RESORB) EARTH EXPLORER ORBIT FILE ARE PARSED INTO ARRAYS
+AND INTERPOLATED WITH A CUBIC HERMITE SPLINE THAT MATCHES BOTH THE POSITIONS AND THE VELOCITIES. THE INTERPOLATED ORBIT
+IS CACHED PER ORBIT FILE, SO A DAY OF SCENES SHARING ONE ORBIT FILE PARSES IT ONCE.
+'''
+
+import os
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+
+# The state vectors of an orbit file: times (datetime64[us], UTC), positions (n, 3) in m and
+# velocities (n, 3) in m/s in the Earth-fixed frame, the file type (e.g. 'AUX_POEORB') and the
+# validity period of the file
+StateVectors = namedtuple('StateVectors', ['times', 'positions', 'velocities', 'file_type', 'validity_start', 'validity_stop'])
+
+# Number of interpolated orbits kept by get_orbit
+ORBIT_CACHE_SIZE = 8
+
+# Scene metadata holding the acquisition times, and the tag suffix of the orbit state at each time
+ACQUISITION_TIME_TAGS = {'ACQUISITION_START_TIME': 'Start', 'ACQUISITION_STOP_TIME': 'Stop'}
+
+# Earth Explorer times are written as 'UTC=2020-01-01T22:59:42.000000'
+def parse_eof_time(text):
+    text = text.strip()
+    return np.datetime64(text.split('=', 1)[1] if '=' in text else text, 'us')
+
+# Read Orbit File
+def read_orbit_file(orbit_file):
+    """Parse the state vectors of an Earth Explorer orbit (.EOF) file, streaming its XML."""
+    times, states = [], []
+    header = {}
+    for _, element in ET.iterparse(orbit_file):
+        tag = element.tag.rsplit('}', 1)[-1]  # with or without an XML namespace
+        if tag == 'OSV':
+            fields = {child.tag.rsplit('}', 1)[-1]: child.text for child in element}
+            times.append(parse_eof_time(fields['UTC']))
+            states.append([float(fields[axis]) for axis in ('X', 'Y', 'Z', 'VX', 'VY', 'VZ')])
+            element.clear()  # keeps memory flat over the thousands of vectors of a POEORB file
+        elif tag in ('File_Type', 'Validity_Start', 'Validity_Stop'):
+            header[tag] = element.text.strip()
+    if not states:
+        raise ValueError("Invalid orbit file. The orbit file must hold at least one OSV state vector.")
+
+    # vectors in time order, without the duplicates where consecutive files were merged
+    times, order = np.unique(np.array(times, dtype='datetime64[us]'), return_index=True)
+    states = np.array(states)[order]
+    validity = [parse_eof_time(header[key]) if key in header else None for key in ('Validity_Start', 'Validity_Stop')]
+    return StateVectors(times, states[:, :3], states[:, 3:], header.get('File_Type'), *validity)
+
+# Interpolated Orbit
+class Orbit:
+    """
+    A satellite orbit interpolated from its state vectors.
+
+    The positions are interpolated with a cubic Hermite spline whose derivative at every state
+    vector is the given velocity, and the velocities with the derivative of that spline. Times are
+    datetime64 values or ISO 8601 strings in UTC and must lie between the first and last vector.
+    """
+
+    def __init__(self, state_vectors):
+        from scipy.interpolate import CubicHermiteSpline
+        if len(state_vectors.times) < 2:
+            raise ValueError("Invalid orbit file. The orbit file must hold at least two OSV state vectors.")
+        self.state_vectors = state_vectors
+        self.file_type = state_vectors.file_type
+        self.epoch = state_vectors.times[0]
+        self.start, self.stop = state_vectors.times[0], state_vectors.times[-1]
+        self.spline = CubicHermiteSpline(self.seconds(state_vectors.times), state_vectors.positions, state_vectors.velocities, axis=0)
+        self.derivative = self.spline.derivative()
+
+    def seconds(self, times):
+        return (np.asarray(times, dtype='datetime64[us]') - self.epoch) / np.timedelta64(1, 's')
+
+    def covered_seconds(self, times):
+        seconds = self.seconds(times)
+        if np.any(seconds < 0) or np.any(seconds > self.seconds(self.stop)):
+            raise ValueError(f"Invalid time. The time must be within the orbit, from {self.start} to {self.stop}.")
+        return seconds
+
+    def position(self, times):
+        """Return the (..., 3) positions at times, in m."""
+        return self.spline(self.covered_seconds(times))
+
+    def velocity(self, times):
+        """Return the (..., 3) velocities at times, in m/s."""
+        return self.derivative(self.covered_seconds(times))
+
+    def state(self, times):
+        """Return the positions and velocities at times."""
+        seconds = self.covered_seconds(times)
+        return self.spline(seconds), self.derivative(seconds)
+
+@lru_cache(maxsize=ORBIT_CACHE_SIZE)
+def _cached_orbit(orbit_file, modified, size):
+    return Orbit(read_orbit_file(orbit_file))
+
+# Cached Orbit
+def get_orbit(orbit_file):
+    """Return the interpolated orbit of an orbit file, parsing the file only the first time (or when it changes)."""
+    stat = os.stat(orbit_file)
+    return _cached_orbit(os.path.abspath(orbit_file), stat.st_mtime_ns, stat.st_size)
+
+# Orbit metadata of a scene
+def orbit_tags(orbit_file, tags=None):
+    """
+    Return the metadata tags that record an orbit file on a scene.
+
+    When the scene tags hold its acquisition times, the interpolated orbit state at the start and
+    stop of the acquisition is recorded as 'X Y Z VX VY VZ' in m and m/s.
+    """
+    orbit = get_orbit(orbit_file)
+    result = {'Orbit File': orbit_file, 'Orbit Type': orbit.file_type or 'unknown'}
+    for key, label in ACQUISITION_TIME_TAGS.items():
+        if tags and key in tags:
+            position, velocity = orbit.state(np.datetime64(tags[key].strip().rstrip('Z'), 'us'))
+            result[f'Orbit State {label}'] = ' '.join(f'{value:.6f}' for value in np.concatenate([position, velocity]))
+    return result
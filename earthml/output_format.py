@@ -0,0 +1,174 @@
+'''
+OUTPUT FORMATS OF THE SAR PRE-PROCESSING PIPELINE.
+PRODUCTS ARE WRITTEN AS FLOAT32, OR AS DECIBELS SCALED TO INT16, INTO TILED AND COMPRESSED GEOTIFFS WITH OPTIONAL
+INTERNAL OVERVIEWS, OR INTO CLOUD-OPTIMIZED GEOTIFFS THAT DOWNSTREAM READERS CAN QUERY WITH HTTP RANGE REQUESTS.
+'''
+
+import os
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+import numpy as np
+import rasterio
+import rasterio.shutil
+from rasterio.enums import Resampling
+from rasterio.io import MemoryFile
+
+# An output format:
+#   dtype is 'float32' (linear values) or 'db_int16' (decibels stored as int16 counts of DB_SCALE)
+#   compress is 'deflate', 'zstd', 'lzw' or None, always with the matching predictor
+#   level is the DEFLATE or ZSTD compression level (None for the GDAL default)
+#   blocksize is the size of the internal tiles (None matches the square tiles of a tiled source, 512 otherwise)
+#   overviews is True for factors 2, 4, 8, ... down to a single tile, a list of factors, or False
+#   cog writes a Cloud-Optimized GeoTIFF, with the tiles of every level stored contiguously
+OutputFormat = namedtuple('OutputFormat', ['dtype', 'compress', 'level', 'blocksize', 'overviews', 'cog'],
+                          defaults=('float32', 'deflate', None, None, False, False))
+
+# Scaled decibels: one int16 count is DB_SCALE dB, which covers -327.67 dB to 327.67 dB
+DB_SCALE = 0.01
+DB_NODATA = -32768
+
+# Tile size of outputs whose source is striped or has tiles GDAL cannot write
+DEFAULT_BLOCKSIZE = 512
+
+OUTPUT_DTYPES = {'float32': 'float32', 'db_int16': 'int16'}
+COMPRESSIONS = (None, 'deflate', 'zstd', 'lzw')
+
+# Creation options of a source profile that must not leak into the output
+SOURCE_LAYOUT_KEYS = ('compress', 'predictor', 'zlevel', 'zstd_level', 'num_threads', 'tiled', 'blockxsize', 'blockysize', 'photometric')
+
+# Resolve an OutputFormat from None, a dtype name, a dict or an OutputFormat
+def get_output_format(output_format=None):
+    if output_format is None:
+        output_format = OutputFormat()
+    elif isinstance(output_format, str):
+        output_format = OutputFormat(dtype=output_format)
+    elif isinstance(output_format, dict):
+        output_format = OutputFormat(**output_format)
+
+    if output_format.dtype not in OUTPUT_DTYPES:
+        raise ValueError(f"Invalid output dtype. The dtype must be one of {', '.join(OUTPUT_DTYPES)}.")
+    if output_format.compress not in COMPRESSIONS:
+        raise ValueError("Invalid compression. The compression must be 'deflate', 'zstd', 'lzw' or None.")
+    if output_format.blocksize is not None and output_format.blocksize % 16:
+        raise ValueError("Invalid block size. The block size must be a multiple of 16.")
+    return output_format
+
+# Tile size of an output: the OutputFormat's, else the square tiles of a tiled source profile
+def output_blocksize(profile, output_format=None):
+    output_format = get_output_format(output_format)
+    if output_format.blocksize is not None:
+        return output_format.blocksize
+    size = profile.get('blockxsize')
+    if profile.get('tiled') and size == profile.get('blockysize') and size % 16 == 0:
+        return size
+    return DEFAULT_BLOCKSIZE
+
+# Output Profile
+def output_profile(profile, output_format=None):
+    """Return a tiled, compressed GeoTIFF profile for a source or warped profile."""
+    output_format = get_output_format(output_format)
+    scaled = output_format.dtype == 'db_int16'
+    blocksize = output_blocksize(profile, output_format)
+    profile = {key: value for key, value in profile.items() if key.lower() not in SOURCE_LAYOUT_KEYS}
+    if str(profile.get('interleave', 'pixel')).lower() not in ('pixel', 'band'):
+        del profile['interleave']  # e.g. the line interleave of an ENVI source
+    profile.update({'driver': 'GTiff', 'dtype': OUTPUT_DTYPES[output_format.dtype], 'tiled': True,
+                    'blockxsize': blocksize, 'blockysize': blocksize, 'BIGTIFF': 'IF_SAFER'})
+    if scaled:
+        profile['nodata'] = DB_NODATA
+    if output_format.compress is not None:
+        # horizontal differencing for integers, floating-point differencing for floats;
+        # tiles are compressed on all CPU cores
+        profile.update({'compress': output_format.compress, 'predictor': 2 if scaled else 3, 'num_threads': 'ALL_CPUS'})
+        if output_format.level is not None and output_format.compress in ('deflate', 'zstd'):
+            profile['zlevel' if output_format.compress == 'deflate' else 'zstd_level'] = output_format.level
+    return profile
+
+# Encode linear values in the output dtype
+def encode_output(image, output_format=None):
+    output_format = get_output_format(output_format)
+    if output_format.dtype == 'float32':
+        return np.asarray(image, dtype=np.float32)
+
+    # zero, negative and NaN values have no decibel value and become nodata
+    with np.errstate(divide='ignore', invalid='ignore'):
+        counts = np.round(10 * np.log10(np.asarray(image, dtype=np.float32)) / DB_SCALE)
+    return np.where(np.isfinite(counts), np.clip(counts, -32767, 32767), DB_NODATA).astype(np.int16)
+
+# Decode scaled int16 decibels back to linear values (NaN for nodata)
+def decode_db(counts):
+    counts = np.asarray(counts)
+    linear = np.power(np.float32(10), counts.astype(np.float32) * np.float32(DB_SCALE / 10))
+    return np.where(counts == DB_NODATA, np.float32(np.nan), linear)
+
+# Overview factors down to a single tile
+def overview_factors(width, height, blocksize):
+    factors, factor = [], 2
+    while max(width, height) / (factor // 2) > blocksize:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+# Band scales, units and overviews, once all pixels are written; returns the overview factors
+def finish_output(dst, output_format):
+    if output_format.dtype == 'db_int16':
+        dst.scales = (DB_SCALE,) * dst.count
+        dst.offsets = (0.0,) * dst.count
+        dst.units = ('dB',) * dst.count
+    factors = output_format.overviews
+    if factors is True:
+        factors = overview_factors(dst.width, dst.height, dst.block_shapes[0][1])
+    if factors:
+        dst.build_overviews(list(factors), Resampling.average)
+    return factors
+
+# Open an output raster for writing
+@contextmanager
+def open_output(output_file, profile, output_format=None, scratch_dir=None, in_memory=False):
+    """
+    Open output_file for writing in the given OutputFormat and yield the dataset.
+
+    Values written to the dataset must already be encoded with encode_output. Overviews are built
+    when the block closes. A COG is first written to an uncompressed staging GeoTIFF, in memory or
+    in scratch_dir, and then copied once with GDAL's COG driver, which compresses the tiles and
+    moves the overviews ahead of the full-resolution data.
+    """
+    output_format = get_output_format(output_format)
+    profile = output_profile(profile, output_format)
+    if not output_format.cog:
+        with rasterio.open(output_file, 'w', **profile) as dst:
+            yield dst
+            finish_output(dst, output_format)
+        return
+
+    staging_profile = {key: value for key, value in profile.items() if key not in ('compress', 'predictor', 'zlevel', 'zstd_level', 'num_threads')}
+    options = {'BLOCKSIZE': profile['blockxsize'], 'BIGTIFF': 'IF_SAFER', 'NUM_THREADS': 'ALL_CPUS',
+               'COMPRESS': (output_format.compress or 'none').upper()}
+    if output_format.compress is not None:
+        options['PREDICTOR'] = 'YES'
+        if output_format.level is not None and output_format.compress in ('deflate', 'zstd'):
+            options['LEVEL'] = output_format.level
+
+    if in_memory:
+        with MemoryFile() as memfile:
+            with memfile.open(**staging_profile) as dst:
+                yield dst
+                options['OVERVIEWS'] = 'FORCE_USE_EXISTING' if finish_output(dst, output_format) else 'NONE'
+            with memfile.open() as staged:
+                rasterio.shutil.copy(staged, output_file, driver='COG', **options)
+    else:
+        with tempfile.TemporaryDirectory(dir=scratch_dir) as scratch:
+            staging = os.path.join(scratch, 'cog_staging.tif')
+            with rasterio.open(staging, 'w', **staging_profile) as dst:
+                yield dst
+                options['OVERVIEWS'] = 'FORCE_USE_EXISTING' if finish_output(dst, output_format) else 'NONE'
+            rasterio.shutil.copy(staging, output_file, driver='COG', **options)
+
+# Write Output
+def write_output(output_file, image, profile, output_format=None, tags=None):
+    """Encode a (bands, height, width) array of linear values and write it in the given OutputFormat."""
+    with open_output(output_file, dict(profile, count=image.shape[0]), output_format, in_memory=True) as dst:
+        dst.write(encode_output(image, output_format))
+        if tags:
+            dst.update_tags(**tags)
@@ -0,0 +1,124 @@
+'''
+MEMORY-MAPPED ACCESS TO UNCOMPRESSED RASTERS FOR THE SAR PRE-PROCESSING PIPELINE.
+THE BANDS OF AN UNCOMPRESSED STRIPED GEOTIFF OR OF AN ENVI FILE ARE EXPOSED AS A (BANDS, HEIGHT, WIDTH) numpy.memmap VIEW
+OF THE FILE, SO READING THEM NEITHER DECODES NOR COPIES THE PIXELS, AND PROCESSES THAT MAP THE SAME FILE SHARE ITS PAGES
+IN THE PAGE CACHE INSTEAD OF HOLDING ONE COPY EACH. RASTERS THAT CANNOT BE MAPPED (COMPRESSED, TILED, REMOTE OR IN A
+FOREIGN BYTE ORDER) ARE READ WITH GDAL AS BEFORE.
+'''
+
+import os
+import numpy as np
+import rasterio
+from rasterio.enums import Interleaving
+
+# ENVI interleaves: shape of the pixels in the file and the axes that turn it into (bands, height, width)
+ENVI_LAYOUTS = {
+    'bsq': (lambda bands, height, width: (bands, height, width), (0, 1, 2)),
+    'bil': (lambda bands, height, width: (height, bands, width), (1, 0, 2)),
+    'bip': (lambda bands, height, width: (height, width, bands), (2, 0, 1)),
+}
+
+# Native byte order of this machine, as in numpy dtypes
+NATIVE_BYTE_ORDER = '<' if np.little_endian else '>'
+
+# Byte offset of the block of a band in a GeoTIFF, from GDAL's TIFF metadata domain
+def tiff_block_offset(src, bidx, row, col=0):
+    offset = src.get_tag_item(f'BLOCK_OFFSET_{col}_{row}', 'TIFF', bidx=bidx)
+    return int(offset) if offset else None
+
+# File layout of the pixels of a GeoTIFF: (offset, shape in the file, axes to (bands, height, width)),
+# where the shape of band-interleaved pixels is (bands, elements from one band to the next)
+def tiff_layout(src, path, itemsize):
+    with open(path, 'rb') as fh:
+        byte_order = {b'II': '<', b'MM': '>'}.get(fh.read(2))
+    strip_rows, strip_width = src.block_shapes[0]
+    if (byte_order != NATIVE_BYTE_ORDER or src.compression is not None or strip_width != src.width
+            or src.tags(1, ns='IMAGE_STRUCTURE').get('NBITS')):
+        return None
+
+    # every strip must follow the previous one without a gap, and every band the previous band
+    # (GDAL may pad the last strip of a band to a full strip); all strips are checked, since a
+    # TIFF may store them in any order
+    pixel = src.count == 1 or src.interleaving == Interleaving.pixel
+    strip_bytes = strip_rows * src.width * itemsize * (src.count if pixel else 1)
+    strips = (src.height - 1) // strip_rows + 1
+    offset = tiff_block_offset(src, 1, 0)
+    band_bytes = tiff_block_offset(src, 2, 0) - offset if not pixel else 0
+    if not pixel and (band_bytes < src.height * src.width * itemsize or band_bytes % itemsize):
+        return None
+    expected = np.arange(strips, dtype=np.int64) * strip_bytes
+    for bidx in [1] if pixel else range(1, src.count + 1):
+        offsets = [tiff_block_offset(src, bidx, row) for row in range(strips)]
+        if None in offsets or not np.array_equal(offsets, expected + offset + (bidx - 1) * band_bytes):
+            return None
+    if pixel:
+        return offset, (src.height, src.width, src.count), (2, 0, 1)
+    return offset, (src.count, band_bytes // itemsize), (0, 1, 2)
+
+# File layout of the pixels of an ENVI file, from its header
+def envi_layout(src):
+    header = src.tags(ns='ENVI')
+    byte_order = '>' if header.get('byte_order', '0').strip() == '1' else '<'
+    interleave = header.get('interleave', 'bsq').strip().lower()
+    if byte_order != NATIVE_BYTE_ORDER or interleave not in ENVI_LAYOUTS:
+        return None
+    shape, axes = ENVI_LAYOUTS[interleave]
+    return int(header.get('header_offset', 0)), shape(src.count, src.height, src.width), axes
+
+# Memory-map a raster
+def memmap_raster(src, mode='r'):
+    """
+    Return the bands of an open rasterio dataset as a (bands, height, width) numpy.memmap view, or
+    None when the pixels are not stored as a plain array in a local file.
+
+    mode is 'r' for read-only views, 'c' for copy-on-write views that can be modified in place
+    without touching the file (only the modified pages take memory), or 'r+' to write to the file.
+    """
+    path = src.files[0] if src.files else None
+    if src.driver not in ('GTiff', 'ENVI') or path is None or not os.path.isfile(path) or len(set(src.dtypes)) != 1:
+        return None
+    try:
+        dtype = np.dtype(src.dtypes[0])
+    except TypeError:
+        return None  # e.g. complex integers, which NumPy has no dtype for
+
+    layout = tiff_layout(src, path, dtype.itemsize) if src.driver == 'GTiff' else envi_layout(src)
+    if layout is None:
+        return None
+    offset, shape, axes = layout
+    image = np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=shape)
+    if image.ndim == 2:
+        # bands one after the other, each maybe followed by padding
+        image = image[:, :src.height * src.width].reshape(src.count, src.height, src.width)
+    return image.transpose(axes)
+
+# Window reader of a dataset: a slice of its memory map when it can be mapped, a GDAL read otherwise
+def window_reader(src, copy=True):
+    """
+    Return read(window), which gives the (bands, height, width) pixels of a window of src.
+
+    With copy=False the pixels of a mapped raster come back as a read-only view of the file;
+    with copy=True they are copied into a new array that the caller may modify.
+    """
+    image = memmap_raster(src)
+    if image is None:
+        return lambda window: src.read(window=window)
+    if copy:
+        return lambda window: np.array(image[(Ellipsis,) + window.toslices()])
+    return lambda window: image[(Ellipsis,) + window.toslices()]
+
+# Create an uncompressed raster and map it for writing
+def create_raster_memmap(path, profile):
+    """
+    Create an uncompressed, striped, band-interleaved GeoTIFF for profile and return it as a writable
+    (bands, height, width) numpy.memmap. Pixels assigned to the array are written to the file.
+    """
+    profile = {key: value for key, value in profile.items()
+               if key.lower() not in ('compress', 'predictor', 'tiled', 'blockxsize', 'blockysize', 'interleave')}
+    with rasterio.open(path, 'w', **dict(profile, driver='GTiff', interleave='band', BIGTIFF='IF_NEEDED')):
+        pass  # GDAL allocates every strip when the file is closed
+    with rasterio.open(path) as src:
+        image = memmap_raster(src, 'r+')
+    if image is None:
+        raise ValueError("Invalid profile. The profile must describe a raster that GDAL stores as a plain array.")
+    return image
@@ -1,126 +1,67 @@
-import os
-import numpy as np
 import rasterio
-from rasterio.warp import calculate_default_transform, reproject, Resampling
-from scipy.ndimage import filters
-from osgeo import gdal
+import rasterio.shutil
+from .sar_pipeline import run_pipeline, intensity_stage, thermal_noise_stage, calibration_stage, speckle_stage, speckle_filtering, geometric_correction
+from .orbit import orbit_tags
+
+# Tile size of the streaming thermal noise removal
+NOISE_TILE_SIZE = 1024
 
 # Apply Orbit File
 def apply_orbit_file(input_file, orbit_file, output_file):
-    # open the input dataset
-    src = gdal.Open(input_file, gdal.GA_ReadOnly)
-
-    # read the metadata
-    metadata = src.GetMetadata()
-
-    # update the metadata with the orbit file
-    metadata['Orbit File'] = orbit_file
-
-    # create the output dataset
-    driver = gdal.GetDriverByName('GTiff')
-    dst = driver.CreateCopy(output_file, src)
-
-    # set the updated metadata
-    dst.SetMetadata(metadata)
+    # the output is a VRT (e.g. 'scene_orbit.vrt') that references the pixels of the input, so
+    # applying the orbit writes the metadata only and never copies the scene
+    with rasterio.open(input_file) as src:
+        tags = orbit_tags(orbit_file, src.tags())
 
-    # close the datasets
-    src = None
-    dst = None
+    # create the output dataset and add the orbit to the metadata of the input
+    rasterio.shutil.copy(input_file, output_file, driver='VRT')
+    with rasterio.open(output_file, 'r+') as dst:
+        dst.update_tags(**tags)
 
     print('Orbit file applied')
 
 # Thermal Noise Removal
-def remove_thermal_noise(input_file, output_file):
-    # read the input data
-    with rasterio.open(input_file) as src:
-        image = src.read(1)
-
-    # compute the thermal noise
-    thermal_noise = np.mean(image)
-
-    # subtract the thermal noise from the image
-    image_denoised = image - thermal_noise
-
-    # write the denoised image to the output file
-    with rasterio.open(output_file, 'w', **src.profile) as dst:
-        dst.write(image_denoised, 1)
+def remove_thermal_noise(input_file, output_file, tile_size=NOISE_TILE_SIZE, mode='scene', bursts=None):
+    # the noise is estimated block by block and subtracted tile by tile, so the scene is never
+    # held in memory (tile_size=None processes it in memory instead)
+    run_pipeline(input_file, output_file, [thermal_noise_stage(mode, bursts)], tile_size=tile_size)
 
     print('Thermal noise removed')
 
 # Radiometric Correction
-def radiometric_correction(input_file, output_file):
-    # read the input data
-    with rasterio.open(input_file) as src:
-        image = src.read(1)
-
-    # apply radiometric correction
-    # NOTE: this is a simplified example and may not be accurate
-    calibration_constant = 1  # Replace with actual calibration constant
-    image_calibrated = image * calibration_constant
-
-    # write the calibrated image to the output file
-    with rasterio.open(output_file, 'w', **src.profile) as dst:
-        dst.write(image_calibrated, 1)
+def radiometric_correction(input_file, output_file, tile_size=None, calibration_file=None, calibration_type='sigma0', calibration_unit='linear'):
+    # calibration_file is the calibration annotation of the product (calibration-*.xml), or a list with
+    # the annotation of every polarisation band
+    run_pipeline(input_file, output_file, [calibration_stage(calibration_file=calibration_file, calibration_type=calibration_type, unit=calibration_unit)],
+                 tile_size=tile_size)
 
     print('Radiometric correction completed')
 
-# Speckle Filtering
-def speckle_filtering(input_file, output_file):
-    # read the input data
-    with rasterio.open(input_file) as src:
-        image = src.read(1)
-
-    # apply speckle filtering
-    # NOTE: this is a simplified example and may not be accurate
-    image_filtered = filters.median_filter(image, size=3)
-
-    # write the filtered image to the output file
-    with rasterio.open(output_file, 'w', **src.profile) as dst:
-        dst.write(image_filtered, 1)
-
-    print('Speckle filtering completed')
-
-# Geometric Correction
-def geometric_correction(input_file, output_file, dst_crs):
-    # read the input data
-    with rasterio.open(input_file) as src:
-        transform, width, height = calculate_default_transform(src.crs, dst_crs, src.width, src.height, *src.bounds)
-        kwargs = src.meta.copy()
-        kwargs.update({'crs': dst_crs, 'transform': transform, 'width': width, 'height': height})
-
-        with rasterio.open(output_file, 'w', **kwargs) as dst:
-            for i in range(1, src.count + 1):
-                reproject(source=rasterio.band(src, i),
-                          destination=rasterio.band(dst, i),
-                          src_transform=src.transform,
-                          src_crs=src.crs,
-                          dst_transform=transform,
-                          dst_crs=dst_crs,
-                          resampling=Resampling.bilinear)
-
-    print('Geometric correction completed')
-
 # Final Function to perform entire pre-processing
-def preprocess_s1(input_file, orbit_file, output_file, dst_crs):
-    # create temporary files
-    temp_file1 = 'temp1.tif'
-    temp_file2 = 'temp2.tif'
-
-    # apply orbit file
-    apply_orbit_file(input_file, orbit_file, temp_file1)
-
-    # remove thermal noise
-    remove_thermal_noise(temp_file1, temp_file2)
-
-    # apply radiometric correction
-    radiometric_correction(temp_file2, temp_file1)
-
-    # apply speckle filtering
-    speckle_filtering(temp_file1, temp_file2)
-
-    # apply geometric correction
-    geometric_correction(temp_file2, output_file, dst_crs)
-
-    # remove temporary files
-    os.remove(temp_file1)
-    os.remove(temp_file2)
+def preprocess_s1(input_file, orbit_file, output_file, dst_crs, tile_size=None, workers=1, scratch_dir=None,
+                  speckle_method='median', speckle_size=3, output_format=None, noise_mode='scene', bursts=None, gdal_threads=None,
+                  calibration_file=None, calibration_type='sigma0', calibration_unit='linear'):
+    # orbit file, thermal noise removal, radiometric correction, speckle filtering and
+    # geometric correction run in memory with a single read and a single write (the orbit is
+    # only carried as metadata, interpolated at the acquisition times of the scene),
+    # or tile by tile when a tile_size is given; speckle_method is any filter of SPECKLE_FILTERS,
+    # noise_mode any mode of NOISE_MODES; gdal_threads decompresses the source blocks in parallel;
+    # with a calibration_file the bands are calibrated to sigma0, beta0 or gamma0 in 'linear' or 'db' units,
+    # and the noise is then removed from the intensities (DN^2) rather than from the amplitudes
+    with rasterio.open(input_file) as src:
+        tags = orbit_tags(orbit_file, src.tags())
+    if calibration_file is None:
+        stages = [thermal_noise_stage(noise_mode, bursts), calibration_stage()]
+    else:
+        stages = [intensity_stage(), thermal_noise_stage(noise_mode, bursts),
+                  calibration_stage(calibration_file=calibration_file, calibration_type=calibration_type, unit=calibration_unit, amplitude=False)]
+    run_pipeline(input_file,
+                 output_file,
+                 stages + [speckle_stage(speckle_size, speckle_method)],
+                 dst_crs=dst_crs,
+                 tags=tags,
+                 tile_size=tile_size,
+                 workers=workers,
+                 scratch_dir=scratch_dir,
+                 output_format=output_format,
+                 gdal_threads=gdal_threads)
@@ -0,0 +1,272 @@
+'''
+IN-MEMORY SAR PRE-PROCESSING PIPELINE SHARED BY THE SENTINEL-1, ALOS PALSAR AND TERRASAR-X MODULES.
+EACH PROCESSING STEP IS AN ARRAY-TO-ARRAY STAGE, SO A FULL CHAIN READS THE INPUT ONCE AND WRITES THE OUTPUT ONCE.
+ALL BANDS (E.G. VV AND VH) ARE PROCESSED TOGETHER AS A (BANDS, HEIGHT, WIDTH) ARRAY IN THAT SAME PASS.
+WITH A TILE SIZE THE SAME CHAIN STREAMS HALOED WINDOWS, SO PEAK MEMORY DEPENDS ON THE TILE SIZE AND NOT THE SCENE SIZE.
+THE WINDOWS ARE MADE OF WHOLE BLOCKS OF THE SOURCE AND OF THE OUTPUT, SO EVERY COMPRESSED BLOCK IS DECODED AND WRITTEN ONCE.
+UNCOMPRESSED SOURCES AND INTERMEDIATES ARE MEMORY-MAPPED, AND STAGES THAT OWN THEIR IMAGE UPDATE IT IN PLACE.
+'''
+
+import os
+import tempfile
+from collections import namedtuple
+from functools import partial
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from .tile_scheduler import aligned_tile_shape, iter_windows, run_tile, imap_tiles, map_tiles
+from .warp_plan import get_warp_plan
+from .speckle_filters import speckle_filter
+from .stage_arrays import stage_output, working_dtype
+from .thermal_noise import estimate_thermal_noise, thermal_noise_removal
+from .calibration import calibrate, detected_intensity, get_calibration
+from .output_format import encode_output, get_output_format, open_output, output_blocksize, write_output
+from .raster_memmap import create_raster_memmap, memmap_raster, window_reader
+
+# A pipeline stage: func(image, context) returns the processed image, halo is the number of
+# neighbouring pixels func needs on every side of a tile, prepare(blocks, context) is an
+# optional reduction over the (window, block) pairs of the whole scene (e.g. a global statistic)
+# run before the main pass, and unit is 'db' for a stage that outputs decibels
+Stage = namedtuple('Stage', ['func', 'halo', 'prepare', 'unit'], defaults=(0, None, 'linear'))
+
+# Tile size used to parallelise in-memory stages
+PARALLEL_TILE_SIZE = 512
+
+# GDAL settings of a run: gdal_threads decodes the blocks of a read on that many threads
+# ('ALL_CPUS' for all cores, None for GDAL's single-threaded default)
+def gdal_env(gdal_threads=None):
+    return rasterio.Env(GDAL_NUM_THREADS=str(gdal_threads)) if gdal_threads else rasterio.Env()
+
+# Tile shape made of whole blocks of the source and of the output
+def block_tile_shape(src, tile_size, output_format=None):
+    blocksize = output_blocksize(src.profile, output_format)
+    return aligned_tile_shape(src.width, src.height, tile_size, [src.block_shapes[0], (blocksize, blocksize)])
+
+# Read Raster
+def read_raster(input_file):
+    """
+    Read all bands of a raster as a (bands, height, width) array together with its profile and metadata tags.
+
+    Uncompressed band-interleaved rasters are not read but mapped copy-on-write, so the array may be
+    modified in place without touching the file.
+    """
+    with rasterio.open(input_file) as src:
+        image = memmap_raster(src, 'c')
+        # pixel-interleaved bands would be strided in memory, which slows every stage down more than
+        # GDAL takes to de-interleave them
+        if image is None or image.strides[-1] != image.itemsize:
+            image = src.read()
+        profile = src.profile.copy()
+        tags = src.tags()
+    return image, profile, tags
+
+# Write Raster
+def write_raster(output_file, image, profile, tags=None, output_format=None):
+    """Write a (bands, height, width) array to a new raster in an OutputFormat (tiled float32 by default)."""
+    write_output(output_file, image, profile, output_format, tags)
+
+# Per-band parameters: a scalar applies to every band, a sequence holds one value per band
+def band_values(value, image):
+    value = np.asarray(value, dtype=working_dtype(image))
+    if value.ndim == 0:
+        return value
+    return value.reshape((-1,) + (1,) * (image.ndim - 1))
+
+# Radiometric Calibration Stage
+def radiometric_scaling(image, context=None, calibration_constant=1):
+    # NOTE: this is a simplified example and may not be accurate
+    return np.multiply(image, band_values(calibration_constant, image), out=stage_output(image, context), dtype=working_dtype(image))
+
+# Stage Factories
+def thermal_noise_stage(mode='scene', bursts=None):
+    # one noise value per band ('scene'), range line ('row'), range sample ('column') or burst of
+    # lines ('burst', where bursts is the number of lines per burst or the first line of each)
+    return Stage(partial(thermal_noise_removal, mode=mode, bursts=bursts),
+                 prepare=partial(estimate_thermal_noise, mode=mode, bursts=bursts))
+
+def intensity_stage():
+    # amplitude DNs squared into intensities, e.g. to remove thermal noise in the intensity domain
+    return Stage(detected_intensity)
+
+def calibration_stage(calibration_constant=1, calibration_file=None, calibration_type='sigma0', unit='linear', amplitude=True):
+    # calibration_constant may be a sequence with one constant per band; with a calibration_file (or one
+    # file per band, e.g. per Sentinel-1 polarisation) the bands are calibrated with the LUTs of the sensor
+    # to a calibration_type of CALIBRATION_TYPES in 'linear' or 'db' units, from amplitudes or, with
+    # amplitude=False, from intensities
+    if calibration_file is None:
+        return Stage(partial(radiometric_scaling, calibration_constant=calibration_constant))
+    files = [calibration_file] if isinstance(calibration_file, (str, os.PathLike)) else calibration_file
+    luts = tuple(lut for path in files for lut in get_calibration(path))
+    return Stage(partial(calibrate, luts=luts, calibration_type=calibration_type, unit=unit, amplitude=amplitude), unit=unit)
+
+def speckle_stage(size=3, method='median', **params):
+    # a size x size window needs size // 2 neighbours on each side (size may be a sequence with
+    # one window size per band); method is any filter of SPECKLE_FILTERS
+    return Stage(partial(speckle_filter, method=method, size=size, **params), halo=int(np.max(size)) // 2)
+
+# Geometric Correction Stage
+def reproject_array(image, profile, dst_crs, workers=1):
+    """Reproject an in-memory band or band stack to dst_crs and return it with the matching output profile."""
+    # the warp plan of a source grid is built once and reused by every scene on the same grid
+    plan = get_warp_plan(profile['crs'], profile['transform'], profile['width'], profile['height'], dst_crs)
+    return plan.warp(image, workers, profile.get('nodata') or 0), plan.profile(profile)
+
+# Process a single haloed tile
+def process_tile(read, stages, context, inner, outer):
+    image = read(outer)
+    return run_tile([stage.func for stage in stages], image, dict(context, window=outer), inner, outer)
+
+# Stream processed tiles
+def stream_tiles(src, stages, context, tile_size, workers=1, executor='thread'):
+    halo = sum(stage.halo for stage in stages)
+    windows = iter_windows(src.width, src.height, tile_size, halo)
+    read = window_reader(src)  # every tile is a new array, which the stages may update in place
+    if workers == 1:
+        for inner, outer in windows:
+            yield inner, process_tile(read, stages, context, inner, outer)
+        return
+
+    # tiles are read here, since datasets are not thread-safe, and processed by the pool
+    tiles = ((inner, outer, read(outer), dict(context, window=outer)) for inner, outer in windows)
+    yield from imap_tiles([stage.func for stage in stages], tiles, workers, executor)
+
+# Warp one output tile from the source window it samples from, read beforehand (None outside of the source)
+def warp_tile(source, context, plan, nodata=0):
+    return plan.warp_window(lambda source_window: source, context['window'], np.float32, nodata)
+
+# Geometric Correction of a file, one output tile at a time
+def reproject_tiled(input_file, output_file, dst_crs, tile_size, tags=None, output_format=None, scratch_dir=None, workers=1):
+    with rasterio.open(input_file) as src:
+        plan = get_warp_plan(src.crs, src.transform, src.width, src.height, dst_crs)
+        profile = plan.profile(src.profile)
+        blocksize = output_blocksize(profile, output_format)
+
+        # every output tile covers whole output blocks and reads only the source window it samples from,
+        # straight from the memory map of an uncompressed source; the tiles are read here, since datasets
+        # are not thread-safe, and warped by workers threads
+        read = window_reader(src, copy=False)
+        windows = iter_windows(plan.width, plan.height, aligned_tile_shape(plan.width, plan.height, tile_size, [(blocksize, blocksize)]))
+        sources = ((window, plan.source_window(window)) for window, _ in windows)
+        tiles = ((window, window, read(source) if source is not None else None, {'window': window}) for window, source in sources)
+        warp = partial(warp_tile, plan=plan, nodata=src.nodata or 0)
+        if workers == 1:
+            tiles = ((inner, run_tile([warp], image, context, inner, outer)) for inner, outer, image, context in tiles)
+        else:
+            tiles = imap_tiles([warp], tiles, workers, 'thread')
+
+        with open_output(output_file, profile, output_format, scratch_dir) as dst:
+            for window, tile in tiles:
+                # windows outside of the source come back as a single nodata band
+                tile = np.broadcast_to(tile, (src.count,) + tile.shape[-2:])
+                dst.write(encode_output(tile, output_format), window=window)
+            if tags:
+                dst.update_tags(**tags)
+
+# Streaming variant of run_pipeline
+def run_pipeline_tiled(input_file, output_file, stages, dst_crs, tags, tile_size, workers, executor, scratch_dir, output_format):
+    with rasterio.open(input_file) as src:
+        profile = src.profile.copy()
+        context = {'profile': profile, 'tags': dict(src.tags(), **(tags or {})), 'in_place': True}
+        tile_shape = block_tile_shape(src, tile_size, output_format)
+
+        # scene-wide reductions see the output of the stages before them, one tile at a time
+        for i, stage in enumerate(stages):
+            if stage.prepare is not None:
+                stage.prepare(stream_tiles(src, stages[:i], context, tile_shape), context)
+
+        with tempfile.TemporaryDirectory(dir=scratch_dir) as scratch:
+            tiles = stream_tiles(src, stages, context, tile_shape, workers, executor)
+
+            # without reprojection the tiles go straight to the output
+            if dst_crs is None:
+                with open_output(output_file, profile, output_format, scratch) as dst:
+                    for inner, image in tiles:
+                        dst.write(encode_output(image, output_format), window=inner)
+                    dst.update_tags(**context['tags'])
+                return
+
+            # otherwise they are staged as float32 in one uncompressed, memory-mapped scratch file,
+            # which is then warped tile by tile into an output tiled like the source
+            staging = os.path.join(scratch, 'staging.tif')
+            staged = create_raster_memmap(staging, dict(profile, dtype='float32'))
+            for inner, image in tiles:
+                staged[(Ellipsis,) + inner.toslices()] = image
+            staged.flush()
+            del staged
+            output_format = get_output_format(output_format)._replace(blocksize=output_blocksize(profile, output_format))
+            reproject_tiled(staging, output_file, dst_crs, tile_size, context['tags'], output_format, scratch)
+
+# Run a chain of stages with a single read and a single write
+def run_pipeline(input_file, output_file, stages, dst_crs=None, tags=None, tile_size=None, workers=1, executor='thread', scratch_dir=None,
+                 output_format=None, gdal_threads=None):
+    """
+    Run stages over all bands of input_file and write the result once to output_file.
+
+    Each stage is a Stage or a plain callable taking a (bands, height, width) image and the
+    context, and returning a new image. Every band, e.g. VV and VH of a dual-pol product, goes
+    through the same single read and single write.
+    The context is a dict holding the source 'profile' and the metadata 'tags' that are written
+    to the output. When dst_crs is given, the result is reprojected before the final write.
+
+    By default the whole scene is processed in memory. With tile_size, the bands are streamed in
+    windows of about tile_size x tile_size grown by the halo of the stages, so the stages give the
+    same result as in memory while peak memory depends on the tile size only. The windows are made
+    of whole blocks of the source (full rows for a striped source) and of the output tiles, so no
+    compressed block is decoded or written twice. The reprojection then runs one output tile at a
+    time from a single scratch file tiled like the output.
+
+    With workers other than 1, tiles are processed concurrently in a 'thread' or 'process' pool
+    (workers=None uses all CPU cores). The stitched output is bit-identical to a serial run.
+    Scratch files of the streaming mode go to scratch_dir (the system temp directory by default).
+
+    output_format is an OutputFormat, a dict of its fields or just its dtype ('float32' or
+    'db_int16'); by default the output is a float32 GeoTIFF with DEFLATE-compressed tiles, tiled
+    like the source when the source is tiled. A 'db_int16' output takes linear values, so it cannot follow
+    a stage that already outputs decibels.
+
+    gdal_threads ('ALL_CPUS' or a number of threads) lets GDAL decompress the blocks of every read
+    in parallel, which pays off on compressed sources.
+    """
+    stages = [stage if isinstance(stage, Stage) else Stage(stage) for stage in stages]
+    if get_output_format(output_format).dtype == 'db_int16' and any(stage.unit == 'db' for stage in stages):
+        raise ValueError("Invalid output format. A 'db_int16' output converts linear values to decibels, so the stages must "
+                         "output linear values (calibrate with unit='linear').")
+    with gdal_env(gdal_threads):
+        if tile_size is not None:
+            run_pipeline_tiled(input_file, output_file, stages, dst_crs, tags, tile_size, workers, executor, scratch_dir, output_format)
+            return
+
+        image, profile, src_tags = read_raster(input_file)
+    # the pipeline owns the image (a new array or a copy-on-write map), so stages may update it in place
+    context = {'profile': profile, 'tags': dict(src_tags, **(tags or {})), 'in_place': True}
+
+    # chain the stages without touching the disk
+    for stage in stages:
+        if stage.prepare is not None:
+            stage.prepare([(Window(0, 0, image.shape[-1], image.shape[-2]), image)], context)
+        if workers == 1:
+            image = stage.func(image, context)
+        else:
+            image = map_tiles(image, stage.func, context, stage.halo, PARALLEL_TILE_SIZE, workers, executor)
+
+    # apply geometric correction
+    if dst_crs is not None:
+        image, profile = reproject_array(image, profile, dst_crs, workers)
+
+    write_raster(output_file, image, profile, context['tags'], output_format)
+
+# Speckle Filtering
+def speckle_filtering(input_file, output_file, tile_size=None, workers=1, method='median', size=3, output_format=None, gdal_threads=None, **params):
+    run_pipeline(input_file, output_file, [speckle_stage(size, method, **params)], tile_size=tile_size, workers=workers, output_format=output_format,
+                 gdal_threads=gdal_threads)
+
+    print('Speckle filtering completed')
+
+# Geometric Correction
+def geometric_correction(input_file, output_file, dst_crs, workers=1, output_format=None, gdal_threads=None, tile_size=PARALLEL_TILE_SIZE):
+    # the output is warped tile by tile, each tile reading only the source window it samples from, so
+    # neither the scene nor its warped copy is held in memory
+    with gdal_env(gdal_threads):
+        reproject_tiled(input_file, output_file, dst_crs, tile_size, output_format=output_format, workers=workers)
+
+    print('Geometric correction completed')
@@ -0,0 +1,216 @@
+'''
+SPECKLE FILTERS FOR THE SAR PRE-PROCESSING PIPELINE.
+FILTERS ARE REGISTERED BY NAME AND SELECTED WITH speckle_stage(method=...). THE ADAPTIVE FILTERS (LEE, REFINED LEE,
+FROST AND GAMMA-MAP) COMPUTE THEIR LOCAL STATISTICS WITH SEPARABLE SUMS. EVERY WINDOW IS SUMMED IN THE SAME ORDER
+WHEREVER A TILE STARTS, SO TILED AND PARALLEL RUNS ARE BIT-IDENTICAL TO A RUN OVER THE FULL RASTER. EVERY FILTER
+WORKS ON THE LAST TWO AXES, SO BANDS ARE NEVER MIXED.
+'''
+
+import numpy as np
+
+# Registry of speckle filters: name -> func(image, size, **params)
+SPECKLE_FILTERS = {}
+
+# Number of damping levels the Frost filter interpolates between
+FROST_LEVELS = 8
+
+# Register a speckle filter under a name
+def register_speckle_filter(name):
+    def register(func):
+        SPECKLE_FILTERS[name] = func
+        return func
+    return register
+
+# Window size over the last two axes only
+def window_shape(image, size):
+    return (1,) * (image.ndim - 2) + (size, size)
+
+# Window Sums
+def window_sum(values, size):
+    """
+    Return the sum of a size x size window around every pixel.
+
+    Every sum is taken directly over its window rather than as a running sum, so it does not depend
+    on where the array starts: a tile with a halo gets exactly the sums of the full raster.
+    """
+    from scipy.ndimage import correlate1d
+    weights = np.ones(size)
+    return correlate1d(correlate1d(values, weights, axis=-1, mode='reflect'), weights, axis=-2, mode='reflect')
+
+# Local Statistics
+def local_statistics(image, size):
+    """Return the local mean and variance of a size x size window around every pixel."""
+    image = np.asarray(image, dtype=np.float64)
+    mean = window_sum(image, size)
+    mean /= size * size
+    variance = window_sum(np.square(image), size)
+    variance /= size * size
+    # the variance is computed in the array of the mean squares, without further full-size temporaries
+    variance -= np.square(mean)
+    return mean, np.maximum(variance, 0, out=variance)
+
+# Squared coefficient of variation, 0 where the mean is 0
+def variation(mean, variance):
+    return np.divide(variance, mean * mean, out=np.zeros_like(variance), where=mean != 0)
+
+# Lee weighting of a pixel against the mean and variance of its window (variance is overwritten
+# with the result, so the weighting needs a single full-size temporary)
+def lee_weighting(image, mean, variance, looks):
+    noise = 1.0 / looks  # squared coefficient of variation of fully developed speckle
+    weight = np.square(mean)
+    weight *= -noise
+    weight += variance
+    weight /= 1 + noise
+    np.maximum(weight, 0, out=weight)  # signal variance
+    np.divide(weight, variance, out=weight, where=variance > 0)
+    weight[variance <= 0] = 0
+    np.subtract(image, mean, out=variance)
+    variance *= weight
+    variance += mean
+    return variance
+
+# Median Filter
+@register_speckle_filter('median')
+def median_speckle_filter(image, size=3):
+    # NOTE: this is a simplified example and may not be accurate
+    from scipy.ndimage import median_filter
+    # each band is filtered on its own, never across bands
+    return median_filter(image, size=window_shape(image, size))
+
+# Lee Filter
+@register_speckle_filter('lee')
+def lee_filter(image, size=7, looks=1):
+    mean, variance = local_statistics(image, size)
+    return lee_weighting(np.asarray(image, dtype=np.float64), mean, variance, looks)
+
+# Refined Lee Filter
+@register_speckle_filter('refined_lee')
+def refined_lee_filter(image, size=7, looks=1):
+    """
+    Lee filter over the half of the window on the homogeneous side of the strongest edge.
+
+    The window is divided into a 3 x 3 grid of sub-windows. The edge direction (0, 45, 90 or 135
+    degrees) is the one with the largest difference between the sub-windows on either side, and the
+    statistics are taken from the six sub-windows on the side whose mean is closest to the centre.
+    Windows smaller than 5 x 5 have no edge directions and get the plain Lee filter.
+    """
+    if size < 5:
+        return lee_filter(image, size, looks)
+    image = np.asarray(image, dtype=np.float64)
+    sub = max(3, (size // 3) | 1)
+    step = (size - sub) // 2
+
+    # sub-window means and mean squares at the 3 x 3 grid offsets, e.g. means[(-1, 1)] is the upper right one
+    pad = ((0, 0),) * (image.ndim - 2) + ((step, step), (step, step))
+    height, width = image.shape[-2:]
+    grids = []
+    for values in (image, image * image):
+        padded = np.pad(window_sum(values, sub) / (sub * sub), pad, mode='edge')
+        grids.append({(i, j): padded[..., step + i * step:step + i * step + height, step + j * step:step + j * step + width]
+                      for i in (-1, 0, 1) for j in (-1, 0, 1)})
+    means, squares = grids
+
+    # each direction: the sub-windows on both sides of the edge and on the edge line itself
+    directions = [
+        ([(-1, -1), (0, -1), (1, -1)], [(-1, 1), (0, 1), (1, 1)], [(-1, 0), (0, 0), (1, 0)]),    # vertical edge
+        ([(-1, -1), (-1, 0), (-1, 1)], [(1, -1), (1, 0), (1, 1)], [(0, -1), (0, 0), (0, 1)]),    # horizontal edge
+        ([(-1, -1), (-1, 0), (0, -1)], [(1, 1), (1, 0), (0, 1)], [(-1, 1), (0, 0), (1, -1)]),    # 45 degree edge
+        ([(-1, 1), (-1, 0), (0, 1)], [(1, -1), (1, 0), (0, -1)], [(-1, -1), (0, 0), (1, 1)]),    # 135 degree edge
+    ]
+    total = lambda grid, cells: sum(grid[cell] for cell in cells)
+    gradients = np.stack([np.abs(total(means, first) - total(means, second)) for first, second, _ in directions])
+    strongest = gradients.argmax(axis=0)
+
+    mean, variance = np.empty_like(image), np.empty_like(image)
+    for k, (first, second, line) in enumerate(directions):
+        selected = strongest == k
+        if not selected.any():
+            continue
+        first_mean, second_mean = total(means, first + line) / 6, total(means, second + line) / 6
+        use_first = np.abs(first_mean - means[(0, 0)]) <= np.abs(second_mean - means[(0, 0)])
+        half_mean = np.where(use_first, first_mean, second_mean)
+        half_square = np.where(use_first, total(squares, first + line), total(squares, second + line)) / 6
+        mean[selected] = half_mean[selected]
+        variance[selected] = np.maximum(half_square - half_mean * half_mean, 0)[selected]
+    return lee_weighting(image, mean, variance, looks)
+
+# Truncated exponential sum along one axis: sum of decay ** |k| * x[n + k] for |k| <= radius
+def exponential_sum(values, decay, radius, axis):
+    # summed directly over the 2 * radius + 1 neighbours (zero beyond the ends), so that the sums of a
+    # tile do not depend on where it starts, unlike those of a recursion running from the first pixel
+    from scipy.ndimage import correlate1d
+    weights = decay ** np.abs(np.arange(-radius, radius + 1))
+    return correlate1d(values, weights, axis=axis, mode='constant')
+
+# Frost Filter
+@register_speckle_filter('frost')
+def frost_filter(image, size=7, damping=2.0, levels=FROST_LEVELS):
+    """
+    Frost filter: an exponentially weighted mean whose decay grows with the local variation.
+
+    The weights decay with the city-block distance, which makes the kernel separable. The image is
+    filtered at a fixed number of decay levels with separable sums, and every pixel is interpolated
+    between the two levels around its own decay, instead of building a kernel for every pixel.
+    levels must be at least 2.
+    """
+    if levels < 2:
+        raise ValueError("Invalid number of levels. The Frost filter needs at least 2 levels.")
+    image = np.asarray(image, dtype=np.float64)
+    radius = size // 2
+    mean, variance = local_statistics(image, size)
+    alpha = damping * variation(mean, variance)
+
+    # evenly spaced damping levels; beyond the last one the weights are concentrated on the centre pixel
+    decays = np.exp(-np.linspace(0.0, 4.0, levels))
+    decay = np.exp(-np.clip(alpha, 0, 4.0))
+
+    pad = ((0, 0),) * (image.ndim - 2) + ((radius, radius), (radius, radius))
+    padded = np.pad(image, pad, mode='symmetric')  # scipy's 'reflect'
+    crop = (Ellipsis, slice(radius, radius + image.shape[-2]), slice(radius, radius + image.shape[-1]))
+    output = np.zeros_like(image)
+    previous = None
+    for level, level_decay in enumerate(decays):
+        smoothed = exponential_sum(exponential_sum(padded, level_decay, radius, -1), level_decay, radius, -2)[crop]
+        norm = (1 + 2 * np.sum(level_decay ** np.arange(1, radius + 1))) ** 2
+        current = smoothed / norm
+        if previous is not None:
+            # linear in the decay, which follows the filtered value more closely than the damping does
+            high, low = decays[level - 1], level_decay
+            inside = (decay <= high) & (decay >= low)
+            fraction = (high - decay[inside]) / (high - low)
+            output[inside] = previous[inside] + fraction * (current[inside] - previous[inside])
+        previous = current
+    return output
+
+# Gamma-MAP Filter
+@register_speckle_filter('gamma_map')
+def gamma_map_filter(image, size=7, looks=1):
+    image = np.asarray(image, dtype=np.float64)
+    mean, variance = local_statistics(image, size)
+    noise = 1.0 / looks
+    ci = variation(mean, variance)  # squared, like noise
+
+    # homogeneous areas get the mean, point targets keep their value, the rest the MAP estimate
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha = (1 + noise) / (ci - noise)
+        b = alpha - looks - 1
+        estimate = (b * mean + np.sqrt(np.maximum(mean * mean * b * b + 4 * alpha * looks * mean * image, 0))) / (2 * alpha)
+    output = np.where(ci <= noise, mean, estimate)
+    return np.where(ci >= 2 * noise, image, output)
+
+# Apply a registered filter
+def speckle_filter(image, context=None, method='median', size=3, **params):
+    """
+    Filter speckle with a registered filter over size x size windows.
+
+    size may be a sequence with one window size per band of a (bands, height, width) image.
+    """
+    if method not in SPECKLE_FILTERS:
+        raise ValueError(f"Invalid speckle filter. The filter must be one of {', '.join(SPECKLE_FILTERS)}.")
+    func = SPECKLE_FILTERS[method]
+
+    # the statistics are computed in float64, the result keeps the precision of the image
+    dtype = np.result_type(np.asarray(image).dtype, np.float32)
+    if np.ndim(size) == 0:
+        return func(image, size, **params).astype(dtype, copy=False)
+    return np.stack([func(band, band_size, **params) for band, band_size in zip(image, size)]).astype(dtype, copy=False)
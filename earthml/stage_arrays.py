@@ -0,0 +1,24 @@
+'''
+WORKING ARRAYS OF THE SAR PRE-PROCESSING STAGES.
+THE STAGES COMPUTE IN FLOATING POINT: FLOAT IMAGES KEEP THEIR PRECISION AND INTEGER IMAGES ARE PROMOTED TO FLOAT32.
+AN IMAGE THE PIPELINE OWNS (context['in_place']) IS UPDATED IN PLACE, OTHERWISE A STAGE WRITES TO A SINGLE NEW ARRAY.
+'''
+
+import numpy as np
+
+# Floating-point dtype the stages compute in: float images keep their precision, complex images
+# take the precision of their magnitude, and integer images (e.g. digital numbers) are promoted
+# to float32 and never to float64
+def working_dtype(image):
+    if np.issubdtype(image.dtype, np.floating):
+        return image.dtype
+    if np.issubdtype(image.dtype, np.complexfloating):
+        return image.real.dtype
+    return np.dtype(np.float32)
+
+# Output array of a stage: the image itself when the pipeline owns it (context['in_place']) and it
+# already has the working dtype, otherwise None for a new array
+def stage_output(image, context=None):
+    if context and context.get('in_place') and image.flags.writeable and image.dtype == working_dtype(image):
+        return image
+    return None
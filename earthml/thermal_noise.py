@@ -0,0 +1,157 @@
+'''
+THERMAL NOISE ESTIMATION AND REMOVAL FOR THE SAR PRE-PROCESSING PIPELINE.
+THE NOISE IS ESTIMATED IN ONE STREAMING PASS OVER BLOCKS OF THE SCENE: EVERY BLOCK IS REDUCED TO A COUNT, A MEAN AND A
+SUM OF SQUARED DEVIATIONS PER GROUP OF PIXELS, AND THE BLOCKS ARE MERGED WITH CHAN'S PARALLEL FORM OF WELFORD'S UPDATE,
+SO THE ESTIMATE STAYS ACCURATE OVER BILLIONS OF PIXELS AND MEMORY DOES NOT GROW WITH THE SCENE.
+A GROUP IS A WHOLE BAND, A RANGE LINE (IMAGE ROW), A RANGE SAMPLE (IMAGE COLUMN) OR A BURST OF LINES.
+NODATA PIXELS ARE LEFT OUT OF THE ESTIMATE AND LEFT UNTOUCHED BY THE CORRECTION.
+'''
+
+import numpy as np
+from rasterio.windows import Window
+from .stage_arrays import stage_output, working_dtype
+
+# Groups of pixels that share one noise value
+NOISE_MODES = ('scene', 'row', 'column', 'burst')
+
+# Rows of a block reduced at a time, so the float64 temporaries stay small
+ESTIMATE_CHUNK_ROWS = 256
+
+# First line of every burst, from the number of lines per burst or the list of first lines
+def burst_starts(bursts, height):
+    if bursts is None:
+        raise ValueError("Invalid bursts. The 'burst' mode needs the lines per burst or the first line of every burst.")
+    if np.ndim(bursts) == 0:
+        return np.arange(0, height, int(bursts))
+    return np.union1d([0], np.asarray(bursts, dtype=np.int64))
+
+# Valid pixels: not NaN and not nodata
+def valid_pixels(image, nodata=None):
+    valid = ~np.isnan(image) if np.issubdtype(image.dtype, np.floating) else np.ones(image.shape, dtype=bool)
+    if nodata is not None and not np.isnan(nodata):
+        valid &= image != nodata
+    return valid
+
+# Streaming noise statistics
+class NoiseAccumulator:
+    """
+    Running count, mean and sum of squared deviations of the valid pixels of every group.
+
+    update() takes blocks at any position of a (bands, height, width) raster, in any order, and
+    merge() combines accumulators that saw different blocks, e.g. in different workers.
+    """
+
+    def __init__(self, bands, height, width, mode='scene', bursts=None, nodata=None):
+        if mode not in NOISE_MODES:
+            raise ValueError(f"Invalid noise mode. The mode must be one of {', '.join(NOISE_MODES)}.")
+        self.mode, self.nodata = mode, nodata
+        self.starts = burst_starts(bursts, height) if mode == 'burst' else None
+        groups = {'scene': 1, 'row': height, 'column': width}.get(mode) or len(self.starts)
+        self.count = np.zeros((bands, groups))
+        self.mean = np.zeros((bands, groups))
+        self.m2 = np.zeros((bands, groups))
+
+    def row_groups(self, rows):
+        if self.mode == 'scene':
+            return np.zeros(len(rows), dtype=np.int64)
+        if self.mode == 'row':
+            return rows
+        return np.searchsorted(self.starts, rows, side='right') - 1
+
+    def update(self, window, block):
+        """Add the valid pixels of a (bands, height, width) block read from window."""
+        block = block if block.ndim == 3 else block[None]
+        cols = window.col_off + np.arange(block.shape[-1])
+        for start in range(0, block.shape[-2], ESTIMATE_CHUNK_ROWS):
+            chunk = np.asarray(block[:, start:start + ESTIMATE_CHUNK_ROWS], dtype=np.float64)
+            valid = valid_pixels(chunk, self.nodata)
+            values = np.where(valid, chunk, 0.0)
+
+            # pixel counts and sums per row (or per column), then per group
+            if self.mode == 'column':
+                groups, axis = cols, -2
+            else:
+                groups, axis = self.row_groups(window.row_off + start + np.arange(chunk.shape[-2])), -1
+            count = self.group_sum(valid.sum(axis=axis), groups)
+            mean = np.divide(self.group_sum(values.sum(axis=axis), groups), count, out=np.zeros_like(count), where=count > 0)
+
+            # squared deviations from the mean of the chunk, which keeps them small
+            pixel_mean = mean[:, groups][:, None, :] if self.mode == 'column' else mean[:, groups][:, :, None]
+            m2 = self.group_sum(np.where(valid, (chunk - pixel_mean) ** 2, 0.0).sum(axis=axis), groups)
+            self.combine(count, mean, m2)
+
+    def group_sum(self, values, groups):
+        total = np.zeros(self.count.shape)
+        np.add.at(total, (slice(None), groups), values)
+        return total
+
+    def combine(self, count, mean, m2):
+        # Chan et al.: merge two sets of (count, mean, M2) without revisiting their pixels
+        total = self.count + count
+        delta = mean - self.mean
+        share = np.divide(count, total, out=np.zeros_like(total), where=total > 0)
+        self.mean += delta * share
+        self.m2 += m2 + delta * delta * self.count * share
+        self.count = total
+
+    def merge(self, other):
+        """Add the statistics of another accumulator over the same raster."""
+        self.combine(other.count, other.mean, other.m2)
+        return self
+
+    def noise(self):
+        """Return the (bands, groups) noise estimate, 0 for groups without valid pixels."""
+        return np.where(self.count > 0, self.mean, 0.0)
+
+    def variance(self):
+        return np.divide(self.m2, self.count, out=np.zeros_like(self.m2), where=self.count > 0)
+
+# Noise of every pixel of a window, broadcastable against its (bands, height, width) block
+def noise_field(noise, window, mode='scene', bursts=None, height=None):
+    noise = np.asarray(noise)
+    if mode == 'scene':
+        return noise.reshape((-1, 1, 1)) if noise.ndim else noise
+    if mode == 'column':
+        return noise[:, None, window.col_off:window.col_off + window.width]
+    rows = window.row_off + np.arange(window.height)
+    if mode == 'burst':
+        rows = np.searchsorted(burst_starts(bursts, height), rows, side='right') - 1
+    return noise[:, rows, None]
+
+# Thermal Noise Estimation
+def estimate_thermal_noise(blocks, context, mode='scene', bursts=None):
+    # stream the (window, block) pairs of the scene through one accumulator
+    profile = context['profile']
+    accumulator = NoiseAccumulator(profile['count'], profile['height'], profile['width'], mode, bursts, profile.get('nodata'))
+    for window, block in blocks:
+        accumulator.update(window, block)
+    context['thermal_noise'] = accumulator.noise()
+
+# Thermal Noise Removal Stage
+def thermal_noise_removal(image, context=None, mode='scene', bursts=None):
+    """
+    Subtract the thermal noise of every group of pixels, leaving nodata pixels untouched.
+
+    The noise comes from context['thermal_noise'] (estimated over the whole scene, or given as
+    one value per band) and otherwise from the image itself.
+    """
+    context = context or {}
+    stack = image if image.ndim == 3 else image[None]
+    window = context.get('window') or Window(0, 0, stack.shape[-1], stack.shape[-2])
+    profile = context.get('profile', {})
+    height = profile.get('height', window.row_off + window.height)
+    nodata = profile.get('nodata')
+
+    if 'thermal_noise' in context:
+        noise = context['thermal_noise']
+    else:
+        accumulator = NoiseAccumulator(stack.shape[0], height, profile.get('width', window.col_off + window.width), mode, bursts, nodata)
+        accumulator.update(window, stack)
+        noise = accumulator.noise()
+
+    corrected = stage_output(stack, context)
+    if corrected is None:
+        corrected = stack.astype(working_dtype(stack))
+    valid = valid_pixels(stack, nodata) if nodata is not None else True
+    np.subtract(corrected, noise_field(noise, window, mode, bursts, height).astype(corrected.dtype), out=corrected, where=valid)
+    return corrected if image.ndim == 3 else corrected[0]
@@ -0,0 +1,124 @@
+'''
+TILE-PARALLEL EXECUTION FOR THE SAR PRE-PROCESSING STAGES.
+A RASTER IS SPLIT INTO HALOED TILES, THE TILES ARE PROCESSED CONCURRENTLY IN A THREAD OR PROCESS POOL,
+AND THE CROPPED RESULTS ARE STITCHED BACK TOGETHER, BIT-IDENTICAL TO A SERIAL RUN OVER THE FULL RASTER.
+'''
+
+import math
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+from rasterio.windows import Window
+
+# Tile Windows
+def iter_windows(width, height, tile_size, halo=0):
+    """
+    Yield (inner, outer) window pairs that tile a width x height raster.
+
+    tile_size is the edge length of square tiles or a (tile_height, tile_width) pair.
+    inner is the tile that gets written, outer is the same tile grown by halo pixels on every
+    side and clipped to the raster, so neighbourhood filters see real data at tile edges.
+    """
+    tile_height, tile_width = (tile_size, tile_size) if np.ndim(tile_size) == 0 else tile_size
+    for row in range(0, height, tile_height):
+        for col in range(0, width, tile_width):
+            inner = Window(col, row, min(tile_width, width - col), min(tile_height, height - row))
+            row_start, col_start = max(row - halo, 0), max(col - halo, 0)
+            row_stop = min(row + inner.height + halo, height)
+            col_stop = min(col + inner.width + halo, width)
+            yield inner, Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+
+# Tile shape made of whole blocks
+def aligned_tile_shape(width, height, tile_size, block_shapes):
+    """
+    Return a (tile_height, tile_width) close to tile_size x tile_size whose tiles are made of whole
+    blocks of every (block_height, block_width) layout in block_shapes, e.g. the blocks of the
+    source and of the output.
+
+    Every compressed block is then decoded once and every output block is written once. Blocks
+    as wide as the raster (strips) give tiles of full rows, with about the same number of pixels.
+    """
+    rows = cols = 1
+    for block_height, block_width in block_shapes:
+        # full rows or columns are made of whole blocks of any layout
+        block_rows = min(rows * block_height // math.gcd(rows, block_height), height)
+        block_cols = min(cols * block_width // math.gcd(cols, block_width), width)
+        # a layout on an unrelated grid would need huge tiles, its blocks are then decoded or written more than once
+        if max(block_rows, block_cols if block_cols < width else 0) > 4 * tile_size:
+            continue
+        rows, cols = block_rows, block_cols
+    if cols >= width:
+        return max(rows, round(tile_size * tile_size / width / rows) * rows), width
+    return max(rows, round(tile_size / rows) * rows), max(cols, round(tile_size / cols) * cols)
+
+# Halo Crop
+def crop_halo(image, inner, outer):
+    row, col = inner.row_off - outer.row_off, inner.col_off - outer.col_off
+    return image[..., row:row + inner.height, col:col + inner.width]
+
+# Worker Pool
+def get_executor(workers=None, executor='thread'):
+    """Create a thread or process pool with workers workers (all CPU cores by default)."""
+    workers = workers or os.cpu_count()
+    if executor == 'thread':
+        return ThreadPoolExecutor(max_workers=workers)
+    elif executor == 'process':
+        return ProcessPoolExecutor(max_workers=workers)
+    else:
+        raise ValueError("Invalid executor. The executor must be 'thread' or 'process'.")
+
+# Run a list of stage functions over one tile (module level so process pools can pickle it)
+def run_tile(funcs, image, context, inner, outer):
+    for func in funcs:
+        image = func(image, context)
+    return crop_halo(image, inner, outer)
+
+# Concurrent map over a stream of tiles
+def imap_tiles(funcs, tiles, workers=None, executor='thread'):
+    """
+    Run funcs over (inner, outer, image, context) tiles concurrently and yield (inner, result).
+
+    Tiles are pulled lazily from the iterable and at most two per worker are in flight, so a
+    streamed raster is never held in memory as a whole. Results come back in input order.
+    """
+    workers = workers or os.cpu_count()
+    with get_executor(workers, executor) as pool:
+        pending = deque()
+        for inner, outer, image, context in tiles:
+            pending.append((inner, pool.submit(run_tile, funcs, image, context, inner, outer)))
+            if len(pending) >= 2 * workers:
+                inner, future = pending.popleft()
+                yield inner, future.result()
+        while pending:
+            inner, future = pending.popleft()
+            yield inner, future.result()
+
+# Concurrent map over an in-memory raster
+def map_tiles(image, func, context=None, halo=0, tile_size=512, workers=None, executor='thread'):
+    """
+    Apply func(image, context) to haloed tiles of an image concurrently and stitch the result.
+
+    Args:
+        image (numpy.ndarray): The raster to process, a (height, width) band or a (bands, height, width) stack.
+        func (callable): The stage function. It must be picklable for a process pool.
+        context (dict, optional): The pipeline context. Each tile gets a copy holding its 'window'; tiles
+            are views that share their halos, so stages must not update them in place.
+        halo (int, optional): Number of neighbouring pixels func needs on every side. Defaults to 0.
+        tile_size (int, optional): Edge length of the tiles. Defaults to 512.
+        workers (int, optional): Number of workers. Defaults to all CPU cores.
+        executor (str, optional): 'thread' or 'process'. Defaults to 'thread'.
+
+    Returns:
+        numpy.ndarray: The stitched output, identical to func applied to the whole image.
+    """
+    height, width = image.shape[-2:]
+    tiles = ((inner, outer, image[(Ellipsis,) + outer.toslices()], dict(context or {}, window=outer, in_place=False))
+             for inner, outer in iter_windows(width, height, tile_size, halo))
+
+    output = None
+    for inner, result in imap_tiles([func], tiles, workers, executor):
+        if output is None:
+            output = np.empty(image.shape, dtype=result.dtype)
+        output[(Ellipsis,) + inner.toslices()] = result
+    return output
@@ -0,0 +1,299 @@
+'''
+REUSABLE WARP PLANS FOR THE GEOMETRIC CORRECTION OF SAR SCENES.
+A PLAN COMPUTES THE DESTINATION GRID AND A COARSE LATTICE OF SOURCE COORDINATES OF A SOURCE GEOMETRY ONCE, IS CACHED BY
+THAT GEOMETRY AND THE DESTINATION CRS, AND THEN WARPS ANY NUMBER OF BANDS AND SCENES ON THE SAME GRID, BLOCK BY BLOCK IN
+A THREAD POOL, SKIPPING THE DESTINATION BLOCKS THAT DO NOT OVERLAP THE SOURCE. THE FULL-RESOLUTION SOURCE-PIXEL MAPPINGS
+OF THE BLOCKS ARE REBUILT FROM THE LATTICE AND KEPT IN ONE CACHE SHARED BY ALL PLANS, WHOSE SIZE IS BOUNDED IN BYTES.
+'''
+
+from collections import OrderedDict
+from functools import lru_cache
+import itertools
+import threading
+import numpy as np
+from rasterio.crs import CRS
+from rasterio.warp import calculate_default_transform, transform as transform_coordinates
+from rasterio.transform import array_bounds
+from affine import Affine
+from rasterio.windows import Window
+from .tile_scheduler import iter_windows, get_executor
+
+# Destination pixels between two exactly transformed lattice points; the pixels in between are
+# interpolated, like GDAL's approximate transformer
+LATTICE_STEP = 16
+
+# Destination block size of the warp
+WARP_BLOCK_SIZE = 512
+
+# Source-pixel mappings of all plans together are kept up to this many bytes for reuse (13 bytes
+# per destination pixel, 17 for sources of more than 2 ** 31 pixels)
+MAPPING_CACHE_BYTES = 2 ** 30
+
+# Number of plans kept by get_warp_plan; a plan holds its lattice only, 1/16 byte per destination
+# pixel (about 40 MB for a 25000 x 17000 scene reprojected to EPSG:4326)
+PLAN_CACHE_SIZE = 8
+
+# Identifiers of the plans in the mapping cache
+_plan_ids = itertools.count()
+
+class MappingCache:
+    """
+    Source-pixel mappings of the destination blocks of every plan, up to max_bytes in total.
+
+    Room for a new mapping is made by dropping the mappings of the least recently used other plans,
+    but never those of the plan being warped: a warp visits its blocks in the same order for every
+    band and scene, so evicting the least recently used block of a plan larger than the cache would
+    evict each block just before it is needed again. The first blocks that fit stay cached instead,
+    and the others are rebuilt from the lattice every time.
+    """
+
+    def __init__(self, max_bytes=MAPPING_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.plans = OrderedDict()  # plan id -> {block key: mapping}, least recently used first
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, plan_id, key):
+        with self._lock:
+            mapping = self.plans.get(plan_id, {}).get(key)
+            if mapping is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.plans.move_to_end(plan_id)
+            return mapping
+
+    def put(self, plan_id, key, mapping):
+        size = sum(array.nbytes for array in mapping)
+        with self._lock:
+            mappings = self.plans.setdefault(plan_id, {})
+            self.plans.move_to_end(plan_id)
+            if key in mappings:
+                return
+            while self.nbytes + size > self.max_bytes and next(iter(self.plans)) != plan_id:
+                _, evicted = self.plans.popitem(last=False)
+                self.nbytes -= sum(array.nbytes for value in evicted.values() for array in value)
+            if self.nbytes + size <= self.max_bytes:
+                mappings[key] = mapping
+                self.nbytes += size
+
+    def clear(self):
+        with self._lock:
+            self.plans.clear()
+            self.nbytes = self.hits = self.misses = 0
+
+# Mappings of all plans
+_mapping_cache = MappingCache()
+
+class WarpPlan:
+    """
+    The destination grid and source-pixel mapping of a warp from one source geometry to dst_crs.
+
+    The destination grid is the one of calculate_default_transform. Source pixel coordinates are
+    transformed exactly on a lattice of every LATTICE_STEP destination pixels and bilinearly
+    interpolated in between. Warping samples the source bilinearly, like Resampling.bilinear, from
+    the cached source-pixel mapping of every destination block.
+    """
+
+    def __init__(self, src_crs, src_transform, width, height, dst_crs, block_size=WARP_BLOCK_SIZE):
+        self.src_crs, self.dst_crs = CRS.from_user_input(src_crs), CRS.from_user_input(dst_crs)
+        self.src_transform, self.src_width, self.src_height = src_transform, width, height
+        self.block_size = block_size
+        self.transform, self.width, self.height = calculate_default_transform(
+            self.src_crs, self.dst_crs, width, height, *array_bounds(height, width, src_transform))
+        self.lattice = self._source_lattice()
+        self.blocks = [window for window, _ in iter_windows(self.width, self.height, block_size)]
+        self.overlapping = [window for window in self.blocks if self._overlaps(window)]
+        self.plan_id = next(_plan_ids)
+
+    @classmethod
+    def from_dataset(cls, src, dst_crs, block_size=WARP_BLOCK_SIZE):
+        return cls(src.crs, src.transform, src.width, src.height, dst_crs, block_size)
+
+    # Source pixel coordinates of the lattice nodes, NaN where the transform fails
+    def _source_lattice(self):
+        # one node beyond the last pixel, so every pixel lies between two nodes
+        rows = np.arange(0, self.height + LATTICE_STEP, LATTICE_STEP, dtype=np.float64)
+        cols = np.arange(0, self.width + LATTICE_STEP, LATTICE_STEP, dtype=np.float64)
+        cols, rows = np.meshgrid(cols + 0.5, rows + 0.5)
+        xs, ys = self.transform * (cols.ravel(), rows.ravel())
+        xs, ys = transform_coordinates(self.dst_crs, self.src_crs, xs, ys)
+        src_cols, src_rows = ~self.src_transform * (np.asarray(xs), np.asarray(ys))
+
+        # the mapping puts pixel centres on integers, rasterio on integers + 0.5
+        lattice = np.stack([src_rows, src_cols]).reshape(2, *rows.shape) - 0.5
+        lattice[~np.isfinite(lattice)] = np.nan
+        return lattice
+
+    # Lattice nodes around a destination window
+    def _lattice_nodes(self, window):
+        row_start, col_start = window.row_off // LATTICE_STEP, window.col_off // LATTICE_STEP
+        row_stop = -(-(window.row_off + window.height - 1) // LATTICE_STEP) + 1
+        col_stop = -(-(window.col_off + window.width - 1) // LATTICE_STEP) + 1
+        return self.lattice[:, row_start:row_stop, col_start:col_stop]
+
+    # A block is skipped when no lattice node around it maps inside the source (bilinear interpolation
+    # stays within the range of the nodes, so the interpolated coordinates do not either)
+    def _overlaps(self, window):
+        rows, cols = self._lattice_nodes(window)
+        if np.isnan(rows).any():
+            return True
+        return (rows.min() <= self.src_height - 0.5 and rows.max() >= -0.5 and
+                cols.min() <= self.src_width - 0.5 and cols.max() >= -0.5)
+
+    def source_coordinates(self, window):
+        """Return the (2, height, width) source row/column coordinates of a destination window."""
+        # bilinear interpolation between the four lattice nodes around every destination pixel
+        rows = window.row_off + np.arange(window.height)
+        cols = window.col_off + np.arange(window.width)
+        row_nodes, col_nodes = rows // LATTICE_STEP, cols // LATTICE_STEP
+        fy = ((rows % LATTICE_STEP) / LATTICE_STEP)[:, None]
+        fx = ((cols % LATTICE_STEP) / LATTICE_STEP)[None, :]
+        first_row, row_nodes = row_nodes[0], row_nodes - row_nodes[0]
+        coordinates = []
+        for axis in self.lattice:
+            # along the columns on the few lattice rows involved first, then along the rows
+            nodes = axis[first_row:first_row + row_nodes[-1] + 2]
+            across = nodes[:, col_nodes] * (1 - fx) + nodes[:, col_nodes + 1] * fx
+            coordinates.append(across[row_nodes] * (1 - fy) + across[row_nodes + 1] * fy)
+        return np.stack(coordinates)
+
+    def source_mapping(self, window):
+        """
+        Return the source-pixel mapping of a destination window: the flat index of the upper-left
+        source neighbour of every pixel, the column and row weights of the bilinear interpolation,
+        and a mask of the pixels outside the source.
+        """
+        key = (window.row_off, window.col_off, window.height, window.width)
+        mapping = _mapping_cache.get(self.plan_id, key)
+        if mapping is not None:
+            return mapping
+
+        rows, cols = self.source_coordinates(window)
+        outside = ~((rows >= -0.5) & (rows <= self.src_height - 0.5) & (cols >= -0.5) & (cols <= self.src_width - 0.5))
+        rows, cols = np.nan_to_num(rows), np.nan_to_num(cols)
+
+        # neighbours beyond the edge are clamped to the edge, like mode='nearest'
+        row0 = np.clip(np.floor(rows), 0, max(self.src_height - 2, 0))
+        col0 = np.clip(np.floor(cols), 0, max(self.src_width - 2, 0))
+        fy = np.clip(rows - row0, 0, 1).astype(np.float32)
+        fx = np.clip(cols - col0, 0, 1).astype(np.float32)
+        index = (row0 * self.src_width + col0).astype(np.int64 if self.src_width * self.src_height >= 2 ** 31 else np.int32)
+        mapping = (index, fx, fy, outside)
+
+        # keep the mapping for the next band or scene while it fits the cache
+        _mapping_cache.put(self.plan_id, key, mapping)
+        return mapping
+
+    def profile(self, profile):
+        """Return a copy of a source profile updated to the destination grid."""
+        profile = profile.copy()
+        profile.update({'crs': self.dst_crs, 'transform': self.transform, 'width': self.width, 'height': self.height})
+        return profile
+
+    # Every source pixel paired with its right neighbour, viewed as one complex number, so a single
+    # gather fetches both (gathers dominate the cost of the warp)
+    @staticmethod
+    def _pair_bands(source):
+        pairs = []
+        for band in source:
+            band = band.ravel()
+            dtype = np.float32 if band.dtype == np.float32 else np.float64
+            pair = np.empty((band.size, 2), dtype=dtype)
+            pair[:, 0] = band
+            pair[:-1, 1] = band[1:]
+            pair[-1, 1] = band[-1]
+            pairs.append(pair.view(np.complex64 if dtype == np.float32 else np.complex128).ravel())
+        return pairs
+
+    # Bilinear sampling of paired source bands of the given (height, width) through a flat-index mapping
+    @staticmethod
+    def _sample(pairs, shape, index, fx, fy, outside, dtype, nodata):
+        height, width = shape
+        row_step = width if height > 1 else 0
+        result = np.empty((len(pairs),) + index.shape, dtype=dtype)
+        for pair, target in zip(pairs, result):
+            top, bottom = np.take(pair, index), np.take(pair, index + row_step)
+            if width == 1:  # no right neighbour
+                top.imag, bottom.imag = top.real, bottom.real
+            top = top.real + (top.imag - top.real) * fx
+            values = top + (bottom.real + (bottom.imag - bottom.real) * fx - top) * fy
+            if np.issubdtype(dtype, np.integer):
+                values = np.rint(values)
+            values[outside] = nodata
+            target[...] = values
+        return result
+
+    # Warp a single destination block of every band
+    def _warp_block(self, pairs, destination, window, nodata):
+        index, fx, fy, outside = self.source_mapping(window)
+        block = (slice(None), slice(window.row_off, window.row_off + window.height), slice(window.col_off, window.col_off + window.width))
+        destination[block] = self._sample(pairs, (self.src_height, self.src_width), index, fx, fy, outside, destination.dtype, nodata)
+
+    def source_window(self, window):
+        """Return the source window a destination window samples from, or None when they do not overlap."""
+        if not self._overlaps(window):
+            return None
+        rows, cols = self._lattice_nodes(window)
+        if np.isnan(rows).any():
+            return Window(0, 0, self.src_width, self.src_height)
+        row_start, col_start = max(int(np.floor(rows.min())) - 1, 0), max(int(np.floor(cols.min())) - 1, 0)
+        row_stop = min(int(np.floor(rows.max())) + 2, self.src_height)
+        col_stop = min(int(np.floor(cols.max())) + 2, self.src_width)
+        if row_stop <= row_start or col_stop <= col_start:
+            return None
+        return Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+
+    def warp_window(self, read, window, dtype, nodata=0):
+        """
+        Warp one destination window, reading only the source window it needs.
+
+        read(source_window) returns a (height, width) band or a (bands, height, width) stack;
+        the result has the same number of dimensions. Nothing is read when the destination window
+        does not overlap the source.
+        """
+        source_window = self.source_window(window)
+        if source_window is None:
+            return np.full((window.height, window.width), nodata, dtype=dtype)
+        source = np.asarray(read(source_window))
+        stack = source if source.ndim == 3 else source[None]
+
+        # move the flat indices of the full source into the source window
+        index, fx, fy, outside = self.source_mapping(window)
+        rows, cols = np.divmod(index, self.src_width)
+        rows = np.clip(rows - source_window.row_off, 0, max(source_window.height - 2, 0))
+        cols = np.clip(cols - source_window.col_off, 0, max(source_window.width - 2, 0))
+        result = self._sample(self._pair_bands(stack), stack.shape[1:], rows * source_window.width + cols, fx, fy, outside, dtype, nodata)
+        return result if source.ndim == 3 else result[0]
+
+    def warp(self, image, workers=1, nodata=0):
+        """
+        Warp a (height, width) band or a (bands, height, width) stack onto the destination grid.
+
+        Destination blocks are warped concurrently in a thread pool of workers threads (workers=None
+        uses all CPU cores). Blocks that do not overlap the source, and destination pixels outside
+        of it, are set to nodata.
+        """
+        image = np.asarray(image)
+        stack = image if image.ndim == 3 else image[None]
+        destination = np.full((stack.shape[0], self.height, self.width), nodata, dtype=stack.dtype)
+        pairs = self._pair_bands(stack)
+
+        if workers == 1:
+            for window in self.overlapping:
+                self._warp_block(pairs, destination, window, nodata)
+        else:
+            with get_executor(workers, 'thread') as pool:
+                list(pool.map(lambda window: self._warp_block(pairs, destination, window, nodata), self.overlapping))
+        return destination if image.ndim == 3 else destination[0]
+
+# Cached plans
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _cached_warp_plan(src_crs, src_transform, width, height, dst_crs, block_size):
+    return WarpPlan(src_crs, Affine(*src_transform), width, height, dst_crs, block_size)
+
+def get_warp_plan(src_crs, src_transform, width, height, dst_crs, block_size=WARP_BLOCK_SIZE):
+    """Return the warp plan of a source geometry and dst_crs, building it only the first time."""
+    return _cached_warp_plan(CRS.from_user_input(src_crs).to_wkt(), tuple(src_transform)[:6], width, height,
+                             CRS.from_user_input(dst_crs).to_wkt(), block_size)
@@ -8,13 +8,20 @@ setup(
     name='earthml',
     version='0.2',
     packages=find_packages(),
+    python_requires='>=3.7',
     install_requires=[
         'fiona',
         'rasterio',
         'pygeohash',
         'Pillow',
         'laspy',
+        'pyproj>=3.1',
     ],
+    entry_points={
+        'console_scripts': [
+            'earthml-batch=earthml.batch:main',
+        ],
+    },
     author='Akhil Chhibber',
     author_email='akhil.chibber@gmail.com',
     description='A library to Perform different possible operations on Geo-Spatial Dataset',
@@ -26,8 +33,11 @@ setup(
         'Intended Audience :: Developers',
         'Topic :: Scientific/Engineering :: GIS',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
     ],
 )
\ No newline at end of file